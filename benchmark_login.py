@@ -0,0 +1,71 @@
+# Mede a latência do login sob carga concorrente.
+#
+# Com o servidor rodando (ex.: gunicorn src.main:app), execute:
+#
+#     python benchmark_login.py --url http://localhost:5000 --requests 200 --concurrency 20
+#
+# Respostas 503 indicam que o limite de hashes simultâneos do processo estava
+# atingido (PASSWORD_HASH_CONCURRENCY) e são contadas à parte.
+
+import argparse
+import json
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+def login(url, email, password):
+    body = json.dumps({'email': email, 'password': password}).encode('utf-8')
+    request = urllib.request.Request(
+        url + '/api/users/login', data=body, headers={'Content-Type': 'application/json'}
+    )
+    started = time.perf_counter()
+
+    try:
+        with urllib.request.urlopen(request) as response:
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+
+    return status, (time.perf_counter() - started) * 1000
+
+def percentile(values, fraction):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do login')
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--email', default='cliente@teste.com')
+    parser.add_argument('--password', default='cliente123')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=20)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(
+            lambda _: login(args.url.rstrip('/'), args.email, args.password), range(args.requests)
+        ))
+
+    elapsed = time.perf_counter() - started
+    latencies = [ms for status, ms in results if status == 200]
+    statuses = {}
+
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+
+    print(f'{args.requests} logins, {args.concurrency} simultâneos, {elapsed:.2f} s ({args.requests / elapsed:.1f} req/s)')
+    print('Status: ' + ', '.join(f'{status}={count}' for status, count in sorted(statuses.items())))
+
+    if latencies:
+        print(
+            f'Latência (ms): p50={percentile(latencies, 0.50):.1f} '
+            f'p95={percentile(latencies, 0.95):.1f} p99={percentile(latencies, 0.99):.1f} '
+            f'máx={max(latencies):.1f}'
+        )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,10 @@
+# Configuração do Gunicorn, lida automaticamente quando ele é iniciado nesta
+# pasta (gunicorn src.main:app).
+
+def post_worker_init(worker):
+    # Com JOB_WORKER_THREADS > 0, cada processo executa a fila de tarefas em
+    # threads próprias, iniciadas aqui depois do fork e antes da primeira
+    # requisição. Com o padrão (0) a fila fica a cargo do `flask worker`.
+    from src.utils.jobs import start_in_process_workers
+
+    start_in_process_workers(worker.wsgi)
@@ -1,82 +1,115 @@
 from flask import Flask, jsonify, request
+from flask.cli import with_appcontext
 from flask_cors import CORS
+import click
 import os
 import sys
+import time
 import jwt
 from datetime import datetime, timedelta
-from werkzeug.security import generate_password_hash
 
 # Configuração do caminho para importações
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-# Inicialização da aplicação Flask
-app = Flask(__name__, static_url_path='/static', static_folder='static')
-CORS(app)
-
-# Configuração do banco de dados
-app.config['SECRET_KEY'] = 'hortifruti-delivery-secret-key'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///hortifruti.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-# Importação dos modelos e inicialização do banco de dados
-from src.models.user import User, db
-from src.models.product import Product, Category
+# Importação dos modelos e do banco de dados
+from src.models.db import db
+from src.models.user import User
+from src.models.product import Product, Category, sync_low_stock
 from src.models.order import Order, OrderItem
+from src.models.sales import record_order
+from src.utils.passwords import hash_password
+from src.settings import STORE_SETTINGS
+from src.utils.bootstrap import bootstrap_response
+from src.utils.static_index import init_static_index
 
-# Inicialização do banco de dados
-db.init_app(app)
-
-# Importação das rotas
-from src.routes.user import user_bp
-from src.routes.product import product_bp
-from src.routes.order import order_bp
-
-# Registro dos blueprints
-app.register_blueprint(user_bp, url_prefix='/api/users')
-app.register_blueprint(product_bp, url_prefix='/api/products')
-app.register_blueprint(order_bp, url_prefix='/api/orders')
-
-# Rota para verificar se a API está funcionando
-@app.route('/api/health', methods=['GET'])
-def health_check():
-    return jsonify({'status': 'ok', 'message': 'API Hortifruti Delivery funcionando!'}), 200
-
-# Rota para configurações da loja
-@app.route('/api/settings', methods=['GET'])
-def get_settings():
-    # Configurações da loja (simuladas)
-    settings = {
-        'store_name': 'Hortifruti Delivery',
-        'store_email': 'contato@hortifrutidelivery.com.br',
-        'store_phone': '(11) 99999-9999',
-        'store_address': 'Rua das Hortaliças, 123',
-        'store_open_time': '08:00',
-        'store_close_time': '20:00',
-        'delivery_fee': 5.99,
-        'min_order': 20.00,
-        'payment_methods': ['money', 'credit', 'debit', 'pix'],
-        'pix_key': 'contato@hortifrutidelivery.com.br',
-        'notifications': {
-            'new_order': True,
-            'low_stock': True,
-            'customer_message': True
-        }
-    }
+def create_app():
+    """Cria e configura o app. Não acessa o banco de dados: o schema e os dados
+    iniciais são preparados no deploy pelos comandos `flask init-db` e `flask seed`."""
+    started = time.perf_counter()
     
-    return jsonify(settings), 200
-
-# Inicialização do banco de dados e criação de dados iniciais
-@app.before_first_request
-def create_tables_and_initial_data():
-    db.create_all()
+    # Inicialização da aplicação Flask
+    app = Flask(__name__, static_url_path='/static', static_folder='static')
+    CORS(app)
+    
+    # Configuração do banco de dados
+    app.config['SECRET_KEY'] = 'hortifruti-delivery-secret-key'
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///hortifruti.db'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    
+    # Nível de log do app (o perfil do SQLite é registrado em INFO)
+    app.logger.setLevel(os.environ.get('LOG_LEVEL', 'INFO'))
+    
+    # Inicialização do banco de dados
+    db.init_app(app)
+    
+    # Tipos de tarefa da fila em segundo plano (executada por `flask worker`)
+    import src.utils.notifications
+    
+    # Importação das rotas
+    from src.routes.user import user_bp
+    from src.routes.product import product_bp, bootstrap_categories, bootstrap_featured, bootstrap_products
+    from src.routes.order import order_bp
+    from src.routes.report import report_bp
+    
+    # Registro dos blueprints
+    app.register_blueprint(user_bp, url_prefix='/api/users')
+    app.register_blueprint(product_bp, url_prefix='/api/products')
+    app.register_blueprint(order_bp, url_prefix='/api/orders')
+    app.register_blueprint(report_bp, url_prefix='/api/reports')
+    
+    # Rota para verificar se a API está funcionando
+    @app.route('/api/health', methods=['GET'])
+    def health_check():
+        return jsonify({'status': 'ok', 'message': 'API Hortifruti Delivery funcionando!'}), 200
+    
+    # Rota para configurações da loja
+    @app.route('/api/settings', methods=['GET'])
+    def get_settings():
+        return jsonify(STORE_SETTINGS), 200
+    
+    # Primeira tela da loja em uma única requisição (src/utils/bootstrap.py)
+    @app.route('/api/bootstrap', methods=['GET'])
+    def get_bootstrap():
+        return bootstrap_response((
+            ('settings', lambda: STORE_SETTINGS),
+            ('categories', bootstrap_categories),
+            ('featured', bootstrap_featured),
+            ('products', bootstrap_products)
+        ))
+    
+    # Índice de static/ e index.html em memória, montados uma vez por processo
+    init_static_index(app)
+    
+    # Rota para servir o aplicativo PWA
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve_pwa(path):
+        static_index = app.extensions['static_index']
+        
+        if path != "" and path in static_index:
+            return static_index.send(path)
+        return app.extensions['pages']['index.html'].response()
     
+    # Comandos de linha de comando executados uma vez por deploy
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(seed_command)
+    app.cli.add_command(rebuild_daily_sales_command)
+    app.cli.add_command(worker_command)
+    app.cli.add_command(retry_dead_jobs_command)
+    
+    app.logger.info('App pronto em %.1f ms', (time.perf_counter() - started) * 1000)
+    
+    return app
+
+# Criação dos dados iniciais (usuários, categorias, produtos e pedidos de exemplo)
+def seed_initial_data():
     # Verificar se já existem dados
     if User.query.count() == 0:
         # Criar usuário administrador
         admin = User(
             name='Administrador',
             email='admin@hortifrutidelivery.com.br',
-            password=generate_password_hash('admin123'),
+            password=hash_password('admin123'),
             role='admin'
         )
         
@@ -84,7 +117,7 @@ def create_tables_and_initial_data():
         customer = User(
             name='Cliente Teste',
             email='cliente@teste.com',
-            password=generate_password_hash('cliente123'),
+            password=hash_password('cliente123'),
             role='customer'
         )
         
@@ -210,6 +243,8 @@ def create_tables_and_initial_data():
         for product in products:
             db.session.add(product)
         
+        db.session.flush()
+        sync_low_stock(products)
         db.session.commit()
         
         # Criar pedidos de exemplo
@@ -311,19 +346,76 @@ def create_tables_and_initial_data():
         order2.items.append(order2_item2)
         order2.items.append(order2_item3)
         
+        order1.update_summary()
+        order2.update_summary()
+        
         db.session.add(order1)
         db.session.add(order2)
+        db.session.flush()
+        
+        record_order(order1)
+        record_order(order2)
         
         db.session.commit()
 
-# Rota para servir o aplicativo PWA
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve_pwa(path):
-    if path != "" and os.path.exists(os.path.join(app.static_folder, path)):
-        return app.send_static_file(path)
-    return app.send_static_file('index.html')
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Cria as tabelas e aplica as migrações pendentes."""
+    from src.migrate import upgrade
+    
+    for version, description in upgrade():
+        click.echo(f'Migração {version} aplicada: {description}')
+    
+    click.echo('Banco de dados atualizado')
+
+@click.command('rebuild-daily-sales')
+@with_appcontext
+def rebuild_daily_sales_command():
+    """Recalcula o resumo diário de vendas a partir dos pedidos."""
+    from src.models.sales import rebuild_daily_sales
+    
+    with db.engine.begin() as connection:
+        days = rebuild_daily_sales(connection)
+    
+    click.echo(f'Resumo diário recalculado: {days} dias')
+
+@click.command('worker')
+@click.option('--threads', default=2, show_default=True, help='Tarefas executadas ao mesmo tempo.')
+@with_appcontext
+def worker_command(threads):
+    """Executa a fila de tarefas em segundo plano até SIGINT/SIGTERM."""
+    from flask import current_app
+    from src.utils.jobs import JobWorker
+    
+    click.echo(f'Worker de tarefas iniciado com {threads} threads')
+    JobWorker(current_app._get_current_object(), threads).run_forever()
+    click.echo('Worker de tarefas encerrado')
+
+@click.command('retry-dead-jobs')
+@with_appcontext
+def retry_dead_jobs_command():
+    """Devolve à fila as tarefas que esgotaram as tentativas."""
+    from src.utils.jobs import retry_dead_jobs
+    
+    click.echo(f'Tarefas reenviadas: {retry_dead_jobs()}')
+
+@click.command('seed')
+@with_appcontext
+def seed_command():
+    """Cria os dados iniciais se o banco estiver vazio."""
+    seed_initial_data()
+    click.echo('Dados iniciais verificados')
+
+app = create_app()
 
 # Inicialização da aplicação
 if __name__ == '__main__':
+    # Em desenvolvimento, preparar o banco antes de subir o servidor
+    from src.migrate import upgrade
+    
+    with app.app_context():
+        upgrade()
+        seed_initial_data()
+    
     app.run(host='0.0.0.0', port=5000, debug=True)
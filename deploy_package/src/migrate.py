@@ -0,0 +1,137 @@
+import datetime
+import logging
+from sqlalchemy import text
+from src.models.db import db
+
+# Migrações versionadas do banco de dados.
+#
+# Devem ser executadas uma vez a cada deploy, antes de iniciar os workers:
+#
+#     cd deploy_package && python -m src.migrate
+#
+# Tabelas novas são criadas pelo create_all a partir dos modelos; índices e
+# colunas em tabelas existentes são aplicados pelas migrações abaixo, em ordem
+# de versão, e registrados na tabela schema_migrations. Cada migração deve ser
+# idempotente, pois em um banco novo o create_all já cria o schema atual.
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS = []
+
+def migration(version, description):
+    def register(function):
+        MIGRATIONS.append((version, description, function))
+        return function
+
+    return register
+
+def table_columns(connection, table):
+    return {row[1] for row in connection.execute(text(f'PRAGMA table_info({table})'))}
+
+def add_column(connection, table, column, definition):
+    """ALTER TABLE ... ADD COLUMN, somente se a coluna ainda não existir"""
+    if column not in table_columns(connection, table):
+        connection.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {definition}'))
+
+def create_index(connection, name, table, columns, unique=False):
+    connection.execute(text(
+        f'CREATE {"UNIQUE " if unique else ""}INDEX IF NOT EXISTS {name} ON {table} ({", ".join(columns)})'
+    ))
+
+@migration(1, 'Índices das consultas de pedidos, itens e produtos')
+def add_hot_query_indexes(connection):
+    create_index(connection, 'ix_orders_customer_id', 'orders', ['customer_id'])
+    create_index(connection, 'ix_orders_created_at', 'orders', ['created_at'])
+    create_index(connection, 'ix_orders_status', 'orders', ['status'])
+    create_index(connection, 'ix_order_items_order_id', 'order_items', ['order_id'])
+    create_index(connection, 'ix_products_category_id', 'products', ['category_id'])
+    create_index(connection, 'ix_products_featured', 'products', ['featured'])
+    create_index(connection, 'ix_products_active', 'products', ['active'])
+
+@migration(2, 'Resumo diário de vendas (daily_sales)')
+def backfill_daily_sales(connection):
+    from src.models.sales import rebuild_daily_sales
+
+    rebuild_daily_sales(connection)
+
+@migration(3, 'Índices de cobertura dos relatórios de vendas')
+def add_report_indexes(connection):
+    create_index(connection, 'ix_orders_created_at_status', 'orders', ['created_at', 'status'])
+    create_index(connection, 'ix_order_items_order_id_product', 'order_items', ['order_id', 'product_id', 'price', 'quantity'])
+
+@migration(4, 'Nível de reposição por produto e conjunto de estoque baixo')
+def add_reorder_level(connection):
+    from src.models.product import DEFAULT_REORDER_LEVEL
+
+    add_column(connection, 'products', 'reorder_level', f'INTEGER NOT NULL DEFAULT {DEFAULT_REORDER_LEVEL}')
+    connection.execute(text(
+        'INSERT OR IGNORE INTO low_stock_products (product_id, since) '
+        'SELECT id, :now FROM products WHERE COALESCE(stock, 0) <= reorder_level'
+    ), {'now': datetime.datetime.utcnow()})
+
+@migration(5, 'Resumo dos itens nos pedidos para o histórico')
+def add_order_summaries(connection):
+    from src.models.order import backfill_order_summaries
+
+    add_column(connection, 'orders', 'item_count', 'INTEGER NOT NULL DEFAULT 0')
+    add_column(connection, 'orders', 'items_preview', "VARCHAR(200) NOT NULL DEFAULT ''")
+    create_index(connection, 'ix_orders_customer_id_created_at', 'orders', ['customer_id', 'created_at'])
+    backfill_order_summaries(connection)
+
+def import_models():
+    # Os modelos precisam estar registrados no metadata antes do create_all
+    from src.models.user import User
+    from src.models.product import Product, Category, LowStockProduct
+    from src.models.order import Order, OrderItem
+    from src.models.sales import DailySales
+    from src.models.job import Job
+
+def applied_versions(connection):
+    connection.execute(text(
+        'CREATE TABLE IF NOT EXISTS schema_migrations ('
+        'version INTEGER PRIMARY KEY, description VARCHAR(200) NOT NULL, applied_at DATETIME NOT NULL)'
+    ))
+    return {row[0] for row in connection.execute(text('SELECT version FROM schema_migrations'))}
+
+def upgrade():
+    """Cria as tabelas que faltam e aplica as migrações pendentes.
+
+    Deve ser chamada dentro de um contexto do app; retorna a lista de
+    (versão, descrição) aplicadas nesta execução.
+    """
+    import_models()
+    db.create_all()
+
+    with db.engine.begin() as connection:
+        applied = applied_versions(connection)
+
+    executed = []
+
+    for version, description, function in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if version in applied:
+            continue
+
+        # Cada migração é registrada logo após ser aplicada; como são
+        # idempotentes, uma migração interrompida pode ser executada de novo
+        with db.engine.begin() as connection:
+            function(connection)
+            connection.execute(
+                text('INSERT INTO schema_migrations (version, description, applied_at) VALUES (:version, :description, :applied_at)'),
+                {'version': version, 'description': description, 'applied_at': datetime.datetime.now()}
+            )
+
+        logger.info('Migração %s aplicada: %s', version, description)
+        executed.append((version, description))
+
+    return executed
+
+if __name__ == '__main__':
+    from src.main import app
+
+    with app.app_context():
+        executed = upgrade()
+
+    for version, description in executed:
+        print(f'Migração {version} aplicada: {description}')
+
+    print('Banco de dados atualizado')
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Index
+from datetime import datetime
+from src.models.db import db
+
+class Job(db.Model):
+    """Tarefa da fila em segundo plano (ver src/utils/jobs.py).
+
+    status: pending (aguardando run_at), running (com um worker desde
+    locked_at) ou dead (esgotou as tentativas). Tarefas concluídas são
+    apagadas.
+    """
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        # Busca da próxima tarefa a executar
+        Index('ix_jobs_status_run_at', 'status', 'run_at'),
+        {'sqlite_autoincrement': True}
+    )
+
+    id = Column(Integer, primary_key=True)
+    type = Column(String(50), nullable=False)
+    payload = Column(JSON, nullable=False)
+    status = Column(String(20), nullable=False, default='pending')
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False)
+    run_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = Column(String(100))
+    locked_at = Column(DateTime)
+    last_error = Column(Text)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Job {self.id} {self.type} {self.status}>'
@@ -1,15 +1,18 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, JSON, Index, bindparam, select
 from sqlalchemy.orm import relationship
-from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from itertools import groupby
+from operator import itemgetter
+from src.models.db import db
 
-db = SQLAlchemy()
+# Quantos nomes de produtos entram no resumo dos itens do histórico
+ITEMS_PREVIEW_NAMES = 3
 
 class Order(db.Model):
     __tablename__ = 'orders'
     
     id = Column(Integer, primary_key=True)
-    customer_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    customer_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
     customer_name = Column(String(100), nullable=False)
     customer_email = Column(String(100), nullable=False)
     customer_phone = Column(String(20))
@@ -19,13 +22,28 @@ class Order(db.Model):
     subtotal = Column(Float, nullable=False)
     delivery_fee = Column(Float, nullable=False)
     total = Column(Float, nullable=False)
-    status = Column(String(20), default='pending')  # pending, processing, shipping, delivered, cancelled
-    created_at = Column(DateTime, default=datetime.utcnow)
+    status = Column(String(20), default='pending', index=True)  # pending, processing, shipping, delivered, cancelled
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    # Resumo dos itens gravado na criação, lido pelo histórico sem carregar os itens
+    item_count = Column(Integer, nullable=False, default=0)
+    items_preview = Column(String(200), nullable=False, default='')
+    
+    __table_args__ = (
+        # Índice de cobertura dos relatórios por intervalo de datas
+        Index('ix_orders_created_at_status', 'created_at', 'status'),
+        # Histórico do cliente: filtro e ordenação pelo mesmo índice
+        Index('ix_orders_customer_id_created_at', 'customer_id', 'created_at'),
+    )
     
     # Relacionamentos
     customer = relationship('User', back_populates='orders')
     items = relationship('OrderItem', back_populates='order', cascade='all, delete-orphan')
     
+    def update_summary(self):
+        """Preenche item_count e items_preview a partir dos itens do pedido"""
+        self.item_count = len(self.items)
+        self.items_preview = items_preview(item.product_name for item in self.items)
+    
     def __repr__(self):
         return f'<Order {self.id}>'
 
@@ -33,14 +51,50 @@ class OrderItem(db.Model):
     __tablename__ = 'order_items'
     
     id = Column(Integer, primary_key=True)
-    order_id = Column(Integer, ForeignKey('orders.id'), nullable=False)
+    order_id = Column(Integer, ForeignKey('orders.id'), nullable=False, index=True)
     product_id = Column(Integer, nullable=False)
     product_name = Column(String(100), nullable=False)
     price = Column(Float, nullable=False)
     quantity = Column(Float, nullable=False)
     
+    # Índice de cobertura dos relatórios: a junção por order_id lê o resto do índice
+    __table_args__ = (
+        Index('ix_order_items_order_id_product', 'order_id', 'product_id', 'price', 'quantity'),
+    )
+    
     # Relacionamentos
     order = relationship('Order', back_populates='items')
     
     def __repr__(self):
         return f'<OrderItem {self.product_name}>'
+
+def items_preview(names):
+    """Resumo dos itens para o histórico, ex.: "Maçã, Banana, Alface e mais 2" """
+    names = list(dict.fromkeys(name for name in names if name))
+    preview = ', '.join(names[:ITEMS_PREVIEW_NAMES])
+
+    if len(names) > ITEMS_PREVIEW_NAMES:
+        preview += f' e mais {len(names) - ITEMS_PREVIEW_NAMES}'
+
+    return preview[:200]
+
+def backfill_order_summaries(connection):
+    """Calcula item_count e items_preview de todos os pedidos a partir dos itens"""
+    orders = Order.__table__
+    items = OrderItem.__table__
+    rows = connection.execute(
+        select(items.c.order_id, items.c.product_name).order_by(items.c.order_id, items.c.id)
+    )
+
+    values = []
+    for order_id, group in groupby(rows, key=itemgetter(0)):
+        names = [name for _, name in group]
+        values.append({'order_key': order_id, 'new_item_count': len(names), 'new_items_preview': items_preview(names)})
+
+    if values:
+        connection.execute(
+            orders.update()
+            .where(orders.c.id == bindparam('order_key'))
+            .values(item_count=bindparam('new_item_count'), items_preview=bindparam('new_items_preview')),
+            values
+        )
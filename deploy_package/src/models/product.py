@@ -1,9 +1,10 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, JSON, select
 from sqlalchemy.orm import relationship
-from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from src.models.db import db
 
-db = SQLAlchemy()
+# Nível de reposição dos produtos que não definem o seu
+DEFAULT_REORDER_LEVEL = 10
 
 class Product(db.Model):
     __tablename__ = 'products'
@@ -14,12 +15,14 @@ class Product(db.Model):
     price = Column(Float, nullable=False)
     unit = Column(String(20), nullable=False)  # kg, unid, bandeja, etc.
     image = Column(String(255))
-    category_id = Column(Integer, ForeignKey('categories.id'), nullable=False)
+    category_id = Column(Integer, ForeignKey('categories.id'), nullable=False, index=True)
     stock = Column(Integer, default=0)
+    # Com estoque menor ou igual a este valor o produto entra em low_stock_products
+    reorder_level = Column(Integer, nullable=False, default=DEFAULT_REORDER_LEVEL)
     organic = Column(Boolean, default=False)
-    featured = Column(Boolean, default=False)
+    featured = Column(Boolean, default=False, index=True)
     discount = Column(Integer, default=0)  # Percentual de desconto
-    active = Column(Boolean, default=True)
+    active = Column(Boolean, default=True, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relacionamentos
@@ -42,3 +45,40 @@ class Category(db.Model):
     
     def __repr__(self):
         return f'<Category {self.name}>'
+
+class LowStockProduct(db.Model):
+    """Conjunto dos produtos com estoque baixo (stock <= reorder_level).
+
+    Mantido por sync_low_stock sempre que o estoque ou o nível de reposição
+    mudam, de modo que a listagem de estoque baixo não varre os produtos.
+    """
+    __tablename__ = 'low_stock_products'
+    
+    product_id = Column(Integer, ForeignKey('products.id', ondelete='CASCADE'), primary_key=True)
+    since = Column(DateTime, nullable=False, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<LowStockProduct {self.product_id}>'
+
+def sync_low_stock(products):
+    """Atualiza low_stock_products para os produtos informados (já com flush).
+    
+    Retorna os ids dos produtos que acabaram de entrar no estoque baixo.
+    """
+    table = LowStockProduct.__table__
+    ids = [product.id for product in products]
+    
+    current = set(db.session.execute(select(table.c.product_id).where(table.c.product_id.in_(ids))).scalars())
+    low = {product.id for product in products if (product.stock or 0) <= product.reorder_level}
+    
+    entered = sorted(low - current)
+    left = current - low
+    
+    if entered:
+        now = datetime.utcnow()
+        db.session.execute(table.insert(), [{'product_id': product_id, 'since': now} for product_id in entered])
+    
+    if left:
+        db.session.execute(table.delete().where(table.c.product_id.in_(left)))
+    
+    return entered
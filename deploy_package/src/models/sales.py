@@ -0,0 +1,108 @@
+from sqlalchemy import Column, Integer, String, Float, Date, func, literal, select
+from sqlalchemy.dialects.sqlite import insert
+from src.models.db import db
+from src.models.order import Order
+
+# Resumo de vendas por dia, lido pelo painel administrativo.
+#
+# Cada dia tem uma linha de totais (dimension='total', name='') e uma linha
+# por status e por forma de pagamento. As linhas são atualizadas na mesma
+# transação que cria o pedido ou muda o seu status, de modo que o painel não
+# precisa varrer a tabela de pedidos. O dia é a data (UTC) de criação do
+# pedido; as linhas de status contam o status atual dos pedidos daquele dia.
+
+class DailySales(db.Model):
+    __tablename__ = 'daily_sales'
+
+    day = Column(Date, primary_key=True)
+    dimension = Column(String(20), primary_key=True)  # total, status, payment
+    name = Column(String(50), primary_key=True, default='')
+    order_count = Column(Integer, nullable=False, default=0)
+    gross_total = Column(Float, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<DailySales {self.day} {self.dimension}={self.name}>'
+
+def payment_method(order):
+    payment = order.payment if isinstance(order.payment, dict) else {}
+    return str(payment.get('method') or '')
+
+def apply_changes(rows):
+    """Soma (dia, dimensão, nome, pedidos, total) às linhas do resumo em um único upsert"""
+    table = DailySales.__table__
+    statement = insert(table).values([
+        {'day': day, 'dimension': dimension, 'name': name, 'order_count': orders, 'gross_total': total}
+        for day, dimension, name, orders, total in rows
+    ])
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.day, table.c.dimension, table.c.name],
+        set_={
+            'order_count': table.c.order_count + statement.excluded.order_count,
+            'gross_total': table.c.gross_total + statement.excluded.gross_total
+        }
+    )
+    db.session.execute(statement)
+
+def record_order(order):
+    """Registra um pedido novo; o pedido já deve ter passado por flush"""
+    day = order.created_at.date()
+
+    apply_changes([
+        (day, 'total', '', 1, order.total),
+        (day, 'status', order.status or '', 1, order.total),
+        (day, 'payment', payment_method(order), 1, order.total)
+    ])
+
+def record_status_changes(changes):
+    """Registra mudanças de status em um único upsert.
+
+    `changes` é uma lista de (created_at, total, status_anterior, status_novo).
+    """
+    deltas = {}
+
+    for created_at, total, old_status, new_status in changes:
+        if old_status == new_status:
+            continue
+
+        for status, sign in ((old_status, -1), (new_status, 1)):
+            key = (created_at.date(), status or '')
+            orders, amount = deltas.get(key, (0, 0))
+            deltas[key] = (orders + sign, amount + sign * total)
+
+    if deltas:
+        apply_changes([(day, 'status', status, orders, amount) for (day, status), (orders, amount) in deltas.items()])
+
+def record_status_change(order, old_status):
+    record_status_changes([(order.created_at, order.total, old_status, order.status)])
+
+def daily_totals(day):
+    """Retorna (pedidos, total bruto) do dia"""
+    row = DailySales.query.get((day, 'total', ''))
+
+    if not row:
+        return 0, 0
+
+    return row.order_count, row.gross_total
+
+def rebuild_daily_sales(connection):
+    """Recalcula todo o resumo a partir da tabela de pedidos; retorna o número de dias"""
+    table = DailySales.__table__
+    day = func.date(Order.created_at)
+    dimensions = (
+        ('total', literal('')),
+        ('status', func.coalesce(Order.status, '')),
+        ('payment', func.coalesce(Order.payment['method'].as_string(), ''))
+    )
+
+    connection.execute(table.delete())
+
+    for dimension, name in dimensions:
+        connection.execute(table.insert().from_select(
+            ['day', 'dimension', 'name', 'order_count', 'gross_total'],
+            select(day, literal(dimension), name, func.count(Order.id), func.coalesce(func.sum(Order.total), 0))
+            .group_by(day, name)
+        ))
+
+    return connection.execute(
+        select(func.count()).select_from(table).where(table.c.dimension == 'total')
+    ).scalar()
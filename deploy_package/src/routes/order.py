@@ -1,27 +1,37 @@
 from flask import Blueprint, jsonify, request, current_app
 from src.models.order import Order, OrderItem, db
-import jwt
+from src.models.sales import daily_totals, record_order, record_status_change, record_status_changes
+from src.utils.auth import verify_token
+from src.utils.jobs import wake_workers
+from src.utils.notifications import enqueue_order_notifications
 import datetime
-from sqlalchemy import desc
+from sqlalchemy import desc, select, tuple_
+from sqlalchemy.orm import joinedload, selectinload
+from src.utils.pagination import (
+    PaginationError, decode_cursor, encode_cursor, fetch_page, keyset_filter, parse_fields,
+    parse_limit, row_to_dict, select_columns
+)
 
 order_bp = Blueprint('order', __name__)
 
-# Função auxiliar para verificar token
-def verify_token(admin_required=False):
-    token = request.headers.get('Authorization')
-    if not token:
-        return None, {'message': 'Token não fornecido!'}, 401
-    
-    try:
-        token = token.split(' ')[1]
-        data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
-        
-        if admin_required and data.get('role') != 'admin':
-            return None, {'message': 'Acesso não autorizado!'}, 403
-        
-        return data, None, None
-    except:
-        return None, {'message': 'Token inválido!'}, 401
+# Campos que podem ser pedidos via ?fields= na listagem
+ORDER_FIELDS = (
+    'id', 'customer_id', 'customer_name', 'customer_email', 'customer_phone', 'delivery_address',
+    'payment', 'notes', 'subtotal', 'delivery_fee', 'total', 'status', 'created_at'
+)
+
+# Mudança de status em lote: status de destino -> status de origem permitidos
+STATUS_TRANSITIONS = {
+    'processing': ('pending',),
+    'shipping': ('processing',),
+    'delivered': ('shipping',),
+    'cancelled': ('pending', 'processing')
+}
+BATCH_STATUS_MAX_ORDERS = 500
+
+# Histórico do cliente: só as colunas de resumo, sem carregar os itens
+HISTORY_FIELDS = ('id', 'status', 'total', 'item_count', 'items_preview', 'created_at')
+HISTORY_PAGE_SIZE = 20
 
 # Rotas para pedidos
 @order_bp.route('/', methods=['GET'])
@@ -35,7 +45,15 @@ def get_orders():
     status = request.args.get('status')
     customer_id = request.args.get('customer_id')
     
-    query = Order.query.order_by(desc(Order.created_at))
+    # Parâmetros de paginação e seleção de campos
+    try:
+        limit = parse_limit()
+        after = decode_cursor(request.args.get('after'), (datetime.datetime, int))
+        fields = parse_fields(ORDER_FIELDS)
+    except PaginationError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    query = Order.query.order_by(desc(Order.created_at), desc(Order.id))
     
     if status:
         query = query.filter_by(status=status)
@@ -43,10 +61,25 @@ def get_orders():
     if customer_id:
         query = query.filter_by(customer_id=customer_id)
     
-    orders = query.all()
+    if after:
+        query = query.filter(keyset_filter((Order.created_at, Order.id), after, descending=True))
+    
+    if fields:
+        # Apenas as colunas pedidas entram no SELECT
+        _, columns = select_columns(Order, fields, ('created_at', 'id'))
+        query = query.with_entities(*columns)
+    else:
+        # Itens de todos os pedidos da página em uma única consulta IN
+        query = query.options(selectinload(Order.items))
+    
+    orders, has_more = fetch_page(query, limit)
     
     result = []
     for order in orders:
+        if fields:
+            result.append(row_to_dict(order, fields))
+            continue
+        
         order_data = {
             'id': order.id,
             'customer_id': order.customer_id,
@@ -76,7 +109,14 @@ def get_orders():
         
         result.append(order_data)
     
-    return jsonify(result), 200
+    response = jsonify(result)
+    
+    # O corpo continua sendo uma lista; o cursor da próxima página vai no cabeçalho
+    if limit is not None and has_more:
+        last = orders[-1]
+        response.headers['X-Next-Cursor'] = encode_cursor([last.created_at, last.id])
+    
+    return response, 200
 
 @order_bp.route('/customer', methods=['GET'])
 def get_customer_orders():
@@ -87,7 +127,7 @@ def get_customer_orders():
     
     # Obter pedidos do cliente
     customer_id = data['user_id']
-    orders = Order.query.filter_by(customer_id=customer_id).order_by(desc(Order.created_at)).all()
+    orders = Order.query.options(selectinload(Order.items)).filter_by(customer_id=customer_id).order_by(desc(Order.created_at)).all()
     
     result = []
     for order in orders:
@@ -116,6 +156,38 @@ def get_customer_orders():
     
     return jsonify(result), 200
 
+@order_bp.route('/history', methods=['GET'])
+def get_order_history():
+    # Verificar token
+    data, error, code = verify_token()
+    if error:
+        return jsonify(error), code
+    
+    # Pedidos do cliente paginados por cursor, só com as colunas de resumo;
+    # os itens são carregados ao abrir um pedido (/api/orders/<id>)
+    try:
+        limit = parse_limit() or HISTORY_PAGE_SIZE
+        after = decode_cursor(request.args.get('after'), (datetime.datetime, int))
+    except PaginationError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    _, columns = select_columns(Order, HISTORY_FIELDS, ('created_at', 'id'))
+    query = Order.query.with_entities(*columns).filter(Order.customer_id == data['user_id'])
+    
+    if after:
+        query = query.filter(keyset_filter((Order.created_at, Order.id), after, descending=True))
+    
+    orders, has_more = fetch_page(query.order_by(desc(Order.created_at), desc(Order.id)), limit)
+    
+    response = jsonify([row_to_dict(order, HISTORY_FIELDS) for order in orders])
+    
+    # Como na listagem de pedidos, o cursor da próxima página vai no cabeçalho
+    if has_more:
+        last = orders[-1]
+        response.headers['X-Next-Cursor'] = encode_cursor([last.created_at, last.id])
+    
+    return response, 200
+
 @order_bp.route('/<int:order_id>', methods=['GET'])
 def get_order(order_id):
     # Verificar token
@@ -123,8 +195,8 @@ def get_order(order_id):
     if error:
         return jsonify(error), code
     
-    # Obter pedido
-    order = Order.query.get_or_404(order_id)
+    # Obter pedido já com os itens (uma única consulta)
+    order = Order.query.options(joinedload(Order.items)).filter_by(id=order_id).first_or_404()
     
     # Verificar se o usuário tem permissão para acessar este pedido
     if data.get('role') != 'admin' and order.customer_id != data['user_id']:
@@ -195,14 +267,84 @@ def create_order():
         )
         new_order.items.append(item)
     
+    # Resumo dos itens usado pelo histórico
+    new_order.update_summary()
+    
     db.session.add(new_order)
+    db.session.flush()
+    
+    # Atualizar o resumo diário e agendar as notificações na mesma transação
+    record_order(new_order)
+    enqueue_order_notifications(new_order)
     db.session.commit()
     
+    # As notificações rodam fora da requisição, nos workers da fila
+    wake_workers()
+    
     return jsonify({
         'id': new_order.id,
         'message': 'Pedido criado com sucesso!'
     }), 201
 
+@order_bp.route('/status', methods=['PUT'])
+def update_orders_status():
+    # Verificar token
+    data, error, code = verify_token(admin_required=True)
+    if error:
+        return jsonify(error), code
+    
+    status_data = request.get_json()
+    
+    if not status_data or not isinstance(status_data.get('order_ids'), list):
+        return jsonify({'message': 'Informe order_ids e status!'}), 400
+    
+    new_status = status_data.get('status')
+    
+    if new_status not in STATUS_TRANSITIONS:
+        return jsonify({'message': 'Status inválido!'}), 400
+    
+    try:
+        order_ids = sorted({int(order_id) for order_id in status_data['order_ids']})
+    except (TypeError, ValueError):
+        return jsonify({'message': 'Pedido inválido!'}), 400
+    
+    if not order_ids or len(order_ids) > BATCH_STATUS_MAX_ORDERS:
+        return jsonify({'message': f'Informe de 1 a {BATCH_STATUS_MAX_ORDERS} pedidos!'}), 400
+    
+    orders = Order.__table__
+    
+    # Pedidos que podem passar para o novo status (a transição é validada na consulta)
+    movable = db.session.execute(
+        select(orders.c.id, orders.c.status, orders.c.created_at, orders.c.total)
+        .where(orders.c.id.in_(order_ids))
+        .where(orders.c.status.in_(STATUS_TRANSITIONS[new_status]))
+    ).all()
+    
+    if movable:
+        # Um único UPDATE; cada pedido só muda se ainda estiver no status lido acima
+        result = db.session.execute(
+            orders.update()
+            .where(tuple_(orders.c.id, orders.c.status).in_([(order.id, order.status) for order in movable]))
+            .values(status=new_status)
+        )
+        
+        if result.rowcount != len(movable):
+            db.session.rollback()
+            return jsonify({'message': 'Alguns pedidos mudaram durante a atualização, tente novamente!'}), 409
+        
+        # Resumo diário atualizado uma vez para o lote inteiro
+        record_status_changes([(order.created_at, order.total, order.status, new_status) for order in movable])
+        db.session.commit()
+    
+    updated = {order.id for order in movable}
+    
+    return jsonify({
+        'status': new_status,
+        'updated': sorted(updated),
+        'failed': [order_id for order_id in order_ids if order_id not in updated],
+        'message': 'Status dos pedidos atualizado com sucesso!'
+    }), 200
+
 @order_bp.route('/<int:order_id>/status', methods=['PUT'])
 def update_order_status(order_id):
     # Verificar token
@@ -222,8 +364,10 @@ def update_order_status(order_id):
     if new_status not in valid_statuses:
         return jsonify({'message': 'Status inválido!'}), 400
     
-    # Atualizar status
+    # Atualizar status e o resumo diário
+    old_status = order.status
     order.status = new_status
+    record_status_change(order, old_status)
     db.session.commit()
     
     return jsonify({
@@ -251,7 +395,9 @@ def cancel_order(order_id):
         return jsonify({'message': 'Este pedido não pode ser cancelado!'}), 400
     
     # Cancelar pedido
+    old_status = order.status
     order.status = 'cancelled'
+    record_status_change(order, old_status)
     db.session.commit()
     
     return jsonify({
@@ -270,10 +416,8 @@ def get_today_orders_count():
     # Obter data de hoje
     today = datetime.datetime.utcnow().date()
     
-    # Contar pedidos de hoje
-    count = Order.query.filter(
-        db.func.date(Order.created_at) == today
-    ).count()
+    # Contar pedidos de hoje (resumo diário)
+    count, _ = daily_totals(today)
     
     return jsonify({'count': count}), 200
 
@@ -287,12 +431,8 @@ def get_today_sales():
     # Obter data de hoje
     today = datetime.datetime.utcnow().date()
     
-    # Calcular vendas de hoje
-    result = db.session.query(db.func.sum(Order.total)).filter(
-        db.func.date(Order.created_at) == today
-    ).scalar()
-    
-    total = result if result else 0
+    # Calcular vendas de hoje (resumo diário)
+    _, total = daily_totals(today)
     
     return jsonify({'total': total}), 200
 
@@ -1,29 +1,73 @@
-from flask import Blueprint, jsonify, request, current_app
-from src.models.product import Product, Category, db
+from flask import Blueprint, jsonify, request
+from src.models.product import Product, Category, LowStockProduct, DEFAULT_REORDER_LEVEL, db, sync_low_stock
+from src.utils.auth import verify_token
+from src.utils.bootstrap import invalidate_bootstrap
+from src.utils.images import InvalidImage, allowed_image, image_srcset, save_upload
+from src.utils.jobs import wake_workers
+from src.utils.notifications import enqueue_low_stock_notification
+from src.utils.pagination import PaginationError, decode_cursor, encode_cursor, fetch_page, keyset_filter, parse_limit
 from werkzeug.security import generate_password_hash, check_password_hash
-import jwt
 import datetime
-import os
-from werkzeug.utils import secure_filename
 
 product_bp = Blueprint('product', __name__)
 
-# Função auxiliar para verificar token
-def verify_token(admin_required=False):
-    token = request.headers.get('Authorization')
-    if not token:
-        return None, {'message': 'Token não fornecido!'}, 401
+# Produtos na primeira página do /api/bootstrap
+BOOTSTRAP_PAGE_SIZE = 20
+
+def product_dict(product):
+    return {
+        'id': product.id,
+        'name': product.name,
+        'description': product.description,
+        'price': product.price,
+        'unit': product.unit,
+        'image': product.image,
+        'image_srcset': image_srcset(product.image),
+        'category_id': product.category_id,
+        'stock': product.stock,
+        'reorder_level': product.reorder_level,
+        'organic': product.organic,
+        'featured': product.featured,
+        'discount': product.discount,
+        'active': product.active
+    }
+
+def category_dict(category):
+    return {
+        'id': category.id,
+        'name': category.name,
+        'description': category.description,
+        'image': category.image,
+        'image_srcset': image_srcset(category.image)
+    }
+
+def bootstrap_categories():
+    return [category_dict(category) for category in Category.query.order_by(Category.id)]
+
+def bootstrap_featured():
+    return [product_dict(product) for product in Product.query.filter_by(featured=True, active=True).order_by(Product.id)]
+
+def bootstrap_products():
+    # As páginas seguintes vêm de /api/products/?limit=&after=<next_cursor>
+    products, has_more = fetch_page(Product.query.filter_by(active=True).order_by(Product.id), BOOTSTRAP_PAGE_SIZE)
     
-    try:
-        token = token.split(' ')[1]
-        data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
-        
-        if admin_required and data.get('role') != 'admin':
-            return None, {'message': 'Acesso não autorizado!'}, 403
-        
-        return data, None, None
-    except:
-        return None, {'message': 'Token inválido!'}, 401
+    return {
+        'products': [product_dict(product) for product in products],
+        'next_cursor': encode_cursor([products[-1].id]) if has_more else None
+    }
+
+def update_low_stock(products):
+    """Atualiza o conjunto de estoque baixo, grava e notifica os produtos que entraram nele"""
+    entered = sync_low_stock(products)
+    
+    if entered:
+        enqueue_low_stock_notification(entered)
+    
+    db.session.commit()
+    invalidate_bootstrap()
+    
+    if entered:
+        wake_workers()
 
 # Rotas para produtos
 @product_bp.route('/', methods=['GET'])
@@ -47,26 +91,29 @@ def get_products():
     # Filtrar apenas produtos ativos por padrão
     query = query.filter_by(active=True)
     
-    products = query.all()
+    # Paginação opcional por id (?limit=&after=), como a da primeira página do bootstrap
+    try:
+        limit = parse_limit()
+        after = decode_cursor(request.args.get('after'), (int,))
+    except PaginationError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    if after:
+        query = query.filter(keyset_filter((Product.id,), after))
+    
+    products, has_more = fetch_page(query.order_by(Product.id), limit)
     
     result = []
     for product in products:
-        result.append({
-            'id': product.id,
-            'name': product.name,
-            'description': product.description,
-            'price': product.price,
-            'unit': product.unit,
-            'image': product.image,
-            'category_id': product.category_id,
-            'stock': product.stock,
-            'organic': product.organic,
-            'featured': product.featured,
-            'discount': product.discount,
-            'active': product.active
-        })
+        result.append(product_dict(product))
     
-    return jsonify(result), 200
+    response = jsonify(result)
+    
+    # O corpo continua sendo uma lista; o cursor da próxima página vai no cabeçalho
+    if has_more:
+        response.headers['X-Next-Cursor'] = encode_cursor([products[-1].id])
+    
+    return response, 200
 
 @product_bp.route('/featured', methods=['GET'])
 def get_featured_products():
@@ -74,20 +121,7 @@ def get_featured_products():
     
     result = []
     for product in products:
-        result.append({
-            'id': product.id,
-            'name': product.name,
-            'description': product.description,
-            'price': product.price,
-            'unit': product.unit,
-            'image': product.image,
-            'category_id': product.category_id,
-            'stock': product.stock,
-            'organic': product.organic,
-            'featured': product.featured,
-            'discount': product.discount,
-            'active': product.active
-        })
+        result.append(product_dict(product))
     
     return jsonify(result), 200
 
@@ -95,20 +129,7 @@ def get_featured_products():
 def get_product(product_id):
     product = Product.query.get_or_404(product_id)
     
-    result = {
-        'id': product.id,
-        'name': product.name,
-        'description': product.description,
-        'price': product.price,
-        'unit': product.unit,
-        'image': product.image,
-        'category_id': product.category_id,
-        'stock': product.stock,
-        'organic': product.organic,
-        'featured': product.featured,
-        'discount': product.discount,
-        'active': product.active
-    }
+    result = product_dict(product)
     
     return jsonify(result), 200
 
@@ -131,6 +152,7 @@ def create_product():
         image=product_data.get('image', ''),
         category_id=product_data['category_id'],
         stock=product_data.get('stock', 0),
+        reorder_level=product_data.get('reorder_level', DEFAULT_REORDER_LEVEL),
         organic=product_data.get('organic', False),
         featured=product_data.get('featured', False),
         discount=product_data.get('discount', 0),
@@ -138,7 +160,9 @@ def create_product():
     )
     
     db.session.add(new_product)
-    db.session.commit()
+    db.session.flush()
+    
+    update_low_stock([new_product])
     
     return jsonify({
         'id': new_product.id,
@@ -181,6 +205,9 @@ def update_product(product_id):
     if 'stock' in product_data:
         product.stock = product_data['stock']
     
+    if 'reorder_level' in product_data:
+        product.reorder_level = product_data['reorder_level']
+    
     if 'organic' in product_data:
         product.organic = product_data['organic']
     
@@ -193,7 +220,13 @@ def update_product(product_id):
     if 'active' in product_data:
         product.active = product_data['active']
     
-    db.session.commit()
+    # O conjunto de estoque baixo só muda com o estoque ou o nível de reposição
+    if 'stock' in product_data or 'reorder_level' in product_data:
+        db.session.flush()
+        update_low_stock([product])
+    else:
+        db.session.commit()
+        invalidate_bootstrap()
     
     return jsonify({
         'id': product.id,
@@ -214,6 +247,7 @@ def delete_product(product_id):
     # Excluir produto
     db.session.delete(product)
     db.session.commit()
+    invalidate_bootstrap()
     
     return jsonify({
         'message': 'Produto excluído com sucesso!'
@@ -237,26 +271,22 @@ def upload_image():
         return jsonify({'message': 'Nenhum arquivo selecionado!'}), 400
     
     # Verificar extensão do arquivo
-    allowed_extensions = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
-    if '.' not in file.filename or file.filename.rsplit('.', 1)[1].lower() not in allowed_extensions:
+    if not allowed_image(file.filename):
         return jsonify({'message': 'Extensão de arquivo não permitida!'}), 400
     
-    # Salvar arquivo
-    filename = secure_filename(file.filename)
-    upload_folder = os.path.join(current_app.static_folder, 'images', 'products')
-    
-    # Criar pasta se não existir
-    if not os.path.exists(upload_folder):
-        os.makedirs(upload_folder)
-    
-    file_path = os.path.join(upload_folder, filename)
-    file.save(file_path)
+    # Salvar o original (nome pelo hash do conteúdo) e agendar os derivados
+    try:
+        image_url, queued = save_upload(file, 'products')
+    except InvalidImage:
+        return jsonify({'message': 'Arquivo de imagem inválido!'}), 400
     
-    # Retornar URL da imagem
-    image_url = f'/static/images/products/{filename}'
+    if queued:
+        db.session.commit()
+        wake_workers()
     
     return jsonify({
         'url': image_url,
+        'srcset': image_srcset(image_url),
         'message': 'Imagem enviada com sucesso!'
     }), 201
 
@@ -267,8 +297,10 @@ def get_products_count():
 
 @product_bp.route('/low-stock', methods=['GET'])
 def get_low_stock_products():
-    # Produtos com estoque menor ou igual a 10
-    products = Product.query.filter(Product.stock <= 10).all()
+    # Produtos no conjunto de estoque baixo (stock <= reorder_level), buscados
+    # pela chave primária em vez de varrer a tabela de produtos
+    products = Product.query.filter(Product.id.in_(db.session.query(LowStockProduct.product_id))) \
+        .order_by(Product.stock).all()
     
     result = []
     for product in products:
@@ -277,7 +309,8 @@ def get_low_stock_products():
             'name': product.name,
             'category_id': product.category_id,
             'price': product.price,
-            'stock': product.stock
+            'stock': product.stock,
+            'reorder_level': product.reorder_level
         })
     
     return jsonify(result), 200
@@ -289,12 +322,7 @@ def get_categories():
     
     result = []
     for category in categories:
-        result.append({
-            'id': category.id,
-            'name': category.name,
-            'description': category.description,
-            'image': category.image
-        })
+        result.append(category_dict(category))
     
     return jsonify(result), 200
 
@@ -302,12 +330,7 @@ def get_categories():
 def get_category(category_id):
     category = Category.query.get_or_404(category_id)
     
-    result = {
-        'id': category.id,
-        'name': category.name,
-        'description': category.description,
-        'image': category.image
-    }
+    result = category_dict(category)
     
     return jsonify(result), 200
 
@@ -330,6 +353,7 @@ def create_category():
     
     db.session.add(new_category)
     db.session.commit()
+    invalidate_bootstrap()
     
     return jsonify({
         'id': new_category.id,
@@ -361,6 +385,7 @@ def update_category(category_id):
         category.image = category_data['image']
     
     db.session.commit()
+    invalidate_bootstrap()
     
     return jsonify({
         'id': category.id,
@@ -388,6 +413,7 @@ def delete_category(category_id):
     # Excluir categoria
     db.session.delete(category)
     db.session.commit()
+    invalidate_bootstrap()
     
     return jsonify({
         'message': 'Categoria excluída com sucesso!'
@@ -411,25 +437,21 @@ def upload_category_image():
         return jsonify({'message': 'Nenhum arquivo selecionado!'}), 400
     
     # Verificar extensão do arquivo
-    allowed_extensions = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
-    if '.' not in file.filename or file.filename.rsplit('.', 1)[1].lower() not in allowed_extensions:
+    if not allowed_image(file.filename):
         return jsonify({'message': 'Extensão de arquivo não permitida!'}), 400
     
-    # Salvar arquivo
-    filename = secure_filename(file.filename)
-    upload_folder = os.path.join(current_app.static_folder, 'images', 'categories')
-    
-    # Criar pasta se não existir
-    if not os.path.exists(upload_folder):
-        os.makedirs(upload_folder)
-    
-    file_path = os.path.join(upload_folder, filename)
-    file.save(file_path)
+    # Salvar o original (nome pelo hash do conteúdo) e agendar os derivados
+    try:
+        image_url, queued = save_upload(file, 'categories')
+    except InvalidImage:
+        return jsonify({'message': 'Arquivo de imagem inválido!'}), 400
     
-    # Retornar URL da imagem
-    image_url = f'/static/images/categories/{filename}'
+    if queued:
+        db.session.commit()
+        wake_workers()
     
     return jsonify({
         'url': image_url,
+        'srcset': image_srcset(image_url),
         'message': 'Imagem enviada com sucesso!'
     }), 201
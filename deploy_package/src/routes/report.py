@@ -0,0 +1,153 @@
+from flask import Blueprint, jsonify, request
+from src.models.order import Order, OrderItem, db
+from src.models.product import Product, Category
+from src.utils.auth import verify_token
+import datetime
+from sqlalchemy import desc, func
+
+report_bp = Blueprint('report', __name__)
+
+# Relatórios de vendas por período, produto e categoria.
+#
+# Cada relatório é uma única consulta GROUP BY sobre order_items + orders,
+# filtrada por um intervalo de created_at (que usa o índice
+# ix_orders_created_at_status). Pedidos cancelados não entram nos totais.
+
+# Agrupamentos de período aceitos em ?group=
+PERIODS = {
+    'day': lambda column: func.date(column),
+    # Semana começando na segunda-feira
+    'week': lambda column: func.date(column, '-6 days', 'weekday 1'),
+    'month': lambda column: func.strftime('%Y-%m', column)
+}
+
+# Intervalo padrão quando start/end não são informados e o maior aceito
+DEFAULT_RANGE_DAYS = 30
+MAX_RANGE_DAYS = 366
+
+class ReportError(ValueError):
+    pass
+
+def parse_date(name, default):
+    value = request.args.get(name)
+    
+    if not value:
+        return default
+    
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise ReportError(f'Data inválida em {name}, use AAAA-MM-DD!')
+
+def parse_report_args(default_group=None):
+    """Lê start, end (inclusivos) e group da query string"""
+    end = parse_date('end', datetime.datetime.utcnow().date())
+    start = parse_date('start', end - datetime.timedelta(days=DEFAULT_RANGE_DAYS - 1))
+    
+    if start > end:
+        raise ReportError('A data inicial deve ser anterior à final!')
+    
+    if (end - start).days >= MAX_RANGE_DAYS:
+        raise ReportError(f'O intervalo máximo é de {MAX_RANGE_DAYS} dias!')
+    
+    group = request.args.get('group', default_group)
+    
+    if group is not None and group not in PERIODS:
+        raise ReportError(f'Agrupamento inválido, use {", ".join(PERIODS)}!')
+    
+    return start, end, group
+
+def sales_query(start, end, group, keys=(), details=()):
+    """Consulta base sobre os itens de pedidos não cancelados criados entre start e end.
+    
+    `keys` são as colunas do GROUP BY (além do período, se houver) e
+    `details` colunas extras já agregadas, como o nome do produto.
+    """
+    keys = list(keys)
+    
+    if group:
+        keys.insert(0, PERIODS[group](Order.created_at).label('period'))
+    
+    query = db.session.query(
+        *keys,
+        *details,
+        func.sum(OrderItem.price * OrderItem.quantity).label('revenue'),
+        func.sum(OrderItem.quantity).label('quantity'),
+        func.count(func.distinct(Order.id)).label('orders')
+    ).select_from(Order).join(OrderItem, OrderItem.order_id == Order.id).filter(
+        Order.created_at >= datetime.datetime.combine(start, datetime.time.min),
+        Order.created_at < datetime.datetime.combine(end + datetime.timedelta(days=1), datetime.time.min),
+        Order.status != 'cancelled'
+    )
+    
+    if keys:
+        query = query.group_by(*keys)
+    
+    # Por período em ordem cronológica e, dentro dele, por receita
+    return query.order_by(*(['period'] if group else []), desc('revenue'))
+
+def report_response(query):
+    result = []
+    
+    for row in query:
+        entry = dict(row._mapping)
+        entry['revenue'] = round(entry['revenue'] or 0, 2)
+        result.append(entry)
+    
+    return jsonify(result), 200
+
+@report_bp.route('/sales', methods=['GET'])
+def get_sales_report():
+    # Verificar token
+    data, error, code = verify_token(admin_required=True)
+    if error:
+        return jsonify(error), code
+    
+    try:
+        start, end, group = parse_report_args(default_group='day')
+    except ReportError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    query = sales_query(start, end, group)
+    
+    return report_response(query)
+
+@report_bp.route('/products', methods=['GET'])
+def get_products_report():
+    # Verificar token
+    data, error, code = verify_token(admin_required=True)
+    if error:
+        return jsonify(error), code
+    
+    try:
+        start, end, group = parse_report_args()
+    except ReportError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    # O nome vem do item (gravado no pedido), então produtos excluídos continuam no relatório
+    query = sales_query(
+        start, end, group,
+        keys=[OrderItem.product_id.label('product_id')],
+        details=[func.max(OrderItem.product_name).label('product_name')]
+    )
+    
+    return report_response(query)
+
+@report_bp.route('/categories', methods=['GET'])
+def get_categories_report():
+    # Verificar token
+    data, error, code = verify_token(admin_required=True)
+    if error:
+        return jsonify(error), code
+    
+    try:
+        start, end, group = parse_report_args()
+    except ReportError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    query = sales_query(
+        start, end, group,
+        keys=[Category.id.label('category_id'), Category.name.label('category_name')]
+    ).join(Product, Product.id == OrderItem.product_id).join(Category, Category.id == Product.category_id)
+    
+    return report_response(query)
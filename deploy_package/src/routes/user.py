@@ -1,11 +1,28 @@
 from flask import Blueprint, jsonify, request, current_app
 from src.models.user import User, db
-from werkzeug.security import generate_password_hash, check_password_hash
+from src.utils.auth import verify_token
+from src.utils.passwords import PasswordHashingBusy, hash_password, verify_password
 import jwt
 import datetime
 
 user_bp = Blueprint('user', __name__)
 
+@user_bp.errorhandler(PasswordHashingBusy)
+def password_hashing_busy(error):
+    response = jsonify({'message': 'Servidor ocupado, tente novamente em instantes!'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+# Confere a senha e, se o hash for antigo (outro método ou custo), grava de novo
+def check_user_password(user, password):
+    valid, needs_rehash = verify_password(user.password, password)
+    
+    if needs_rehash:
+        user.password = hash_password(password)
+        db.session.commit()
+    
+    return valid
+
 @user_bp.route('/register', methods=['POST'])
 def register():
     data = request.get_json()
@@ -16,7 +33,7 @@ def register():
         return jsonify({'message': 'Usuário já existe!'}), 409
     
     # Criar novo usuário
-    hashed_password = generate_password_hash(data['password'], method='sha256')
+    hashed_password = hash_password(data['password'])
     new_user = User(
         name=data['name'],
         email=data['email'],
@@ -46,7 +63,7 @@ def login():
     
     user = User.query.filter_by(email=data['email']).first()
     
-    if not user or not check_password_hash(user.password, data['password']):
+    if not user or not check_user_password(user, data['password']):
         return jsonify({'message': 'Credenciais inválidas!'}), 401
     
     # Gerar token
@@ -69,7 +86,7 @@ def admin_login():
     
     user = User.query.filter_by(email=data['email']).first()
     
-    if not user or not check_password_hash(user.password, data['password']) or user.role != 'admin':
+    if not user or not check_user_password(user, data['password']) or user.role != 'admin':
         return jsonify({'message': 'Credenciais inválidas ou usuário sem permissão!'}), 401
     
     # Gerar token
@@ -90,65 +107,55 @@ def admin_login():
 @user_bp.route('/profile', methods=['GET'])
 def get_profile():
     # Verificar token
-    token = request.headers.get('Authorization')
-    if not token:
-        return jsonify({'message': 'Token não fornecido!'}), 401
-    
-    try:
-        token = token.split(' ')[1]
-        data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
-        user = User.query.filter_by(id=data['user_id']).first()
-        
-        if not user:
-            return jsonify({'message': 'Usuário não encontrado!'}), 404
-        
-        return jsonify({
-            'id': user.id,
-            'name': user.name,
-            'email': user.email,
-            'role': user.role
-        }), 200
-    except:
-        return jsonify({'message': 'Token inválido!'}), 401
+    data, error, code = verify_token()
+    if error:
+        return jsonify(error), code
+    
+    user = User.query.filter_by(id=data['user_id']).first()
+    
+    if not user:
+        return jsonify({'message': 'Usuário não encontrado!'}), 404
+    
+    return jsonify({
+        'id': user.id,
+        'name': user.name,
+        'email': user.email,
+        'role': user.role
+    }), 200
 
 @user_bp.route('/profile', methods=['PUT'])
 def update_profile():
     # Verificar token
-    token = request.headers.get('Authorization')
-    if not token:
-        return jsonify({'message': 'Token não fornecido!'}), 401
-    
-    try:
-        token = token.split(' ')[1]
-        data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
-        user = User.query.filter_by(id=data['user_id']).first()
-        
-        if not user:
-            return jsonify({'message': 'Usuário não encontrado!'}), 404
-        
-        # Atualizar dados
-        update_data = request.get_json()
-        
-        if 'name' in update_data:
-            user.name = update_data['name']
-        
-        if 'email' in update_data and update_data['email'] != user.email:
-            # Verificar se o email já está em uso
-            existing_user = User.query.filter_by(email=update_data['email']).first()
-            if existing_user:
-                return jsonify({'message': 'Email já está em uso!'}), 409
-            user.email = update_data['email']
-        
-        if 'password' in update_data:
-            user.password = generate_password_hash(update_data['password'], method='sha256')
-        
-        db.session.commit()
-        
-        return jsonify({
-            'id': user.id,
-            'name': user.name,
-            'email': user.email,
-            'role': user.role
-        }), 200
-    except:
-        return jsonify({'message': 'Token inválido!'}), 401
+    data, error, code = verify_token()
+    if error:
+        return jsonify(error), code
+    
+    user = User.query.filter_by(id=data['user_id']).first()
+    
+    if not user:
+        return jsonify({'message': 'Usuário não encontrado!'}), 404
+    
+    # Atualizar dados
+    update_data = request.get_json()
+    
+    if 'name' in update_data:
+        user.name = update_data['name']
+    
+    if 'email' in update_data and update_data['email'] != user.email:
+        # Verificar se o email já está em uso
+        existing_user = User.query.filter_by(email=update_data['email']).first()
+        if existing_user:
+            return jsonify({'message': 'Email já está em uso!'}), 409
+        user.email = update_data['email']
+    
+    if 'password' in update_data:
+        user.password = hash_password(update_data['password'])
+    
+    db.session.commit()
+    
+    return jsonify({
+        'id': user.id,
+        'name': user.name,
+        'email': user.email,
+        'role': user.role
+    }), 200
@@ -0,0 +1,18 @@
+# Configurações da loja (simuladas), servidas em /api/settings
+STORE_SETTINGS = {
+    'store_name': 'Hortifruti Delivery',
+    'store_email': 'contato@hortifrutidelivery.com.br',
+    'store_phone': '(11) 99999-9999',
+    'store_address': 'Rua das Hortaliças, 123',
+    'store_open_time': '08:00',
+    'store_close_time': '20:00',
+    'delivery_fee': 5.99,
+    'min_order': 20.00,
+    'payment_methods': ['money', 'credit', 'debit', 'pix'],
+    'pix_key': 'contato@hortifrutidelivery.com.br',
+    'notifications': {
+        'new_order': True,
+        'low_stock': True,
+        'customer_message': True
+    }
+}
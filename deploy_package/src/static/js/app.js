@@ -3,9 +3,16 @@
 // Configuração da API
 const API_URL = '/api';
 
+// Produtos por página ao carregar mais (a primeira página vem do /api/bootstrap)
+const PRODUCT_PAGE_SIZE = 20;
+
 // Estado da aplicação
 let appState = {
+    settings: null,
+    // Todos os produtos já recebidos (destaques e páginas), usados pelo carrinho
     products: [],
+    featured: [],
+    productPage: { products: [], nextCursor: null },
     categories: [],
     cart: [],
     user: null,
@@ -69,22 +76,21 @@ async function loadInitialData() {
         appState.isLoading = true;
         updateUI();
         
-        // Carregar categorias
-        const categoriesResponse = await fetchWithTimeout(`${API_URL}/categories`);
-        if (categoriesResponse.ok) {
-            appState.categories = await categoriesResponse.json();
+        // Configurações, categorias, destaques e a primeira página de produtos
+        // em uma única requisição
+        const bootstrapResponse = await fetchWithTimeout(`${API_URL}/bootstrap`);
+        if (bootstrapResponse.ok) {
+            const data = await bootstrapResponse.json();
+            appState.settings = data.settings;
+            appState.categories = data.categories;
+            appState.featured = data.featured;
+            appState.productPage = { products: data.products.products, nextCursor: data.products.next_cursor };
+            rememberProducts(data.featured.concat(data.products.products));
         } else {
             // Fallback para dados offline
             appState.categories = getFallbackCategories();
-        }
-        
-        // Carregar produtos em destaque
-        const productsResponse = await fetchWithTimeout(`${API_URL}/products/featured`);
-        if (productsResponse.ok) {
-            appState.products = await productsResponse.json();
-        } else {
-            // Fallback para dados offline
-            appState.products = getFallbackProducts();
+            appState.featured = getFallbackProducts();
+            rememberProducts(appState.featured);
         }
         
         appState.isLoading = false;
@@ -92,7 +98,8 @@ async function loadInitialData() {
     } catch (error) {
         console.error('Erro ao carregar dados iniciais:', error);
         appState.isLoading = false;
-        appState.products = getFallbackProducts();
+        appState.featured = getFallbackProducts();
+        rememberProducts(appState.featured);
         appState.categories = getFallbackCategories();
         updateUI();
     }
@@ -140,8 +147,9 @@ function updateUI() {
     // Atualizar contagem do carrinho
     updateCartCount();
     
-    // Renderizar produtos em destaque
+    // Renderizar produtos em destaque e a lista de produtos
     renderFeaturedProducts();
+    renderProductList();
     
     // Atualizar UI do carrinho
     updateCartUI();
@@ -166,7 +174,7 @@ function renderFeaturedProducts() {
         return;
     }
     
-    if (appState.products.length === 0) {
+    if (appState.featured.length === 0) {
         elements.featuredProducts.innerHTML = `
             <div class="col-12 text-center py-5">
                 <p class="text-muted">Nenhum produto em destaque disponível no momento.</p>
@@ -175,12 +183,66 @@ function renderFeaturedProducts() {
         return;
     }
     
-    const productsHTML = appState.products.map(product => `
+    elements.featuredProducts.innerHTML = appState.featured.map(productCardHTML).join('');
+    bindAddToCartButtons(elements.featuredProducts);
+}
+
+// Renderizar a lista de produtos (páginas já carregadas)
+function renderProductList() {
+    const container = document.getElementById('products-container');
+    const noProducts = document.getElementById('no-products');
+    
+    if (!container || appState.isLoading) return;
+    
+    const page = appState.productPage;
+    noProducts.style.display = page.products.length === 0 ? 'block' : 'none';
+    
+    container.innerHTML = page.products.map(productCardHTML).join('') + (page.nextCursor ? `
+        <div class="col-12 text-center">
+            <button class="btn btn-outline-success load-more-products">Carregar mais produtos</button>
+        </div>
+    ` : '');
+    
+    bindAddToCartButtons(container);
+    
+    const loadMoreButton = container.querySelector('.load-more-products');
+    if (loadMoreButton) {
+        loadMoreButton.addEventListener('click', loadMoreProducts);
+    }
+}
+
+// Carregar a próxima página de produtos a partir do cursor
+async function loadMoreProducts() {
+    const page = appState.productPage;
+    
+    try {
+        const response = await fetchWithTimeout(
+            `${API_URL}/products/?limit=${PRODUCT_PAGE_SIZE}&after=${encodeURIComponent(page.nextCursor)}`
+        );
+        
+        if (!response.ok) {
+            throw new Error(`Falha ao carregar produtos (${response.status})`);
+        }
+        
+        const products = await response.json();
+        page.products = page.products.concat(products);
+        page.nextCursor = response.headers.get('X-Next-Cursor');
+        rememberProducts(products);
+        renderProductList();
+    } catch (error) {
+        console.error('Erro ao carregar produtos:', error);
+        showToast('Não foi possível carregar mais produtos.', 'danger');
+    }
+}
+
+// Card de produto usado nos destaques e na lista
+function productCardHTML(product) {
+    return `
         <div class="col-6 col-md-4 col-lg-3 fade-in">
             <div class="card product-card h-100">
                 ${product.discount ? `<div class="product-discount-badge">-${product.discount}%</div>` : ''}
                 ${product.organic ? '<div class="product-organic-badge">Orgânico</div>' : ''}
-                <img src="${product.image || '/static/images/product-placeholder.jpg'}" class="card-img-top" alt="${product.name}">
+                ${productImageHTML(product, 'card-img-top', '(min-width: 992px) 25vw, (min-width: 768px) 33vw, 50vw')}
                 <div class="card-body d-flex flex-column">
                     <h5 class="card-title">${product.name}</h5>
                     <p class="card-text text-muted small">${product.description || ''}</p>
@@ -198,12 +260,12 @@ function renderFeaturedProducts() {
                 </div>
             </div>
         </div>
-    `).join('');
-    
-    elements.featuredProducts.innerHTML = productsHTML;
-    
-    // Adicionar event listeners para botões de adicionar ao carrinho
-    document.querySelectorAll('.add-to-cart-btn').forEach(button => {
+    `;
+}
+
+// Adicionar event listeners para botões de adicionar ao carrinho
+function bindAddToCartButtons(container) {
+    container.querySelectorAll('.add-to-cart-btn').forEach(button => {
         button.addEventListener('click', (e) => {
             const productId = e.currentTarget.getAttribute('data-product-id');
             addToCart(productId);
@@ -211,6 +273,12 @@ function renderFeaturedProducts() {
     });
 }
 
+// Guardar produtos recebidos, sem repetir os que já são conhecidos
+function rememberProducts(products) {
+    const known = new Set(appState.products.map(product => product.id));
+    appState.products = appState.products.concat(products.filter(product => !known.has(product.id)));
+}
+
 // Adicionar produto ao carrinho
 function addToCart(productId) {
     const product = appState.products.find(p => p.id == productId);
@@ -287,7 +355,7 @@ function updateCartUI() {
         const cartItemsHTML = appState.cart.map(item => `
             <div class="cart-item">
                 <div class="d-flex">
-                    <img src="${item.product.image || '/static/images/product-placeholder.jpg'}" class="cart-item-img me-2" alt="${item.product.name}">
+                    ${productImageHTML(item.product, 'cart-item-img me-2', '160px')}
                     <div class="flex-grow-1">
                         <h6 class="mb-0">${item.product.name}</h6>
                         <p class="cart-item-price mb-1">R$ ${formatPrice(item.product.price)}</p>
@@ -347,7 +415,8 @@ function updateCartUI() {
     
     // Atualizar subtotal, entrega e total
     const subtotal = calculateSubtotal();
-    const delivery = subtotal > 0 ? 5.99 : 0;
+    const deliveryFee = appState.settings ? appState.settings.delivery_fee : 5.99;
+    const delivery = subtotal > 0 ? deliveryFee : 0;
     const total = subtotal + delivery;
     
     elements.cartSubtotal.textContent = `R$ ${formatPrice(subtotal)}`;
@@ -627,6 +696,24 @@ function formatPrice(price) {
     return price.toFixed(2).replace('.', ',');
 }
 
+// Imagem do produto com os tamanhos redimensionados (WebP e JPEG) quando existem
+function productImageHTML(product, className, sizes) {
+    const src = product.image || '/static/images/product-placeholder.jpg';
+    const img = `<img src="${src}" class="${className}" alt="${product.name}" loading="lazy">`;
+    
+    if (!product.image_srcset) {
+        return img;
+    }
+    
+    return `
+        <picture>
+            <source type="image/webp" srcset="${product.image_srcset.webp}" sizes="${sizes}">
+            <source type="image/jpeg" srcset="${product.image_srcset.jpg}" sizes="${sizes}">
+            ${img}
+        </picture>
+    `;
+}
+
 // Dados fallback para uso offline
 function getFallbackProducts() {
     return [
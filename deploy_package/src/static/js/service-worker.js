@@ -1,5 +1,5 @@
 // Service Worker para PWA Hortifruti Delivery
-const CACHE_NAME = 'hortifruti-delivery-v1';
+const CACHE_NAME = 'hortifruti-delivery-v2';
 const urlsToCache = [
   '/',
   '/static/css/styles.css',
@@ -0,0 +1,80 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+import jwt
+from flask import current_app, request
+
+# Verificação de token compartilhada pelas rotas.
+#
+# Os tokens já verificados ficam em um cache LRU (token -> payload), de modo
+# que requisições seguintes com o mesmo token não recalculam o HMAC. Cada
+# entrada expira no `exp` do próprio token; tokens sem `exp` não são guardados.
+
+class TokenCache:
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        with self._lock:
+            entry = self._entries.get(token)
+
+            if entry is None:
+                return None
+
+            payload, expires_at = entry
+
+            if time.time() >= expires_at:
+                del self._entries[token]
+                return None
+
+            self._entries.move_to_end(token)
+            return payload
+
+    def set(self, token, payload):
+        expires_at = payload.get('exp')
+
+        if not isinstance(expires_at, (int, float)):
+            return
+
+        with self._lock:
+            self._entries[token] = (payload, expires_at)
+            self._entries.move_to_end(token)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+token_cache = TokenCache(max_entries=int(os.environ.get('TOKEN_CACHE_SIZE', 1024)))
+
+def decode_token(token):
+    """Retorna o payload do token, verificando a assinatura só na primeira vez"""
+    payload = token_cache.get(token)
+
+    if payload is None:
+        payload = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
+        token_cache.set(token, payload)
+
+    return payload
+
+# Função auxiliar para verificar token
+def verify_token(admin_required=False):
+    token = request.headers.get('Authorization')
+    if not token:
+        return None, {'message': 'Token não fornecido!'}, 401
+
+    try:
+        token = token.split(' ')[1]
+        data = decode_token(token)
+    except (IndexError, jwt.InvalidTokenError):
+        return None, {'message': 'Token inválido!'}, 401
+
+    if admin_required and data.get('role') != 'admin':
+        return None, {'message': 'Acesso não autorizado!'}, 403
+
+    return data, None, None
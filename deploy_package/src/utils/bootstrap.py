@@ -0,0 +1,75 @@
+import hashlib
+import os
+import threading
+import time
+from flask import current_app, json, request
+
+# Resposta de /api/bootstrap, montada a partir de partes em cache.
+#
+# Cada parte (configurações, categorias, destaques, primeira página de
+# produtos) é guardada já serializada, com o seu ETag. A resposta apenas
+# concatena os corpos, e o ETag dela combina os ETags das partes, então um
+# If-None-Match válido recebe 304 sem consultar o banco.
+#
+# As rotas que alteram produtos ou categorias chamam invalidate_bootstrap().
+# Como cada worker do gunicorn tem sua própria cópia, as partes também expiram
+# após BOOTSTRAP_CACHE_TTL segundos (padrão 30).
+
+class BootstrapCache:
+    def __init__(self, ttl=30):
+        self.ttl = ttl
+        self.generation = 0
+        self._parts = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        with self._lock:
+            self.generation += 1
+            self._parts.clear()
+
+    def part(self, name, build):
+        """Parte `name` do cache, montada com `build` quando não há ou expirou"""
+        with self._lock:
+            part = self._parts.get(name)
+            generation = self.generation
+
+        if part is not None and time.monotonic() < part['expires_at']:
+            return part
+
+        body = json.dumps(build()).encode('utf-8')
+        part = {
+            'body': body,
+            'etag': hashlib.sha256(body).hexdigest(),
+            'expires_at': time.monotonic() + self.ttl
+        }
+
+        with self._lock:
+            # Não guardar uma parte montada antes de uma escrita concorrente
+            if generation == self.generation:
+                self._parts[name] = part
+
+        return part
+
+bootstrap_cache = BootstrapCache(ttl=float(os.environ.get('BOOTSTRAP_CACHE_TTL', 30)))
+
+def invalidate_bootstrap():
+    """Deve ser chamada após cada commit que altera produtos ou categorias"""
+    bootstrap_cache.invalidate()
+
+def bootstrap_response(parts):
+    """Resposta JSON {nome: valor, ...} para as partes (nome, função que monta o valor)"""
+    entries = [(name, bootstrap_cache.part(name, build)) for name, build in parts]
+
+    body = b'{' + b','.join(b'"%s":%s' % (name.encode(), entry['body']) for name, entry in entries) + b'}'
+    etag = hashlib.sha256('-'.join(entry['etag'] for _, entry in entries).encode()).hexdigest()
+
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(body, status=200, mimetype='application/json')
+
+    response.set_etag(etag)
+    # O navegador pode guardar a resposta, mas deve revalidar a cada uso
+    response.headers['Cache-Control'] = 'no-cache'
+
+    return response
@@ -0,0 +1,192 @@
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+from flask import current_app
+from src.utils.bootstrap import invalidate_bootstrap
+from src.utils.jobs import enqueue, job_handler
+
+try:
+    from PIL import Image, ImageOps, UnidentifiedImageError
+except ImportError:  # sem o Pillow as imagens são salvas sem os derivados
+    Image = None
+
+# Imagens enviadas pelo painel (produtos e categorias).
+#
+# O original é salvo com o hash do conteúdo no nome
+# (static/images/products/3f9a1c2b7d4e5f60.jpg), então reenviar a mesma foto
+# reaproveita o arquivo. Os derivados redimensionados são gerados pela fila de
+# tarefas, ao lado do original: <hash>-<largura>.webp e <hash>-<largura>.jpg,
+# com a largura real de cada arquivo. Por último a tarefa grava <hash>.json
+# com as larguras geradas por formato; o srcset só é oferecido a partir dele,
+# então uma imagem cujos derivados ainda não existem (ou cuja tarefa falhou)
+# aparece só com o original.
+
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+HASH_LENGTH = 16
+
+# Larguras dos derivados; imagens menores não são ampliadas, e no lugar das
+# larguras maiores que o original entra um derivado com a largura dele
+IMAGE_WIDTHS = (160, 320, 640)
+# (extensão, formato do Pillow, opções de gravação), o primeiro é o preferido
+IMAGE_FORMATS = (
+    ('webp', 'WEBP', {'quality': 80, 'method': 6}),
+    ('jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+
+UPLOAD_URL_RE = re.compile(r'^/static/(images/(?:products|categories)/[0-9a-f]{%d})\.[a-z]+$' % HASH_LENGTH)
+
+# Manifestos já lidos (base -> larguras por formato); não mudam depois de gravados
+_manifests = {}
+_manifests_lock = threading.Lock()
+
+class InvalidImage(ValueError):
+    pass
+
+def allowed_image(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+def manifest_path(base):
+    return os.path.join(current_app.static_folder, f'{base}.json')
+
+def read_manifest(base):
+    """Larguras geradas por formato, ex. {'webp': [160, 320], 'jpg': [160, 320]},
+    ou None enquanto a tarefa não gravou o manifesto"""
+    with _manifests_lock:
+        manifest = _manifests.get(base)
+
+    if manifest is not None:
+        return manifest
+
+    try:
+        with open(manifest_path(base)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    with _manifests_lock:
+        _manifests[base] = manifest
+
+    return manifest
+
+def write_atomic(path, write):
+    # Grava em um temporário e renomeia, para nunca servir um arquivo pela metade
+    temporary = f'{path}.{os.getpid()}.tmp'
+
+    try:
+        write(temporary)
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+def save_upload(file, folder):
+    """Salva a imagem enviada em static/images/<folder> e agenda os derivados.
+
+    Retorna (url, queued); com queued=True há uma tarefa na transação atual,
+    que precisa de commit. Levanta InvalidImage se o arquivo não for uma imagem.
+    """
+    content = file.read()
+
+    if Image is not None:
+        try:
+            with Image.open(io.BytesIO(content)) as image:
+                image.verify()
+        except (UnidentifiedImageError, OSError, SyntaxError) as e:
+            raise InvalidImage(str(e))
+
+    extension = file.filename.rsplit('.', 1)[1].lower().replace('jpeg', 'jpg')
+    base = f'images/{folder}/{hashlib.sha256(content).hexdigest()[:HASH_LENGTH]}'
+    path = os.path.join(current_app.static_folder, f'{base}.{extension}')
+
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        def write(temporary):
+            with open(temporary, 'wb') as f:
+                f.write(content)
+
+        write_atomic(path, write)
+
+    # Reenvios da mesma imagem não geram os derivados de novo
+    queued = Image is not None and not os.path.exists(manifest_path(base))
+
+    if queued:
+        enqueue('image_derivatives', {'path': f'{base}.{extension}'})
+
+    return f'/static/{base}.{extension}', queued
+
+def image_srcset(url):
+    """srcset de cada formato para uma imagem enviada pelo painel, ex.:
+
+        {'webp': '/static/images/products/<hash>-160.webp 160w, ...', 'jpg': '...'}
+
+    None para imagens sem derivados gerados (ainda na fila, tarefa que falhou,
+    URLs externas ou anteriores ao hash no nome).
+    """
+    match = UPLOAD_URL_RE.match(url or '')
+
+    if match is None:
+        return None
+
+    manifest = read_manifest(match.group(1))
+
+    if not manifest:
+        return None
+
+    return {
+        extension: ', '.join(f'/static/{match.group(1)}-{width}.{extension} {width}w' for width in widths)
+        for extension, widths in manifest.items()
+    }
+
+@job_handler('image_derivatives')
+def generate_image_derivatives(payload):
+    source = os.path.join(current_app.static_folder, payload['path'])
+    base = os.path.splitext(source)[0]
+    manifest = f'{base}.json'
+
+    # Reenvio agendado antes da primeira tarefa terminar
+    if os.path.exists(manifest):
+        return
+
+    with Image.open(source) as original:
+        # Fotos de celular vêm giradas pela orientação EXIF
+        image = ImageOps.exif_transpose(original)
+        image.load()
+
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+
+    # JPEG não tem transparência: fundo branco
+    opaque = image
+
+    if image.mode == 'RGBA':
+        opaque = Image.new('RGB', image.size, (255, 255, 255))
+        opaque.paste(image, mask=image.getchannel('A'))
+
+    generated = {extension: [] for extension, _, _ in IMAGE_FORMATS}
+
+    for width in IMAGE_WIDTHS:
+        for extension, format, options in IMAGE_FORMATS:
+            resized = (opaque if format == 'JPEG' else image).copy()
+            resized.thumbnail((width, width * 4), Image.LANCZOS)
+
+            # O nome e o descritor do srcset usam a largura real: imagens
+            # estreitas (ou muito altas) ficam menores que a largura pedida
+            if resized.width in generated[extension]:
+                continue
+
+            write_atomic(f'{base}-{resized.width}.{extension}', lambda path: resized.save(path, format, **options))
+            generated[extension].append(resized.width)
+
+    def write(temporary):
+        with open(temporary, 'w') as f:
+            json.dump(generated, f)
+
+    write_atomic(manifest, write)
+
+    # Nos outros processos as partes do bootstrap expiram pelo TTL
+    invalidate_bootstrap()
+    current_app.logger.info('Derivados gerados para %s: %s', payload['path'], generated)
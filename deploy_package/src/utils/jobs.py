@@ -0,0 +1,235 @@
+import logging
+import os
+import random
+import signal
+import socket
+import threading
+import traceback
+import uuid
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import and_, or_, select
+from src.models.db import db
+from src.models.job import Job
+
+# Fila de tarefas em segundo plano gravada no SQLite (tabela jobs).
+#
+# As rotas chamam enqueue() dentro da própria transação: a tarefa só existe
+# se o pedido for gravado, e nada é executado durante a requisição. Depois
+# do commit, wake_workers() acorda as threads do processo para não esperar o
+# próximo ciclo de consulta.
+#
+# As tarefas são executadas por um processo separado com `flask worker` ou,
+# com JOB_WORKER_THREADS > 0, por threads iniciadas em cada processo do
+# Gunicorn pelo gancho post_worker_init de gunicorn.conf.py, nunca durante
+# uma requisição. Cada tarefa é reservada com um único UPDATE, então vários
+# processos podem consumir a mesma fila. Uma tarefa que falha é tentada de
+# novo com espera exponencial e, esgotadas as JOB_MAX_ATTEMPTS tentativas,
+# fica com status dead até ser reenviada com `flask retry-dead-jobs`.
+JOB_DEFAULTS = {
+    # Threads de worker em cada processo do Gunicorn (0 = somente `flask worker`)
+    'JOB_WORKER_THREADS': 0,
+    'JOB_MAX_ATTEMPTS': 5,
+    # Espera (s) antes da primeira nova tentativa, dobrando a cada falha
+    'JOB_RETRY_BASE': 5,
+    'JOB_RETRY_MAX': 600,
+    # Intervalo (s) entre consultas à fila quando ela está vazia
+    'JOB_POLL_INTERVAL': 2.0,
+    # Uma tarefa running há mais tempo que isso (s) é de um worker que parou
+    'JOB_LOCK_TIMEOUT': 300
+}
+
+logger = logging.getLogger(__name__)
+
+# Tipo da tarefa -> função que recebe o payload
+HANDLERS = {}
+
+_wake = threading.Event()
+_lock = threading.Lock()
+_in_process = {'pid': None, 'worker': None}
+
+def job_setting(config, key):
+    default = JOB_DEFAULTS[key]
+    return type(default)(config.get(key, os.environ.get(key, default)))
+
+def job_handler(job_type):
+    """Registra a função que executa as tarefas do tipo informado"""
+    def register(function):
+        HANDLERS[job_type] = function
+        return function
+
+    return register
+
+def enqueue(job_type, payload, delay=0):
+    """Adiciona a tarefa na transação atual da sessão"""
+    if job_type not in HANDLERS:
+        raise ValueError(f'Tipo de tarefa desconhecido: {job_type}')
+
+    now = datetime.utcnow()
+    db.session.execute(Job.__table__.insert().values(
+        type=job_type,
+        payload=payload,
+        status='pending',
+        attempts=0,
+        max_attempts=job_setting(current_app.config, 'JOB_MAX_ATTEMPTS'),
+        run_at=now + timedelta(seconds=delay),
+        created_at=now
+    ))
+
+def wake_workers():
+    """Acorda as threads de worker deste processo (chamar após o commit)"""
+    _wake.set()
+
+def claim_job(worker_name, lock_timeout):
+    """Reserva a próxima tarefa pronta; retorna a linha ou None"""
+    jobs = Job.__table__
+    now = datetime.utcnow()
+    token = f'{worker_name}:{uuid.uuid4().hex}'
+
+    candidate = select(jobs.c.id).where(or_(
+        and_(jobs.c.status == 'pending', jobs.c.run_at <= now),
+        and_(jobs.c.status == 'running', jobs.c.locked_at < now - timedelta(seconds=lock_timeout))
+    )).order_by(jobs.c.run_at, jobs.c.id).limit(1)
+
+    # O UPDATE é o primeiro comando da transação, então lê e reserva de
+    # forma atômica mesmo com outros workers disputando a mesma tarefa
+    with db.engine.begin() as connection:
+        claimed = connection.execute(
+            jobs.update()
+            .where(jobs.c.id.in_(candidate))
+            .values(status='running', locked_by=token, locked_at=now, attempts=jobs.c.attempts + 1)
+        ).rowcount
+
+        if not claimed:
+            return None
+
+        return connection.execute(select(jobs).where(jobs.c.locked_by == token)).first()
+
+def retry_delay(config, attempts):
+    base = job_setting(config, 'JOB_RETRY_BASE')
+    delay = min(base * 2 ** (attempts - 1), job_setting(config, 'JOB_RETRY_MAX'))
+
+    # Variação para que tarefas que falharam juntas não voltem juntas
+    return delay * random.uniform(0.8, 1.2)
+
+def finish_job(job, error=None):
+    """Apaga a tarefa concluída ou agenda a nova tentativa (ou dead)"""
+    jobs = Job.__table__
+    mine = and_(jobs.c.id == job.id, jobs.c.locked_by == job.locked_by)
+
+    with db.engine.begin() as connection:
+        if error is None:
+            connection.execute(jobs.delete().where(mine))
+            return
+
+        values = {'locked_by': None, 'locked_at': None, 'last_error': error[-2000:]}
+
+        if job.attempts >= job.max_attempts:
+            values['status'] = 'dead'
+        else:
+            values['status'] = 'pending'
+            values['run_at'] = datetime.utcnow() + timedelta(
+                seconds=retry_delay(current_app.config, job.attempts)
+            )
+
+        connection.execute(jobs.update().where(mine).values(**values))
+
+def run_job(job):
+    handler = HANDLERS.get(job.type)
+
+    try:
+        if handler is None:
+            raise LookupError(f'Tipo de tarefa desconhecido: {job.type}')
+
+        handler(job.payload)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        logger.exception('Tarefa %s (%s) falhou na tentativa %s', job.id, job.type, job.attempts)
+        finish_job(job, traceback.format_exc())
+    else:
+        finish_job(job)
+
+def retry_dead_jobs():
+    """Devolve à fila as tarefas dead; retorna quantas"""
+    jobs = Job.__table__
+
+    with db.engine.begin() as connection:
+        return connection.execute(
+            jobs.update()
+            .where(jobs.c.status == 'dead')
+            .values(status='pending', attempts=0, run_at=datetime.utcnow())
+        ).rowcount
+
+class JobWorker:
+    """Threads que consomem a fila até stop() ser chamado"""
+
+    def __init__(self, app, threads):
+        self.app = app
+        self.threads = []
+        self.stopping = threading.Event()
+        self.poll_interval = job_setting(app.config, 'JOB_POLL_INTERVAL')
+        self.lock_timeout = job_setting(app.config, 'JOB_LOCK_TIMEOUT')
+
+        for index in range(threads):
+            name = f'{socket.gethostname()}:{os.getpid()}:{index}'
+            self.threads.append(threading.Thread(target=self.run, args=(name,), name=f'job-worker-{index}', daemon=True))
+
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        self.stopping.set()
+        _wake.set()
+
+    def join(self, timeout=None):
+        for thread in self.threads:
+            thread.join(timeout)
+
+    def run(self, name):
+        while not self.stopping.is_set():
+            job = None
+
+            try:
+                # Um contexto por tarefa: a sessão é descartada ao sair
+                with self.app.app_context():
+                    job = claim_job(name, self.lock_timeout)
+
+                    if job is not None:
+                        run_job(job)
+            except Exception:
+                logger.exception('Erro no worker de tarefas %s', name)
+
+            if job is None:
+                _wake.wait(self.poll_interval)
+                _wake.clear()
+
+    def run_forever(self):
+        """Executa em primeiro plano até SIGINT ou SIGTERM"""
+        signal.signal(signal.SIGTERM, lambda signum, frame: self.stop())
+        self.start()
+
+        try:
+            while not self.stopping.is_set():
+                self.stopping.wait(1)
+        except KeyboardInterrupt:
+            self.stop()
+
+        self.join()
+
+def start_in_process_workers(app):
+    """Inicia as threads de worker deste processo, uma vez por pid"""
+    threads = job_setting(app.config, 'JOB_WORKER_THREADS')
+
+    if threads <= 0:
+        return None
+
+    with _lock:
+        # Após um fork (gunicorn --preload) as threads do processo pai não existem
+        if _in_process['pid'] != os.getpid():
+            worker = JobWorker(app, threads)
+            worker.start()
+            _in_process.update(pid=os.getpid(), worker=worker)
+
+        return _in_process['worker']
@@ -0,0 +1,48 @@
+from flask import current_app
+from src.models.order import Order
+from src.models.product import Product, LowStockProduct
+from src.settings import STORE_SETTINGS
+from src.utils.jobs import enqueue, job_handler
+
+# Notificações da loja, executadas pela fila de tarefas (src/utils/jobs.py)
+# conforme STORE_SETTINGS['notifications']. Por enquanto são registradas no
+# log do app; o envio por e-mail ou push entra nestas funções.
+
+def notification_enabled(name):
+    return bool(STORE_SETTINGS['notifications'].get(name))
+
+def enqueue_order_notifications(order):
+    """Agenda as notificações de um pedido novo na transação atual"""
+    if notification_enabled('new_order'):
+        enqueue('new_order', {'order_id': order.id})
+
+def enqueue_low_stock_notification(product_ids):
+    """Agenda o aviso dos produtos que acabaram de entrar no estoque baixo"""
+    if notification_enabled('low_stock'):
+        enqueue('low_stock', {'product_ids': list(product_ids)})
+
+@job_handler('new_order')
+def notify_new_order(payload):
+    order = Order.query.get(payload['order_id'])
+
+    if order is None:
+        return
+
+    current_app.logger.info(
+        'Novo pedido #%s de %s: R$ %.2f (%s itens)',
+        order.id, order.customer_name, order.total, len(order.items)
+    )
+
+@job_handler('low_stock')
+def notify_low_stock(payload):
+    # Só os que continuam com estoque baixo quando a tarefa executa
+    products = Product.query.filter(
+        Product.id.in_(payload['product_ids']),
+        Product.id.in_(LowStockProduct.query.with_entities(LowStockProduct.product_id))
+    ).all()
+
+    for product in products:
+        current_app.logger.warning(
+            'Estoque baixo: %s (%s %s, reposição em %s)',
+            product.name, product.stock, product.unit, product.reorder_level
+        )
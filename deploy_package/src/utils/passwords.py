@@ -0,0 +1,90 @@
+import hmac
+import os
+import threading
+from flask import current_app
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+# Hash de senhas com algoritmo e custo configuráveis.
+#
+# PASSWORD_HASH_METHOD segue o formato do Werkzeug, por exemplo
+# "pbkdf2:sha256:600000" (algoritmo e número de iterações). Quando o valor
+# muda, os hashes antigos continuam válidos e são refeitos no próximo login.
+#
+# O hash roda na própria thread da requisição; PASSWORD_HASH_CONCURRENCY limita
+# quantos hashes cada processo calcula ao mesmo tempo. Sem vaga (esperando no
+# máximo PASSWORD_HASH_TIMEOUT segundos, por padrão nenhum), a requisição falha
+# na hora com PasswordHashingBusy (503), e as demais threads do processo ficam
+# livres para o resto da API durante uma rajada de logins. O limite só tem
+# efeito se for menor que o número de requisições simultâneas por processo
+# (as threads do gunicorn -k gthread).
+PASSWORD_DEFAULTS = {
+    'PASSWORD_HASH_METHOD': f'pbkdf2:sha256:{DEFAULT_PBKDF2_ITERATIONS}',
+    'PASSWORD_HASH_CONCURRENCY': 2,
+    'PASSWORD_HASH_TIMEOUT': 0.0
+}
+
+# Prefixos dos métodos de hash do Werkzeug; o resto é senha antiga em texto puro
+HASH_METHOD_PREFIXES = ('pbkdf2:', 'scrypt:')
+
+class PasswordHashingBusy(RuntimeError):
+    pass
+
+_slots = None
+_lock = threading.Lock()
+
+def password_setting(key):
+    return current_app.config.get(key, os.environ.get(key, PASSWORD_DEFAULTS[key]))
+
+def hash_method():
+    method = str(password_setting('PASSWORD_HASH_METHOD')).strip()
+
+    # "pbkdf2:sha256" sem iterações vira o padrão do Werkzeug, que é o que
+    # fica gravado no hash; assim a comparação em needs_rehash é exata
+    if method.startswith('pbkdf2:') and method.count(':') == 1:
+        method = f'{method}:{DEFAULT_PBKDF2_ITERATIONS}'
+
+    return method
+
+def get_slots():
+    global _slots
+
+    with _lock:
+        if _slots is None:
+            _slots = threading.BoundedSemaphore(int(password_setting('PASSWORD_HASH_CONCURRENCY')))
+
+    return _slots
+
+def run_hashing(function, *args):
+    slots = get_slots()
+    timeout = float(password_setting('PASSWORD_HASH_TIMEOUT'))
+
+    if not (slots.acquire(timeout=timeout) if timeout > 0 else slots.acquire(blocking=False)):
+        raise PasswordHashingBusy('Muitas requisições de autenticação simultâneas')
+
+    try:
+        return function(*args)
+    finally:
+        slots.release()
+
+def is_password_hash(value):
+    # Hashes do Werkzeug têm o formato "método$salt$hash"
+    return value is not None and value.startswith(HASH_METHOD_PREFIXES) and value.count('$') >= 2
+
+def hash_password(password):
+    return run_hashing(generate_password_hash, password, hash_method())
+
+def verify_password(stored, password):
+    """Confere a senha; retorna (válida, precisa_refazer_hash).
+
+    Senhas gravadas antes do hash (texto puro) são aceitas e marcadas para
+    serem refeitas, assim como hashes com método ou custo diferente do atual.
+    """
+    if not stored:
+        return False, False
+
+    if not is_password_hash(stored):
+        valid = hmac.compare_digest(stored.encode('utf-8'), password.encode('utf-8'))
+        return valid, valid
+
+    valid = run_hashing(check_password_hash, stored, password)
+    return valid, valid and stored.split('$', 1)[0] != hash_method()
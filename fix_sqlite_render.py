@@ -16,4 +16,7 @@ def get_database_path():
     # Certifique-se de que o diretório existe
     os.makedirs(os.path.dirname(db_path), exist_ok=True)
     
+    # A URI continua simples: journal_mode=WAL, synchronous, busy_timeout,
+    # mmap_size, cache_size e foreign_keys são aplicados em cada conexão
+    # pelo perfil SQLITE_* de src/models/db.py
     return f"sqlite:///{db_path}"
@@ -1,8 +1,12 @@
 import os
 import datetime
-import jwt
-from flask import Flask, jsonify, request, send_from_directory
+import time
+import click
+from flask import Flask, jsonify
+from flask.cli import with_appcontext
 from flask_cors import CORS
+from src.utils.assets import assets_build_dir, build_assets, init_assets, load_pages, send_page
+from src.utils.static_index import init_static_index
 
 # Função para obter o caminho correto do banco de dados
 def get_database_path():
@@ -12,79 +16,105 @@ def get_database_path():
     if os.environ.get('RENDER'):
         # No Render, use a pasta tmp que tem permissão de escrita
         db_path = "/tmp/hortifruti.db"
-        # Certifique-se de que o diretório existe
-        os.makedirs(os.path.dirname(db_path), exist_ok=True)
     else:
-        # Localmente, use o caminho padrão
-        db_path = "instance/hortifruti.db"
-        # Certifique-se de que o diretório existe
-        os.makedirs("instance", exist_ok=True)
+        # Localmente, use a pasta instance ao lado deste arquivo
+        db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "hortifruti.db")
     
+    # Certifique-se de que o diretório existe
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    
+    # Os PRAGMAs de cada conexão (WAL, busy_timeout, mmap etc.) são aplicados
+    # pelo perfil SQLITE_* definido em src/models/db.py
     return f"sqlite:///{db_path}"
 
 # Importar db do novo arquivo
 from src.models.db import db
 
-app = Flask(__name__, static_folder='static')
-app.config['SQLALCHEMY_DATABASE_URI'] = get_database_path()
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'hortifruti-delivery-secret-key')
-
-# Inicializar o db com o app
-db.init_app(app)
-
-# Configurar CORS
-CORS(app, resources={r"/api/*": {"origins": "*"}})
-
-# Importar blueprints
-from src.routes.user import user_bp
-from src.routes.product import product_bp
-from src.routes.category import category_bp
-from src.routes.order import order_bp
-from src.routes.order_item import order_item_bp
-
-# Registrar blueprints
-app.register_blueprint(user_bp)
-app.register_blueprint(product_bp)
-app.register_blueprint(category_bp)
-app.register_blueprint(order_bp)
-app.register_blueprint(order_item_bp)
-
-# Rota para servir arquivos estáticos
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve(path):
-    if path != "" and os.path.exists(app.static_folder + '/' + path):
-        return send_from_directory(app.static_folder, path)
-    else:
-        return send_from_directory(app.static_folder, 'index.html')
-
-# Rota de verificação de saúde da API
-@app.route('/api/health', methods=['GET'])
-def health_check():
-    return jsonify({
-        'status': 'ok',
-        'message': 'API Hortifruti Delivery funcionando!'
-    }), 200
+def create_app():
+    """Cria e configura o app. Não acessa o banco de dados: o schema e os dados
+    iniciais são preparados no deploy pelos comandos `flask init-db` e `flask seed`."""
+    started = time.perf_counter()
+    
+    app = Flask(__name__, static_folder='static')
+    app.config['SQLALCHEMY_DATABASE_URI'] = get_database_path()
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'hortifruti-delivery-secret-key')
+    
+    # Nível de log do app (o perfil do SQLite é registrado em INFO)
+    app.logger.setLevel(os.environ.get('LOG_LEVEL', 'INFO'))
+    
+    # Inicializar o db com o app
+    db.init_app(app)
+    
+    # Configurar CORS
+    CORS(app, resources={r"/api/*": {"origins": "*"}})
+    
+    # Importar blueprints
+    from src.routes.user import user_bp
+    from src.routes.product import product_bp
+    from src.routes.category import category_bp
+    from src.routes.order import order_bp
+    from src.routes.order_item import order_item_bp
+    from src.routes.catalog import catalog_bp
+    
+    # Registrar blueprints
+    app.register_blueprint(user_bp)
+    app.register_blueprint(product_bp)
+    app.register_blueprint(category_bp)
+    app.register_blueprint(order_bp)
+    app.register_blueprint(order_item_bp)
+    app.register_blueprint(catalog_bp)
+    
+    # Arquivos com hash em /assets e páginas reescritas (gerados por `flask build-assets`)
+    init_assets(app)
+    # Índice de src/static e páginas em memória, montados uma vez por processo
+    init_static_index(app, load_pages)
+    
+    # Rota para servir arquivos estáticos
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        static_index = app.extensions['static_index']
+        
+        # Páginas reescritas pelo build têm prioridade sobre os originais
+        if path in app.extensions['pages']:
+            return send_page(path)
+        elif path != "" and path in static_index:
+            return static_index.send(path)
+        else:
+            return send_page('index.html')
+    
+    # Rota de verificação de saúde da API
+    @app.route('/api/health', methods=['GET'])
+    def health_check():
+        return jsonify({
+            'status': 'ok',
+            'message': 'API Hortifruti Delivery funcionando!'
+        }), 200
+    
+    # Comandos de linha de comando executados uma vez por deploy
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(seed_command)
+    app.cli.add_command(build_assets_command)
+    
+    app.logger.info('App pronto em %.1f ms', (time.perf_counter() - started) * 1000)
+    
+    return app
 
-# Função para criar tabelas e dados iniciais
-@app.before_first_request
-def create_tables_and_initial_data():
+# Função para criar os dados iniciais (admin, categorias e produtos)
+def seed_initial_data():
     # Importar modelos
     from src.models.user import User
     from src.models.category import Category
     from src.models.product import Product
-    from src.models.order import Order
-    from src.models.order_item import OrderItem
-    
-    db.create_all()
+    from src.utils.passwords import hash_password
     
     # Criar usuário admin se não existir
     if User.query.count() == 0:
         admin = User(
             name='Administrador',
             email='admin@hortifrutidelivery.com.br',
-            password='admin123',  # Em produção, deve-se usar hash
+            password=hash_password('admin123'),
             is_admin=True,
             created_at=datetime.datetime.now()
         )
@@ -92,7 +122,7 @@ def create_tables_and_initial_data():
         user = User(
             name='Cliente Teste',
             email='cliente@teste.com',
-            password='cliente123',  # Em produção, deve-se usar hash
+            password=hash_password('cliente123'),
             is_admin=False,
             created_at=datetime.datetime.now()
         )
@@ -124,50 +154,44 @@ def create_tables_and_initial_data():
         db.session.add_all(products)
         db.session.commit()
 
-# Middleware para verificar token JWT
-def token_required(f):
-    def decorated(*args, **kwargs):
-        token = None
-        
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            if auth_header.startswith('Bearer '):
-                token = auth_header.split(' ')[1]
-        
-        if not token:
-            return jsonify({'error': 'Token não fornecido'}), 401
-        
-        try:
-            payload = jwt.decode(
-                token,
-                app.config['SECRET_KEY'],
-                algorithms=['HS256']
-            )
-            
-            # Adicionar payload ao request para uso nas rotas
-            request.user = payload
-            
-        except jwt.ExpiredSignatureError:
-            return jsonify({'error': 'Token expirado'}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({'error': 'Token inválido'}), 401
-        
-        return f(*args, **kwargs)
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Cria as tabelas e aplica as migrações pendentes."""
+    from src.migrate import upgrade
+    
+    for version, description in upgrade():
+        click.echo(f'Migração {version} aplicada: {description}')
     
-    decorated.__name__ = f.__name__
-    return decorated
+    click.echo('Banco de dados atualizado')
 
-# Middleware para verificar se o usuário é admin
-def admin_required(f):
-    def decorated(*args, **kwargs):
-        if not request.user.get('is_admin', False):
-            return jsonify({'error': 'Acesso negado'}), 403
-        
-        return f(*args, **kwargs)
+@click.command('seed')
+@with_appcontext
+def seed_command():
+    """Cria os dados iniciais se o banco estiver vazio."""
+    seed_initial_data()
+    click.echo('Dados iniciais verificados')
+
+@click.command('build-assets')
+@with_appcontext
+def build_assets_command():
+    """Gera os arquivos estáticos com hash no nome e as versões .br/.gz."""
+    from flask import current_app
     
-    decorated.__name__ = f.__name__
-    return decorated
+    build_dir = assets_build_dir(current_app)
+    manifest = build_assets(current_app.static_folder, build_dir)
+    
+    click.echo(f'{len(manifest["assets"])} arquivos e {len(manifest["pages"])} páginas gerados em {build_dir}')
+
+app = create_app()
 
 if __name__ == '__main__':
+    # Em desenvolvimento, preparar o banco antes de subir o servidor
+    from src.migrate import upgrade
+    
+    with app.app_context():
+        upgrade()
+        seed_initial_data()
+    
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=True)
@@ -0,0 +1,135 @@
+import datetime
+import logging
+from sqlalchemy import text
+from src.models.db import db
+
+# Migrações versionadas do banco de dados.
+#
+# Devem ser executadas uma vez a cada deploy, antes de iniciar os workers:
+#
+#     python -m src.migrate
+#
+# Tabelas novas são criadas pelo create_all a partir dos modelos; índices e
+# colunas em tabelas existentes são aplicados pelas migrações abaixo, em ordem
+# de versão, e registrados na tabela schema_migrations. Cada migração deve ser
+# idempotente, pois em um banco novo o create_all já cria o schema atual.
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS = []
+
+def migration(version, description):
+    def register(function):
+        MIGRATIONS.append((version, description, function))
+        return function
+
+    return register
+
+def table_columns(connection, table):
+    return {row[1] for row in connection.execute(text(f'PRAGMA table_info({table})'))}
+
+def add_column(connection, table, column, definition):
+    """ALTER TABLE ... ADD COLUMN, somente se a coluna ainda não existir"""
+    if column not in table_columns(connection, table):
+        connection.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {definition}'))
+
+def create_index(connection, name, table, columns, unique=False):
+    connection.execute(text(
+        f'CREATE {"UNIQUE " if unique else ""}INDEX IF NOT EXISTS {name} ON {table} ({", ".join(columns)})'
+    ))
+
+@migration(1, 'Índices das consultas de pedidos, itens e produtos')
+def add_hot_query_indexes(connection):
+    create_index(connection, 'ix_orders_user_id', 'orders', ['user_id'])
+    create_index(connection, 'ix_orders_created_at', 'orders', ['created_at'])
+    create_index(connection, 'ix_orders_status', 'orders', ['status'])
+    create_index(connection, 'ix_order_items_order_id', 'order_items', ['order_id'])
+    create_index(connection, 'ix_products_category_id', 'products', ['category_id'])
+    create_index(connection, 'ix_products_featured', 'products', ['featured'])
+
+@migration(2, 'Índice FTS5 de busca de produtos')
+def add_product_search_index(connection):
+    from src.models.product_search import create_search_index
+
+    create_search_index(connection)
+
+@migration(3, 'Resumo dos itens nos pedidos para o histórico')
+def add_order_summaries(connection):
+    from src.models.order import update_order_summaries
+
+    add_column(connection, 'orders', 'item_count', 'INTEGER NOT NULL DEFAULT 0')
+    add_column(connection, 'orders', 'items_preview', "VARCHAR(200) NOT NULL DEFAULT ''")
+    create_index(connection, 'ix_orders_user_id_created_at', 'orders', ['user_id', 'created_at'])
+    update_order_summaries(connection)
+
+@migration(4, 'Versão do catálogo e exclusão lógica de produtos e categorias')
+def add_catalog_versioning(connection):
+    from src.models.catalog import create_catalog_versioning
+
+    for table in ('products', 'categories'):
+        add_column(connection, table, 'version', 'INTEGER NOT NULL DEFAULT 0')
+        add_column(connection, table, 'updated_at', 'DATETIME')
+        add_column(connection, table, 'deleted_at', 'DATETIME')
+        create_index(connection, f'ix_{table}_version', table, ['version'])
+
+    create_catalog_versioning(connection)
+
+def import_models():
+    # Os modelos precisam estar registrados no metadata antes do create_all
+    from src.models.user import User
+    from src.models.category import Category
+    from src.models.product import Product
+    from src.models.order import Order
+    from src.models.order_item import OrderItem
+    from src.models.order_event import OrderEvent
+    from src.models.idempotency import IdempotencyKey
+
+def applied_versions(connection):
+    connection.execute(text(
+        'CREATE TABLE IF NOT EXISTS schema_migrations ('
+        'version INTEGER PRIMARY KEY, description VARCHAR(200) NOT NULL, applied_at DATETIME NOT NULL)'
+    ))
+    return {row[0] for row in connection.execute(text('SELECT version FROM schema_migrations'))}
+
+def upgrade():
+    """Cria as tabelas que faltam e aplica as migrações pendentes.
+
+    Deve ser chamada dentro de um contexto do app; retorna a lista de
+    (versão, descrição) aplicadas nesta execução.
+    """
+    import_models()
+    db.create_all()
+
+    with db.engine.begin() as connection:
+        applied = applied_versions(connection)
+
+    executed = []
+
+    for version, description, function in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if version in applied:
+            continue
+
+        # Cada migração é registrada logo após ser aplicada; como são
+        # idempotentes, uma migração interrompida pode ser executada de novo
+        with db.engine.begin() as connection:
+            function(connection)
+            connection.execute(
+                text('INSERT INTO schema_migrations (version, description, applied_at) VALUES (:version, :description, :applied_at)'),
+                {'version': version, 'description': description, 'applied_at': datetime.datetime.now()}
+            )
+
+        logger.info('Migração %s aplicada: %s', version, description)
+        executed.append((version, description))
+
+    return executed
+
+if __name__ == '__main__':
+    from src.main import app
+
+    with app.app_context():
+        executed = upgrade()
+
+    for version, description in executed:
+        print(f'Migração {version} aplicada: {description}')
+
+    print('Banco de dados atualizado')
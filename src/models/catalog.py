@@ -0,0 +1,99 @@
+from sqlalchemy import text
+from src.models.db import db
+
+# Versão do catálogo (produtos e categorias) para a sincronização do PWA.
+#
+# A tabela catalog_version guarda um contador único. Triggers em products e
+# categories incrementam o contador a cada INSERT ou UPDATE e gravam o novo
+# valor em `version` e a hora local em `updated_at` da linha alterada (o mesmo
+# relógio de created_at e deleted_at, gravados pelo Python), de modo que
+# qualquer escrita (rotas, baixa de estoque dos pedidos, lote ou SQL direto)
+# entra na próxima sincronização. Como o SQLite tem um único escritor por vez,
+# as versões seguem a ordem dos commits.
+#
+# Exclusões são lógicas: `deleted_at` preenchido marca a linha como removida
+# (também incrementando a versão), e ela continua no banco como tombstone.
+
+VERSIONED_TABLES = ('products', 'categories')
+
+CATALOG_VERSION_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS catalog_version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL
+    )
+    """,
+    "INSERT OR IGNORE INTO catalog_version (id, version) VALUES (1, 0)"
+]
+
+# O UPDATE feito pelo próprio trigger muda `version`, então não dispara o
+# trigger de UPDATE de novo (condição WHEN)
+VERSION_TRIGGERS_DDL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS {table}_version_ai AFTER INSERT ON {table} BEGIN
+        UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+        UPDATE {table} SET version = (SELECT version FROM catalog_version WHERE id = 1),
+            updated_at = datetime('now', 'localtime') WHERE id = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS {table}_version_au AFTER UPDATE ON {table} WHEN new.version IS old.version BEGIN
+        UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+        UPDATE {table} SET version = (SELECT version FROM catalog_version WHERE id = 1),
+            updated_at = datetime('now', 'localtime') WHERE id = new.id;
+    END
+    """
+]
+
+def create_catalog_versioning(connection):
+    """Cria o contador e os triggers, numerando as linhas que ainda não têm versão"""
+    if connection.dialect.name != 'sqlite':
+        return False
+
+    for statement in CATALOG_VERSION_DDL:
+        connection.execute(text(statement))
+
+    for table in VERSIONED_TABLES:
+        for statement in VERSION_TRIGGERS_DDL:
+            connection.execute(text(statement.format(table=table)))
+
+        # Os triggers atribuem a versão às linhas anteriores à migração
+        connection.execute(text(f"UPDATE {table} SET updated_at = datetime('now', 'localtime') WHERE version = 0"))
+
+    return True
+
+def current_catalog_version():
+    return db.session.execute(text('SELECT version FROM catalog_version WHERE id = 1')).scalar() or 0
+
+def catalog_changes(since):
+    """Linhas alteradas e removidas depois da versão `since`.
+
+    Só entram linhas até a versão atual lida no início, então uma escrita
+    concorrente fica para a próxima sincronização. Se `since` for maior que a
+    versão atual (banco recriado), retorna o catálogo inteiro com reset=True.
+    """
+    from src.models.category import Category
+    from src.models.product import Product
+
+    version = current_catalog_version()
+    reset = since > version
+
+    if reset:
+        since = 0
+
+    changes = {'version': version, 'reset': reset}
+    deleted = {}
+
+    for name, model in (('categories', Category), ('products', Product)):
+        query = model.query.filter(model.version > since, model.version <= version)
+
+        # Um cliente sem cópia do catálogo não precisa dos tombstones
+        if since == 0:
+            query = query.filter_by(deleted_at=None)
+
+        rows = query.order_by(model.version).all()
+        changes[name] = [row.to_dict() for row in rows if row.deleted_at is None]
+        deleted[name] = [row.id for row in rows if row.deleted_at is not None]
+
+    changes['deleted'] = deleted
+    return changes
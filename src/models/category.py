@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, DateTime
 from sqlalchemy.orm import relationship
 from src.models.db import db
 
@@ -9,6 +9,11 @@ class Category(db.Model):
     name = Column(String(100), nullable=False)
     description = Column(String(500), nullable=True)
     image = Column(String(200), nullable=True)
+    # Preenchidos pelos triggers de src/models/catalog.py a cada escrita
+    version = Column(Integer, nullable=False, default=0, index=True)
+    updated_at = Column(DateTime, nullable=True)
+    # Exclusão lógica: a linha fica como tombstone para a sincronização do catálogo
+    deleted_at = Column(DateTime, nullable=True)
     
     # Usando string para evitar dependência circular
     products = relationship('Product', backref='category', lazy=True)
@@ -18,5 +23,6 @@ class Category(db.Model):
             'id': self.id,
             'name': self.name,
             'description': self.description,
-            'image': self.image
+            'image': self.image,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
@@ -1,3 +1,112 @@
+import logging
+import os
+import re
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
 
-db = SQLAlchemy()
+# Perfil das conexões SQLite usado em produção. Cada valor pode ser
+# sobrescrito pela configuração do app ou por uma variável de ambiente com o
+# mesmo nome (ex.: SQLITE_BUSY_TIMEOUT=10000).
+SQLITE_DEFAULTS = {
+    # WAL permite leituras simultâneas a uma escrita entre os workers
+    'SQLITE_JOURNAL_MODE': 'WAL',
+    # Com WAL, NORMAL só sincroniza o disco nos checkpoints
+    'SQLITE_SYNCHRONOUS': 'NORMAL',
+    # Tempo (ms) esperando o lock de escrita antes de "database is locked"
+    'SQLITE_BUSY_TIMEOUT': 5000,
+    # Bytes do arquivo mapeados em memória (256 MiB)
+    'SQLITE_MMAP_SIZE': 268435456,
+    # Cache de páginas por conexão; negativo é em KiB (≈ 20 MB)
+    'SQLITE_CACHE_SIZE': -20000,
+    'SQLITE_FOREIGN_KEYS': 'ON',
+    # Conexões mantidas abertas por processo, preservando o cache entre requisições
+    'SQLITE_POOL_SIZE': 5
+}
+
+# Ordem em que os PRAGMAs são aplicados em cada nova conexão
+SQLITE_PRAGMAS = (
+    ('journal_mode', 'SQLITE_JOURNAL_MODE'),
+    ('synchronous', 'SQLITE_SYNCHRONOUS'),
+    ('busy_timeout', 'SQLITE_BUSY_TIMEOUT'),
+    ('mmap_size', 'SQLITE_MMAP_SIZE'),
+    ('cache_size', 'SQLITE_CACHE_SIZE'),
+    ('foreign_keys', 'SQLITE_FOREIGN_KEYS')
+)
+
+PRAGMA_VALUE_RE = re.compile(r'^-?\w+$')
+
+def sqlite_pragmas(config):
+    """Lista (pragma, valor) a aplicar, a partir da configuração do app"""
+    pragmas = []
+
+    for pragma, key in SQLITE_PRAGMAS:
+        value = str(config.get(key, os.environ.get(key, SQLITE_DEFAULTS[key]))).strip()
+
+        if not PRAGMA_VALUE_RE.match(value):
+            raise ValueError(f'Valor inválido para {key}: {value!r}')
+
+        pragmas.append((pragma, value))
+
+    return pragmas
+
+class ProfiledSQLAlchemy(SQLAlchemy):
+    """SQLAlchemy que aplica o perfil SQLITE_* a cada conexão nova"""
+
+    def apply_driver_hacks(self, app, sa_url, options):
+        sa_url, options = super().apply_driver_hacks(app, sa_url, options)
+
+        if sa_url.drivername == 'sqlite' and sa_url.database not in (None, '', ':memory:'):
+            # O padrão do Flask-SQLAlchemy para arquivos é NullPool, que abre uma
+            # conexão (e reaplica os PRAGMAs) a cada requisição
+            pool_size = int(app.config.get('SQLITE_POOL_SIZE', os.environ.get(
+                'SQLITE_POOL_SIZE', SQLITE_DEFAULTS['SQLITE_POOL_SIZE']
+            )))
+
+            if pool_size > 0 and 'pool_size' not in app.config['SQLALCHEMY_ENGINE_OPTIONS']:
+                options['poolclass'] = QueuePool
+                options['pool_size'] = pool_size
+                options.setdefault('connect_args', {})['check_same_thread'] = False
+
+        if sa_url.drivername == 'sqlite':
+            options['_sqlite_profile'] = (sqlite_pragmas(app.config), app.logger)
+
+        return sa_url, options
+
+    def create_engine(self, sa_url, engine_opts):
+        profile = engine_opts.pop('_sqlite_profile', None)
+        engine = super().create_engine(sa_url, engine_opts)
+
+        if profile is not None:
+            attach_sqlite_profile(engine, *profile)
+
+        return engine
+
+def attach_sqlite_profile(engine, pragmas, logger=None):
+    logger = logger or logging.getLogger(__name__)
+    state = {'logged': False}
+
+    @event.listens_for(engine, 'connect')
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+
+        try:
+            for pragma, value in pragmas:
+                cursor.execute(f'PRAGMA {pragma} = {value}')
+
+            if not state['logged']:
+                # Registrar uma vez os valores efetivos (o SQLite pode recusar
+                # algum, como WAL em banco em memória)
+                state['logged'] = True
+                effective = []
+
+                for pragma, _ in pragmas:
+                    cursor.execute(f'PRAGMA {pragma}')
+                    row = cursor.fetchone()
+                    effective.append(f'{pragma}={row[0] if row else None}')
+
+                logger.info('SQLite %s: %s', engine.url.database, ' '.join(effective))
+        finally:
+            cursor.close()
+
+db = ProfiledSQLAlchemy()
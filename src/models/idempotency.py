@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from src.models.db import db
+
+class IdempotencyKey(db.Model):
+    """Resposta gravada para um Idempotency-Key, por usuário.
+
+    Enquanto a requisição original está em andamento response_status é nulo.
+    """
+    __tablename__ = 'idempotency_keys'
+
+    user_id = Column(Integer, primary_key=True)
+    key = Column(String(255), primary_key=True)
+    request_hash = Column(String(64), nullable=False)
+    response_status = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
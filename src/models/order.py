@@ -1,17 +1,30 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from itertools import groupby
+from operator import itemgetter
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index, bindparam, select
 from sqlalchemy.orm import relationship
 from src.models.db import db
 
+# Quantos nomes de produtos entram no resumo dos itens do histórico
+ITEMS_PREVIEW_NAMES = 3
+
 class Order(db.Model):
     __tablename__ = 'orders'
     
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
-    status = Column(String(20), nullable=False, default='pending')
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
+    status = Column(String(20), nullable=False, default='pending', index=True)
     total = Column(Float, nullable=False)
     address = Column(String(200), nullable=False)
     payment_method = Column(String(50), nullable=False)
-    created_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, nullable=False, index=True)
+    # Resumo dos itens gravado na criação, lido pelo histórico sem carregar os itens
+    item_count = Column(Integer, nullable=False, default=0)
+    items_preview = Column(String(200), nullable=False, default='')
+    
+    # Histórico do usuário: filtro e ordenação pelo mesmo índice
+    __table_args__ = (
+        Index('ix_orders_user_id_created_at', 'user_id', 'created_at'),
+    )
     
     # Usando string para evitar dependência circular
     items = relationship('OrderItem', backref='order', lazy=True, cascade="all, delete-orphan")
@@ -25,5 +38,60 @@ class Order(db.Model):
             'address': self.address,
             'payment_method': self.payment_method,
             'created_at': self.created_at.isoformat() if self.created_at else None,
+            'item_count': self.item_count,
+            'items_preview': self.items_preview,
             'items': [item.to_dict() for item in self.items]
         }
+
+def items_preview(names):
+    """Resumo dos itens para o histórico, ex.: "Maçã, Banana, Alface e mais 2" """
+    names = list(dict.fromkeys(name for name in names if name))
+    preview = ', '.join(names[:ITEMS_PREVIEW_NAMES])
+
+    if len(names) > ITEMS_PREVIEW_NAMES:
+        preview += f' e mais {len(names) - ITEMS_PREVIEW_NAMES}'
+
+    return preview[:200]
+
+def item_names_query(order_ids=None):
+    """(order_id, nome do produto) de cada item, na ordem em que foram gravados"""
+    from src.models.order_item import OrderItem
+    from src.models.product import Product
+
+    query = select(OrderItem.order_id, Product.name) \
+        .select_from(OrderItem).outerjoin(Product, Product.id == OrderItem.product_id) \
+        .order_by(OrderItem.order_id, OrderItem.id)
+
+    if order_ids is not None:
+        query = query.where(OrderItem.order_id.in_(order_ids))
+
+    return query
+
+def update_order_summaries(connection, order_ids=None):
+    """Recalcula item_count e items_preview a partir dos itens.
+
+    Sem order_ids recalcula todos os pedidos (usado pela migração).
+    """
+    orders = Order.__table__
+    rows = connection.execute(item_names_query(order_ids))
+    summaries = {
+        order_id: [name for _, name in group]
+        for order_id, group in groupby(rows, key=itemgetter(0))
+    }
+
+    # Pedidos sem nenhum item também precisam ser zerados
+    for order_id in order_ids or ():
+        summaries.setdefault(order_id, [])
+
+    if not summaries:
+        return
+
+    connection.execute(
+        orders.update()
+        .where(orders.c.id == bindparam('order_key'))
+        .values(item_count=bindparam('new_item_count'), items_preview=bindparam('new_items_preview')),
+        [
+            {'order_key': order_id, 'new_item_count': len(names), 'new_items_preview': items_preview(names)}
+            for order_id, names in summaries.items()
+        ]
+    )
@@ -0,0 +1,80 @@
+import datetime
+import json
+import os
+from sqlalchemy import Column, Integer, String, Text, DateTime, func, select
+from src.models.db import db
+
+# Registro dos eventos de pedidos publicados em /api/orders/events.
+#
+# Os eventos são gravados na mesma transação que cria o pedido ou altera o
+# seu status, e o id autoincremental serve de Last-Event-ID. Como ficam no
+# banco, clientes conectados a qualquer worker recebem os mesmos eventos.
+# Apenas os últimos ORDER_EVENTS_RETENTION eventos são mantidos.
+
+ORDER_EVENTS_RETENTION = int(os.environ.get('ORDER_EVENTS_RETENTION', 1000))
+
+ORDER_CREATED = 'order-created'
+STATUS_CHANGED = 'status-changed'
+
+class OrderEvent(db.Model):
+    __tablename__ = 'order_events'
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    id = Column(Integer, primary_key=True)
+    order_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, nullable=False, index=True)
+    type = Column(String(30), nullable=False)
+    data = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.datetime.now)
+
+def event_values(order, event_type, **extra):
+    """Linha de order_events para o pedido; `extra` complementa (ou substitui) os dados"""
+    data = {
+        'order_id': order.id,
+        'user_id': order.user_id,
+        'status': order.status,
+        'total': order.total
+    }
+    data.update(extra)
+
+    return {
+        'order_id': order.id,
+        'user_id': order.user_id,
+        'type': event_type,
+        'data': json.dumps(data, ensure_ascii=False),
+        'created_at': datetime.datetime.now()
+    }
+
+def record_order_events(values):
+    """Grava os eventos na transação atual com um único INSERT e limpa o registro uma vez"""
+    events = OrderEvent.__table__
+    db.session.execute(events.insert(), values)
+
+    # Manter o registro limitado (a busca pelo máximo usa a chave primária)
+    newest = select(func.max(events.c.id)).scalar_subquery()
+    db.session.execute(events.delete().where(events.c.id <= newest - ORDER_EVENTS_RETENTION))
+
+def record_order_event(order, event_type, **extra):
+    """Grava o evento na transação atual; o pedido já deve ter passado por flush"""
+    record_order_events([event_values(order, event_type, **extra)])
+
+def latest_event_id(connection):
+    return connection.execute(select(func.max(OrderEvent.id))).scalar() or 0
+
+def oldest_event_id(connection):
+    return connection.execute(select(func.min(OrderEvent.id))).scalar()
+
+def events_after(connection, last_id, user_id=None, limit=100):
+    """Eventos com id maior que last_id, só os do usuário quando user_id é informado"""
+    events = OrderEvent.__table__
+    statement = select(events.c.id, events.c.type, events.c.data) \
+        .where(events.c.id > last_id).order_by(events.c.id).limit(limit)
+
+    if user_id is not None:
+        statement = statement.where(events.c.user_id == user_id)
+
+    return connection.execute(statement).all()
+
+def to_sse(event):
+    """Formata um evento (id, type, data) no protocolo text/event-stream"""
+    return f'id: {event.id}\nevent: {event.type}\ndata: {event.data}\n\n'
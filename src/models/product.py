@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
 from sqlalchemy.orm import relationship
 from src.models.db import db
 
@@ -10,10 +10,15 @@ class Product(db.Model):
     description = Column(String(500), nullable=True)
     price = Column(Float, nullable=False)
     image = Column(String(200), nullable=True)
-    category_id = Column(Integer, ForeignKey('categories.id'), nullable=False)
+    category_id = Column(Integer, ForeignKey('categories.id'), nullable=False, index=True)
     stock = Column(Integer, nullable=False, default=0)
     unit = Column(String(20), nullable=False, default='un')
-    featured = Column(Integer, nullable=False, default=0)
+    featured = Column(Integer, nullable=False, default=0, index=True)
+    # Preenchidos pelos triggers de src/models/catalog.py a cada escrita
+    version = Column(Integer, nullable=False, default=0, index=True)
+    updated_at = Column(DateTime, nullable=True)
+    # Exclusão lógica: a linha fica como tombstone para a sincronização do catálogo
+    deleted_at = Column(DateTime, nullable=True)
     
     def to_dict(self):
         return {
@@ -25,5 +30,6 @@ class Product(db.Model):
             'category_id': self.category_id,
             'stock': self.stock,
             'unit': self.unit,
-            'featured': self.featured
+            'featured': self.featured,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
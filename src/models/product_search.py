@@ -0,0 +1,97 @@
+import re
+from sqlalchemy import Float, Integer, text
+from src.models.db import db
+
+# Índice de busca textual dos produtos (SQLite FTS5).
+#
+# A tabela virtual usa a própria tabela `products` como conteúdo externo e é
+# mantida sincronizada por triggers, de modo que qualquer escrita em
+# `products` (rotas, scripts ou SQL direto) atualiza o índice. O tokenizador
+# unicode61 com remove_diacritics faz "maca" encontrar "Maçã".
+
+SEARCH_TABLE = 'products_fts'
+
+# Peso das colunas no bm25: acertos no nome valem mais que na descrição
+NAME_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+SEARCH_INDEX_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name,
+        description,
+        content='products',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, description ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO products_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """
+]
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+def search_index_available():
+    return db.engine.dialect.name == 'sqlite'
+
+def create_search_index(connection):
+    """Cria o índice e os triggers se ainda não existirem, populando um índice novo"""
+    if connection.dialect.name != 'sqlite':
+        return False
+
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {'name': SEARCH_TABLE}
+    ).first()
+
+    for statement in SEARCH_INDEX_DDL:
+        connection.execute(text(statement))
+
+    if not exists:
+        connection.execute(text("INSERT INTO products_fts(products_fts) VALUES ('rebuild')"))
+
+    return True
+
+def build_match_query(term):
+    """Converte o texto digitado em uma consulta FTS5 com prefixo em cada palavra"""
+    tokens = TOKEN_RE.findall(term or '')
+
+    if not tokens:
+        return None
+
+    # Cada palavra vira uma frase com prefixo ("tom"* encontra "tomate");
+    # as palavras são combinadas com AND implícito
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+def product_search_subquery(term):
+    """Subconsulta (product_id, rank) com os produtos que casam com `term`.
+
+    O rank é o bm25 do FTS5: quanto menor, mais relevante.
+    """
+    match = build_match_query(term)
+
+    if match is None:
+        return None
+
+    return text(
+        f"SELECT rowid AS product_id, bm25({SEARCH_TABLE}, {NAME_WEIGHT}, {DESCRIPTION_WEIGHT}) AS rank "
+        f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :match"
+    ).bindparams(match=match).columns(product_id=Integer, rank=Float).subquery('product_search')
@@ -0,0 +1,62 @@
+from flask import Blueprint, jsonify, request
+from src.models.catalog import catalog_changes
+from src.models.category import Category
+from src.models.product import Product
+from src.utils.catalog_cache import cached_catalog_entry, cached_catalog_response, catalog_response
+from src.utils.pagination import encode_cursor, fetch_page
+import hashlib
+
+catalog_bp = Blueprint('catalog_bp', __name__)
+
+@catalog_bp.route('/api/catalog/changes', methods=['GET'])
+def get_catalog_changes():
+    # since=0 (ou ausente) devolve o catálogo inteiro; o cliente guarda a
+    # `version` da resposta e a envia na próxima sincronização
+    try:
+        since = int(request.args.get('since', 0))
+    except ValueError:
+        return jsonify({'error': 'Versão inválida'}), 400
+    
+    if since < 0:
+        return jsonify({'error': 'Versão inválida'}), 400
+    
+    return cached_catalog_response('catalog-changes', lambda: catalog_changes(since))
+
+# Produtos na primeira página do bootstrap (as seguintes vêm de /api/products?after=)
+BOOTSTRAP_PAGE_SIZE = 20
+
+def bootstrap_categories():
+    return [category.to_dict() for category in Category.query.filter_by(deleted_at=None).order_by(Category.id)]
+
+def bootstrap_featured():
+    products = Product.query.filter_by(featured=1, deleted_at=None).order_by(Product.id)
+    return [product.to_dict() for product in products]
+
+def bootstrap_products():
+    rows, has_more = fetch_page(Product.query.filter_by(deleted_at=None).order_by(Product.id), BOOTSTRAP_PAGE_SIZE)
+    
+    return {
+        'products': [product.to_dict() for product in rows],
+        'next_cursor': encode_cursor([rows[-1].id]) if has_more else None
+    }
+
+BOOTSTRAP_PARTS = (
+    ('categories', bootstrap_categories),
+    ('featured', bootstrap_featured),
+    ('products', bootstrap_products)
+)
+
+@catalog_bp.route('/api/bootstrap', methods=['GET'])
+def get_bootstrap():
+    # Tudo o que a primeira tela da loja precisa em uma resposta. Cada parte
+    # é uma entrada do cache do catálogo, com o JSON já serializado; a resposta
+    # só concatena os corpos e o ETag combina os ETags das partes
+    entries = [
+        (name, cached_catalog_entry(('bootstrap', name), build))
+        for name, build in BOOTSTRAP_PARTS
+    ]
+    
+    body = b'{' + b','.join(b'"%s":%s' % (name.encode(), entry['body']) for name, entry in entries) + b'}'
+    etag = hashlib.sha256('-'.join(entry['etag'] for _, entry in entries).encode()).hexdigest()
+    
+    return catalog_response(body, etag)
@@ -1,17 +1,24 @@
 from flask import Blueprint, jsonify, request
 from src.models.category import Category
+from src.models.product import Product
 from src.models.db import db
+from src.utils.auth import admin_required
+from src.utils.catalog_cache import bump_catalog_version, cached_catalog_response
+import datetime
 
 category_bp = Blueprint('category_bp', __name__)
 
 @category_bp.route('/api/categories', methods=['GET'])
 def get_categories():
-    categories = Category.query.all()
-    return jsonify({'categories': [category.to_dict() for category in categories]}), 200
+    def build():
+        categories = Category.query.filter_by(deleted_at=None).all()
+        return {'categories': [category.to_dict() for category in categories]}
+    
+    return cached_catalog_response('categories', build)
 
 @category_bp.route('/api/categories/<int:category_id>', methods=['GET'])
 def get_category(category_id):
-    category = Category.query.get(category_id)
+    category = Category.query.filter_by(id=category_id, deleted_at=None).first()
     
     if not category:
         return jsonify({'error': 'Categoria não encontrada'}), 404
@@ -19,8 +26,8 @@ def get_category(category_id):
     return jsonify({'category': category.to_dict()}), 200
 
 @category_bp.route('/api/categories', methods=['POST'])
+@admin_required
 def create_category():
-    # Aqui deveria ter autenticação JWT para admin
     data = request.get_json()
     
     if not data or not data.get('name'):
@@ -34,13 +41,14 @@ def create_category():
     
     db.session.add(category)
     db.session.commit()
+    bump_catalog_version()
     
     return jsonify({'message': 'Categoria criada com sucesso', 'category': category.to_dict()}), 201
 
 @category_bp.route('/api/categories/<int:category_id>', methods=['PUT'])
+@admin_required
 def update_category(category_id):
-    # Aqui deveria ter autenticação JWT para admin
-    category = Category.query.get(category_id)
+    category = Category.query.filter_by(id=category_id, deleted_at=None).first()
     
     if not category:
         return jsonify({'error': 'Categoria não encontrada'}), 404
@@ -57,22 +65,25 @@ def update_category(category_id):
         category.image = data['image']
     
     db.session.commit()
+    bump_catalog_version()
     
     return jsonify({'message': 'Categoria atualizada com sucesso', 'category': category.to_dict()}), 200
 
 @category_bp.route('/api/categories/<int:category_id>', methods=['DELETE'])
+@admin_required
 def delete_category(category_id):
-    # Aqui deveria ter autenticação JWT para admin
-    category = Category.query.get(category_id)
+    category = Category.query.filter_by(id=category_id, deleted_at=None).first()
     
     if not category:
         return jsonify({'error': 'Categoria não encontrada'}), 404
     
-    # Verificar se há produtos associados
-    if category.products and len(category.products) > 0:
+    # Verificar se há produtos associados (os excluídos não contam)
+    if Product.query.filter_by(category_id=category.id, deleted_at=None).first():
         return jsonify({'error': 'Não é possível excluir uma categoria com produtos associados'}), 400
     
-    db.session.delete(category)
+    # Exclusão lógica, como a dos produtos
+    category.deleted_at = datetime.datetime.now()
     db.session.commit()
+    bump_catalog_version()
     
     return jsonify({'message': 'Categoria excluída com sucesso'}), 200
@@ -1,69 +1,289 @@
-from flask import Blueprint, jsonify, request
-from src.models.order import Order
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from src.models.order import Order, items_preview
+from src.models.order_event import (
+    ORDER_CREATED, STATUS_CHANGED, event_values, events_after, latest_event_id, oldest_event_id, record_order_event,
+    record_order_events, to_sse
+)
 from src.models.order_item import OrderItem
 from src.models.product import Product
 from src.models.user import User
 from src.models.db import db
+from src.utils.auth import admin_required, stream_token_required, token_required
+from src.utils.catalog_cache import bump_catalog_version
+from src.utils.export import (
+    ExportError, export_response, parse_date_range, parse_export_format, stream_batches, to_csv, to_ndjson
+)
+from src.utils.idempotency import idempotent, store_idempotent_response
+from src.utils.pagination import (
+    PaginationError, decode_cursor, encode_cursor, fetch_page, keyset_filter, parse_fields,
+    parse_limit, row_to_dict, select_columns
+)
+from sqlalchemy import bindparam, select, tuple_
+from sqlalchemy.orm import joinedload, selectinload
 import datetime
-import jwt
 import os
+import time
 
 order_bp = Blueprint('order_bp', __name__)
 
+# Estratégias de carregamento dos itens e produtos de cada pedido. Listas usam
+# selectinload (uma consulta IN para os itens de todos os pedidos da página);
+# um pedido isolado usa joinedload (tudo em uma única consulta).
+LIST_ITEMS_LOADER = selectinload(Order.items).joinedload(OrderItem.product)
+DETAIL_ITEMS_LOADER = joinedload(Order.items).joinedload(OrderItem.product)
+
+# Campos que podem ser pedidos via ?fields= na listagem
+ORDER_FIELDS = ('id', 'user_id', 'status', 'total', 'address', 'payment_method', 'created_at')
+
+# Histórico do cliente: só as colunas de resumo, sem carregar os itens
+HISTORY_FIELDS = ('id', 'status', 'total', 'item_count', 'items_preview', 'created_at')
+HISTORY_PAGE_SIZE = 20
+
+# Colunas da exportação: uma linha por item no CSV, um pedido com seus itens no NDJSON
+EXPORT_ORDER_FIELDS = ('id', 'user_id', 'status', 'total', 'address', 'payment_method', 'created_at')
+EXPORT_ITEM_FIELDS = ('item_id', 'product_id', 'product_name', 'quantity', 'price')
+
+# Stream de eventos: intervalo entre consultas ao registro de eventos,
+# comentário de keep-alive e duração máxima de cada conexão (o navegador
+# reconecta sozinho, enviando Last-Event-ID)
+EVENTS_POLL_INTERVAL = float(os.environ.get('ORDER_EVENTS_POLL_INTERVAL', 1))
+EVENTS_HEARTBEAT = float(os.environ.get('ORDER_EVENTS_HEARTBEAT', 15))
+EVENTS_MAX_DURATION = float(os.environ.get('ORDER_EVENTS_MAX_DURATION', 300))
+EVENTS_BATCH_SIZE = 100
+
+# Mudança de status em lote: status de destino -> status de origem permitidos
+STATUS_TRANSITIONS = {
+    'processing': ('pending',),
+    'shipped': ('processing',),
+    'delivered': ('shipped',),
+    'cancelled': ('pending', 'processing')
+}
+BATCH_STATUS_MAX_ORDERS = 500
+
+def reserve_stock(quantities):
+    """Baixa o estoque de cada produto somente se houver quantidade suficiente.
+    
+    Usa um UPDATE condicional por produto, enviados juntos em um executemany,
+    de modo que dois pedidos simultâneos não vendem a mesma unidade. Deve ser
+    chamada dentro da transação do pedido; retorna False quando algum produto
+    não tinha estoque suficiente (a transação deve então ser desfeita).
+    """
+    products = Product.__table__
+    params = [{'product_id': product_id, 'quantity': quantity} for product_id, quantity in quantities.items()]
+    
+    result = db.session.execute(
+        products.update()
+        .where(products.c.id == bindparam('product_id'))
+        .where(products.c.stock >= bindparam('quantity'))
+        .values(stock=products.c.stock - bindparam('quantity')),
+        params
+    )
+    
+    # O rowcount do executemany é a soma das linhas alteradas por cada UPDATE
+    return result.rowcount == len(params)
+
 @order_bp.route('/api/orders', methods=['GET'])
+@token_required
 def get_orders():
-    # Aqui deveria ter autenticação JWT
-    auth_header = request.headers.get('Authorization')
-    if not auth_header or not auth_header.startswith('Bearer '):
-        return jsonify({'error': 'Token não fornecido'}), 401
-    
-    token = auth_header.split(' ')[1]
+    user_id = request.user['user_id']
+    is_admin = request.user.get('is_admin', False)
     
     try:
-        payload = jwt.decode(
-            token,
-            os.environ.get('SECRET_KEY', 'hortifruti-delivery-secret-key'),
-            algorithms=['HS256']
-        )
-        user_id = payload['user_id']
-        is_admin = payload.get('is_admin', False)
-    except jwt.ExpiredSignatureError:
-        return jsonify({'error': 'Token expirado'}), 401
-    except jwt.InvalidTokenError:
-        return jsonify({'error': 'Token inválido'}), 401
+        limit = parse_limit()
+        after = decode_cursor(request.args.get('after'), (datetime.datetime, int))
+        fields = parse_fields(ORDER_FIELDS)
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
     
     if is_admin:
         # Administradores podem ver todos os pedidos
-        orders = Order.query.all()
+        query = Order.query
     else:
         # Usuários comuns só podem ver seus próprios pedidos
-        orders = Order.query.filter_by(user_id=user_id).all()
+        query = Order.query.filter_by(user_id=user_id)
+    
+    if after:
+        query = query.filter(keyset_filter((Order.created_at, Order.id), after, descending=True))
+    
+    query = query.order_by(Order.created_at.desc(), Order.id.desc())
+    
+    if fields:
+        # Apenas as colunas pedidas entram no SELECT
+        _, columns = select_columns(Order, fields, ('created_at', 'id'))
+        query = query.with_entities(*columns)
+    else:
+        query = query.options(LIST_ITEMS_LOADER)
     
-    return jsonify({'orders': [order.to_dict() for order in orders]}), 200
+    orders, has_more = fetch_page(query, limit)
+    
+    if fields:
+        result = {'orders': [row_to_dict(order, fields) for order in orders]}
+    else:
+        result = {'orders': [order.to_dict() for order in orders]}
+    
+    if limit is not None:
+        last = orders[-1] if has_more else None
+        result['next_cursor'] = encode_cursor([last.created_at, last.id]) if last else None
+    
+    return jsonify(result), 200
 
-@order_bp.route('/api/orders/<int:order_id>', methods=['GET'])
-def get_order(order_id):
-    # Aqui deveria ter autenticação JWT
-    auth_header = request.headers.get('Authorization')
-    if not auth_header or not auth_header.startswith('Bearer '):
-        return jsonify({'error': 'Token não fornecido'}), 401
+@order_bp.route('/api/orders/history', methods=['GET'])
+@token_required
+def get_order_history():
+    # Pedidos do próprio usuário, mais recentes primeiro, paginados por cursor.
+    # Os itens só são carregados ao abrir um pedido (/api/orders/<id>)
+    user_id = request.user['user_id']
+    
+    try:
+        limit = parse_limit() or HISTORY_PAGE_SIZE
+        after = decode_cursor(request.args.get('after'), (datetime.datetime, int))
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    _, columns = select_columns(Order, HISTORY_FIELDS, ('created_at', 'id'))
+    query = Order.query.with_entities(*columns).filter(Order.user_id == user_id)
+    
+    if after:
+        query = query.filter(keyset_filter((Order.created_at, Order.id), after, descending=True))
     
-    token = auth_header.split(' ')[1]
+    orders, has_more = fetch_page(query.order_by(Order.created_at.desc(), Order.id.desc()), limit)
+    last = orders[-1] if has_more else None
     
+    return jsonify({
+        'orders': [row_to_dict(order, HISTORY_FIELDS) for order in orders],
+        'next_cursor': encode_cursor([last.created_at, last.id]) if last else None
+    }), 200
+
+@order_bp.route('/api/orders/export', methods=['GET'])
+@admin_required
+def export_orders():
     try:
-        payload = jwt.decode(
-            token,
-            os.environ.get('SECRET_KEY', 'hortifruti-delivery-secret-key'),
-            algorithms=['HS256']
-        )
-        user_id = payload['user_id']
-        is_admin = payload.get('is_admin', False)
-    except jwt.ExpiredSignatureError:
-        return jsonify({'error': 'Token expirado'}), 401
-    except jwt.InvalidTokenError:
-        return jsonify({'error': 'Token inválido'}), 401
+        export_format = parse_export_format()
+        start, end = parse_date_range()
+    except ExportError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    orders = Order.__table__
+    items = OrderItem.__table__
+    products = Product.__table__
+    
+    statement = select(
+        *(orders.c[field] for field in EXPORT_ORDER_FIELDS),
+        items.c.id.label('item_id'),
+        items.c.product_id,
+        products.c.name.label('product_name'),
+        items.c.quantity,
+        items.c.price
+    ).select_from(
+        orders.outerjoin(items, items.c.order_id == orders.c.id).outerjoin(products, products.c.id == items.c.product_id)
+    ).order_by(orders.c.created_at, orders.c.id)
+    
+    if start:
+        statement = statement.where(orders.c.created_at >= start)
+    
+    if end:
+        statement = statement.where(orders.c.created_at < end)
+    
+    statuses = [status for status in request.args.get('status', '').split(',') if status]
+    
+    if statuses:
+        statement = statement.where(orders.c.status.in_(statuses))
+    
+    def generate_csv():
+        yield to_csv([EXPORT_ORDER_FIELDS + EXPORT_ITEM_FIELDS])
+        
+        for rows in stream_batches(statement):
+            yield to_csv(rows)
+    
+    def generate_ndjson():
+        # As linhas de um pedido chegam juntas (ordenadas por pedido); cada
+        # pedido é enviado assim que a primeira linha do seguinte aparece
+        order = None
+        split = len(EXPORT_ORDER_FIELDS)
+        
+        for rows in stream_batches(statement):
+            finished = []
+            
+            for row in rows:
+                if order is None or order['id'] != row.id:
+                    if order is not None:
+                        finished.append(order)
+                    
+                    order = dict(zip(EXPORT_ORDER_FIELDS, row[:split]))
+                    order['items'] = []
+                
+                if row.item_id is not None:
+                    order['items'].append(dict(zip(EXPORT_ITEM_FIELDS, row[split:])))
+            
+            yield to_ndjson(finished)
+        
+        if order is not None:
+            yield to_ndjson([order])
+    
+    generate = generate_csv if export_format == 'csv' else generate_ndjson
+    
+    return export_response(generate(), export_format, 'pedidos')
+
+@order_bp.route('/api/orders/events', methods=['GET'])
+@stream_token_required
+def order_events():
+    # Administradores recebem todos os eventos; clientes, só os dos seus pedidos
+    user_id = None if request.user.get('is_admin', False) else request.user['user_id']
+    
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return jsonify({'error': 'Last-Event-ID inválido'}), 400
+    
+    def generate():
+        nonlocal last_event_id
+        yield f'retry: {int(EVENTS_POLL_INTERVAL * 3000)}\n\n'
+        
+        # Cada consulta usa uma conexão do pool só pelo tempo da consulta
+        with db.engine.connect() as connection:
+            if last_event_id is None:
+                # Conexão nova: apenas eventos a partir de agora
+                last_event_id = latest_event_id(connection)
+            else:
+                oldest = oldest_event_id(connection)
+                
+                if oldest is not None and last_event_id < oldest - 1:
+                    # Eventos perdidos já saíram do registro: o cliente deve recarregar a lista
+                    yield 'event: reset\ndata: {}\n\n'
+        
+        started = last_sent = time.monotonic()
+        
+        while time.monotonic() - started < EVENTS_MAX_DURATION:
+            with db.engine.connect() as connection:
+                events = events_after(connection, last_event_id, user_id, EVENTS_BATCH_SIZE)
+            
+            if events:
+                last_event_id = events[-1].id
+                last_sent = time.monotonic()
+                yield ''.join(to_sse(event) for event in events)
+                
+                if len(events) == EVENTS_BATCH_SIZE:
+                    continue
+            elif time.monotonic() - last_sent >= EVENTS_HEARTBEAT:
+                last_sent = time.monotonic()
+                yield ': ping\n\n'
+            
+            time.sleep(EVENTS_POLL_INTERVAL)
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@order_bp.route('/api/orders/<int:order_id>', methods=['GET'])
+@token_required
+def get_order(order_id):
+    user_id = request.user['user_id']
+    is_admin = request.user.get('is_admin', False)
     
-    order = Order.query.get(order_id)
+    order = Order.query.options(DETAIL_ITEMS_LOADER).filter_by(id=order_id).first()
     
     if not order:
         return jsonify({'error': 'Pedido não encontrado'}), 404
@@ -75,25 +295,10 @@ def get_order(order_id):
     return jsonify({'order': order.to_dict()}), 200
 
 @order_bp.route('/api/orders', methods=['POST'])
+@token_required
+@idempotent
 def create_order():
-    # Aqui deveria ter autenticação JWT
-    auth_header = request.headers.get('Authorization')
-    if not auth_header or not auth_header.startswith('Bearer '):
-        return jsonify({'error': 'Token não fornecido'}), 401
-    
-    token = auth_header.split(' ')[1]
-    
-    try:
-        payload = jwt.decode(
-            token,
-            os.environ.get('SECRET_KEY', 'hortifruti-delivery-secret-key'),
-            algorithms=['HS256']
-        )
-        user_id = payload['user_id']
-    except jwt.ExpiredSignatureError:
-        return jsonify({'error': 'Token expirado'}), 401
-    except jwt.InvalidTokenError:
-        return jsonify({'error': 'Token inválido'}), 401
+    user_id = request.user['user_id']
     
     data = request.get_json()
     
@@ -105,86 +310,155 @@ def create_order():
     if not user:
         return jsonify({'error': 'Usuário não encontrado'}), 404
     
-    # Calcular o total do pedido
-    total = 0
-    items_data = []
+    # Somar as quantidades por produto (o mesmo produto pode vir em mais de uma linha)
+    quantities = {}
     
     for item in data['items']:
         if not item.get('product_id') or not item.get('quantity'):
             return jsonify({'error': 'Dados de item incompletos'}), 400
         
-        product = Product.query.get(item['product_id'])
-        if not product:
-            return jsonify({'error': f'Produto {item["product_id"]} não encontrado'}), 404
+        if not isinstance(item['quantity'], int) or item['quantity'] <= 0:
+            return jsonify({'error': 'Quantidade inválida'}), 400
         
-        # Verificar estoque
-        if product.stock < item['quantity']:
-            return jsonify({'error': f'Estoque insuficiente para o produto {product.name}'}), 400
+        try:
+            item['product_id'] = int(item['product_id'])
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Produto inválido'}), 400
         
-        subtotal = product.price * item['quantity']
-        total += subtotal
+        quantities[item['product_id']] = quantities.get(item['product_id'], 0) + item['quantity']
+    
+    # Carregar todos os produtos do carrinho em uma única consulta
+    products = {
+        product.id: product
+        for product in Product.query.filter(Product.id.in_(list(quantities)), Product.deleted_at.is_(None)).all()
+    }
+    
+    for product_id in quantities:
+        if product_id not in products:
+            return jsonify({'error': f'Produto {product_id} não encontrado'}), 404
+    
+    # Calcular o total do pedido
+    total = 0
+    items_data = []
+    
+    for item in data['items']:
+        product = products[item['product_id']]
+        total += product.price * item['quantity']
         
         items_data.append({
             'product_id': product.id,
             'quantity': item['quantity'],
             'price': product.price
         })
+    
+    # Reservar o estoque na mesma transação do pedido
+    if not reserve_stock(quantities):
+        db.session.rollback()
+        
+        # Identificar o produto sem estoque para a mensagem de erro
+        for product in Product.query.filter(Product.id.in_(list(quantities))).all():
+            if product.stock < quantities[product.id]:
+                return jsonify({'error': f'Estoque insuficiente para o produto {product.name}'}), 400
         
-        # Atualizar estoque
-        product.stock -= item['quantity']
+        return jsonify({'error': 'Estoque insuficiente'}), 400
     
-    # Criar o pedido
+    # Criar o pedido, já com o resumo dos itens usado pelo histórico
     order = Order(
         user_id=user_id,
         status='pending',
         total=total,
         address=data['address'],
         payment_method=data['payment_method'],
-        created_at=datetime.datetime.now()
+        created_at=datetime.datetime.now(),
+        item_count=len(items_data),
+        items_preview=items_preview(products[item['product_id']].name for item in items_data)
     )
     
     db.session.add(order)
     db.session.flush()  # Para obter o ID do pedido
+    order_id = order.id
     
-    # Criar os itens do pedido
+    # Criar os itens do pedido (um único INSERT com vários parâmetros)
     for item_data in items_data:
-        order_item = OrderItem(
-            order_id=order.id,
-            product_id=item_data['product_id'],
-            quantity=item_data['quantity'],
-            price=item_data['price']
-        )
-        db.session.add(order_item)
+        item_data['order_id'] = order_id
+    
+    db.session.execute(OrderItem.__table__.insert(), items_data)
+    
+    record_order_event(order, ORDER_CREATED)
     
+    # Carregar o pedido com itens e produtos em uma única consulta; populate_existing
+    # atualiza os produtos já carregados com o estoque baixado por reserve_stock
+    order = Order.query.options(DETAIL_ITEMS_LOADER).populate_existing().filter_by(id=order_id).one()
+    response = {'message': 'Pedido criado com sucesso', 'order': order.to_dict()}
+    
+    # Com Idempotency-Key, a resposta é gravada na mesma transação do pedido
+    store_idempotent_response(response, 201)
     db.session.commit()
+    # O estoque faz parte do catálogo em cache
+    bump_catalog_version()
     
-    return jsonify({'message': 'Pedido criado com sucesso', 'order': order.to_dict()}), 201
+    return jsonify(response), 201
 
-@order_bp.route('/api/orders/<int:order_id>/status', methods=['PUT'])
-def update_order_status(order_id):
-    # Aqui deveria ter autenticação JWT para admin
-    auth_header = request.headers.get('Authorization')
-    if not auth_header or not auth_header.startswith('Bearer '):
-        return jsonify({'error': 'Token não fornecido'}), 401
+@order_bp.route('/api/orders/status', methods=['PUT'])
+@admin_required
+def update_orders_status():
+    data = request.get_json()
     
-    token = auth_header.split(' ')[1]
+    if not data or not data.get('status') or not isinstance(data.get('order_ids'), list):
+        return jsonify({'error': 'Informe order_ids e status'}), 400
     
-    try:
-        payload = jwt.decode(
-            token,
-            os.environ.get('SECRET_KEY', 'hortifruti-delivery-secret-key'),
-            algorithms=['HS256']
-        )
-        is_admin = payload.get('is_admin', False)
-    except jwt.ExpiredSignatureError:
-        return jsonify({'error': 'Token expirado'}), 401
-    except jwt.InvalidTokenError:
-        return jsonify({'error': 'Token inválido'}), 401
+    status = data['status']
     
-    if not is_admin:
-        return jsonify({'error': 'Acesso negado'}), 403
+    if status not in STATUS_TRANSITIONS:
+        return jsonify({'error': 'Status inválido'}), 400
     
-    order = Order.query.get(order_id)
+    try:
+        order_ids = sorted({int(order_id) for order_id in data['order_ids']})
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Pedido inválido'}), 400
+    
+    if not order_ids or len(order_ids) > BATCH_STATUS_MAX_ORDERS:
+        return jsonify({'error': f'Informe de 1 a {BATCH_STATUS_MAX_ORDERS} pedidos'}), 400
+    
+    orders = Order.__table__
+    
+    # Pedidos que podem passar para o novo status (a transição é validada na consulta)
+    movable = db.session.execute(
+        select(orders.c.id, orders.c.user_id, orders.c.status, orders.c.total)
+        .where(orders.c.id.in_(order_ids))
+        .where(orders.c.status.in_(STATUS_TRANSITIONS[status]))
+    ).all()
+    
+    if movable:
+        # Um único UPDATE; cada pedido só muda se ainda estiver no status lido acima
+        result = db.session.execute(
+            orders.update()
+            .where(tuple_(orders.c.id, orders.c.status).in_([(order.id, order.status) for order in movable]))
+            .values(status=status)
+        )
+        
+        if result.rowcount != len(movable):
+            db.session.rollback()
+            return jsonify({'error': 'Alguns pedidos mudaram durante a atualização, tente novamente'}), 409
+        
+        record_order_events([
+            event_values(order, STATUS_CHANGED, status=status, previous_status=order.status) for order in movable
+        ])
+        db.session.commit()
+    
+    updated = {order.id for order in movable}
+    
+    return jsonify({
+        'message': 'Status dos pedidos atualizado com sucesso',
+        'status': status,
+        'updated': sorted(updated),
+        'failed': [order_id for order_id in order_ids if order_id not in updated]
+    }), 200
+
+@order_bp.route('/api/orders/<int:order_id>/status', methods=['PUT'])
+@admin_required
+def update_order_status(order_id):
+    order = Order.query.options(DETAIL_ITEMS_LOADER).filter_by(id=order_id).first()
     
     if not order:
         return jsonify({'error': 'Pedido não encontrado'}), 404
@@ -198,7 +472,12 @@ def update_order_status(order_id):
     if data['status'] not in valid_statuses:
         return jsonify({'error': 'Status inválido'}), 400
     
+    previous_status = order.status
     order.status = data['status']
+    
+    if order.status != previous_status:
+        record_order_event(order, STATUS_CHANGED, previous_status=previous_status)
+    
     db.session.commit()
     
     return jsonify({'message': 'Status do pedido atualizado com sucesso', 'order': order.to_dict()}), 200
@@ -1,18 +1,30 @@
 from flask import Blueprint, jsonify, request
+from src.models.order import Order, update_order_summaries
 from src.models.order_item import OrderItem
 from src.models.db import db
+from src.utils.auth import admin_required, token_required
+from sqlalchemy.orm import joinedload
 
 order_item_bp = Blueprint('order_item_bp', __name__)
 
 @order_item_bp.route('/api/order-items/<int:order_id>', methods=['GET'])
+@token_required
 def get_order_items(order_id):
-    # Esta rota seria normalmente protegida por autenticação
-    order_items = OrderItem.query.filter_by(order_id=order_id).all()
+    order = Order.query.get(order_id)
+    
+    if not order:
+        return jsonify({'error': 'Pedido não encontrado'}), 404
+    
+    # Verificar se o usuário tem permissão para ver este pedido
+    if not request.user.get('is_admin', False) and order.user_id != request.user['user_id']:
+        return jsonify({'error': 'Acesso negado'}), 403
+    
+    order_items = OrderItem.query.options(joinedload(OrderItem.product)).filter_by(order_id=order_id).all()
     return jsonify({'order_items': [item.to_dict() for item in order_items]}), 200
 
 @order_item_bp.route('/api/order-items/<int:item_id>', methods=['PUT'])
+@admin_required
 def update_order_item(item_id):
-    # Esta rota seria normalmente protegida por autenticação de admin
     order_item = OrderItem.query.get(item_id)
     
     if not order_item:
@@ -31,14 +43,18 @@ def update_order_item(item_id):
     return jsonify({'message': 'Item de pedido atualizado com sucesso', 'order_item': order_item.to_dict()}), 200
 
 @order_item_bp.route('/api/order-items/<int:item_id>', methods=['DELETE'])
+@admin_required
 def delete_order_item(item_id):
-    # Esta rota seria normalmente protegida por autenticação de admin
     order_item = OrderItem.query.get(item_id)
     
     if not order_item:
         return jsonify({'error': 'Item de pedido não encontrado'}), 404
     
     db.session.delete(order_item)
+    db.session.flush()
+    
+    # Manter o resumo dos itens do pedido usado pelo histórico
+    update_order_summaries(db.session.connection(), [order_item.order_id])
     db.session.commit()
     
     return jsonify({'message': 'Item de pedido excluído com sucesso'}), 200
@@ -2,35 +2,193 @@ from flask import Blueprint, jsonify, request
 from src.models.product import Product
 from src.models.category import Category
 from src.models.db import db
+from src.models.product_search import product_search_subquery, search_index_available
+from src.utils.auth import admin_required
+from src.utils.catalog_cache import bump_catalog_version, cached_catalog_response
+from src.utils.pagination import (
+    PaginationError, decode_cursor, encode_cursor, fetch_page, keyset_filter, parse_fields,
+    parse_limit, row_to_dict, select_columns
+)
+from sqlalchemy import bindparam, false, or_
+import csv
 import datetime
+import io
+import math
 import os
 
 product_bp = Blueprint('product_bp', __name__)
 
+# Campos que podem ser pedidos via ?fields=
+PRODUCT_FIELDS = ('id', 'name', 'description', 'price', 'image', 'category_id', 'stock', 'unit', 'featured')
+
+# Campos aceitos na atualização em lote e a conversão de cada um (no CSV
+# todos os valores chegam como texto). Linhas com id atualizam o produto;
+# sem id, criam um novo. stock_delta soma ao estoque atual.
+BULK_PRODUCT_FIELDS = {
+    'id': int,
+    'name': str,
+    'description': str,
+    'price': float,
+    'image': str,
+    'category_id': int,
+    'stock': int,
+    'unit': str,
+    'featured': int,
+    'stock_delta': int
+}
+BULK_REQUIRED_FIELDS = ('name', 'price', 'category_id')
+BULK_MAX_ROWS = 5000
+
+def read_bulk_rows():
+    """Linhas enviadas como lista JSON (ou {"products": [...]}) ou como CSV"""
+    upload = request.files.get('file')
+    
+    if upload:
+        text = upload.read().decode('utf-8-sig')
+    elif request.mimetype == 'text/csv':
+        text = request.get_data(as_text=True)
+    else:
+        data = request.get_json(silent=True)
+        
+        if isinstance(data, dict):
+            data = data.get('products')
+        
+        if not isinstance(data, list):
+            raise ValueError('Envie uma lista de produtos em JSON ou um arquivo CSV')
+        
+        return data
+    
+    return list(csv.DictReader(io.StringIO(text)))
+
+def normalize_bulk_row(row):
+    """Converte e valida uma linha do lote; lança ValueError com o motivo"""
+    if not isinstance(row, dict):
+        raise ValueError('Linha inválida')
+    
+    values = {}
+    
+    for field, value in row.items():
+        if field not in BULK_PRODUCT_FIELDS:
+            raise ValueError(f'Campo desconhecido: {field}')
+        
+        # Células vazias do CSV não alteram o campo
+        if value is None or value == '':
+            continue
+        
+        try:
+            values[field] = BULK_PRODUCT_FIELDS[field](value)
+        except (TypeError, ValueError, OverflowError):
+            raise ValueError(f'Valor inválido em {field}')
+        
+        # float() aceita "nan" e "inf" do CSV e do JSON
+        if isinstance(values[field], float) and not math.isfinite(values[field]):
+            raise ValueError(f'Valor inválido em {field}')
+    
+    if 'stock' in values and 'stock_delta' in values:
+        raise ValueError('Use stock ou stock_delta, não os dois')
+    
+    if values.get('price', 0) < 0 or values.get('stock', 0) < 0:
+        raise ValueError('Preço e estoque não podem ser negativos')
+    
+    if 'id' not in values:
+        missing = [field for field in BULK_REQUIRED_FIELDS if field not in values]
+        
+        if missing:
+            raise ValueError(f'Campos obrigatórios para um produto novo: {", ".join(missing)}')
+        
+        if 'stock_delta' in values:
+            raise ValueError('stock_delta só vale para produtos existentes')
+    
+    return values
+
 @product_bp.route('/api/products', methods=['GET'])
 def get_products():
     category_id = request.args.get('category_id')
     search = request.args.get('search')
     featured = request.args.get('featured')
     
-    query = Product.query
+    try:
+        limit = parse_limit()
+        fields = parse_fields(PRODUCT_FIELDS)
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Produtos excluídos ficam só como tombstones da sincronização do catálogo
+    query = Product.query.filter_by(deleted_at=None)
     
     if category_id:
         query = query.filter_by(category_id=category_id)
     
+    # Sem busca a ordem é por id; com busca, por relevância (bm25) e depois id
+    sort_columns = [Product.id]
+    rank = None
+    
     if search:
-        query = query.filter(Product.name.ilike(f'%{search}%'))
+        if search_index_available():
+            match = product_search_subquery(search)
+            
+            if match is None:
+                # O termo não tem nenhuma palavra pesquisável
+                query = query.filter(false())
+            else:
+                query = query.join(match, Product.id == match.c.product_id)
+                rank = match.c.rank.label('search_rank')
+                sort_columns = [match.c.rank, Product.id]
+        else:
+            query = query.filter(or_(
+                Product.name.ilike(f'%{search}%'),
+                Product.description.ilike(f'%{search}%')
+            ))
     
     if featured:
         query = query.filter_by(featured=1)
     
-    products = query.all()
+    try:
+        after = decode_cursor(request.args.get('after'), (float, int) if rank is not None else (int,))
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if after:
+        query = query.filter(keyset_filter(sort_columns, after))
+    
+    query = query.order_by(*sort_columns)
+    
+    if fields:
+        # Apenas as colunas pedidas entram no SELECT
+        _, columns = select_columns(Product, fields, ('id',))
+        query = query.with_entities(*columns)
+    
+    if rank is not None:
+        query = query.add_columns(rank)
     
-    return jsonify({'products': [product.to_dict() for product in products]}), 200
+    def build():
+        rows, has_more = fetch_page(query, limit)
+        
+        # Com busca cada linha traz também o rank, usado no cursor
+        products = [row.Product if rank is not None and not fields else row for row in rows]
+        
+        if fields:
+            result = {'products': [row_to_dict(product, fields) for product in products]}
+        else:
+            result = {'products': [product.to_dict() for product in products]}
+        
+        if limit is not None:
+            cursor = None
+            
+            if has_more:
+                last = rows[-1]
+                key = [last.search_rank] if rank is not None else []
+                cursor = encode_cursor(key + [products[-1].id])
+            
+            result['next_cursor'] = cursor
+        
+        return result
+    
+    return cached_catalog_response('products', build)
 
 @product_bp.route('/api/products/<int:product_id>', methods=['GET'])
 def get_product(product_id):
-    product = Product.query.get(product_id)
+    product = Product.query.filter_by(id=product_id, deleted_at=None).first()
     
     if not product:
         return jsonify({'error': 'Produto não encontrado'}), 404
@@ -38,15 +196,15 @@ def get_product(product_id):
     return jsonify({'product': product.to_dict()}), 200
 
 @product_bp.route('/api/products', methods=['POST'])
+@admin_required
 def create_product():
-    # Aqui deveria ter autenticação JWT para admin
     data = request.get_json()
     
     if not data or not data.get('name') or not data.get('price') or not data.get('category_id'):
         return jsonify({'error': 'Dados incompletos'}), 400
     
     # Verificar se a categoria existe
-    category = Category.query.get(data['category_id'])
+    category = Category.query.filter_by(id=data['category_id'], deleted_at=None).first()
     if not category:
         return jsonify({'error': 'Categoria não encontrada'}), 404
     
@@ -63,13 +221,134 @@ def create_product():
     
     db.session.add(product)
     db.session.commit()
+    bump_catalog_version()
     
     return jsonify({'message': 'Produto criado com sucesso', 'product': product.to_dict()}), 201
 
+@product_bp.route('/api/products/bulk', methods=['POST'])
+@admin_required
+def bulk_upsert_products():
+    try:
+        rows = read_bulk_rows()
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if len(rows) > BULK_MAX_ROWS:
+        return jsonify({'error': f'No máximo {BULK_MAX_ROWS} linhas por lote'}), 400
+    
+    results = []
+    valid_rows = []
+    
+    for row_number, row in enumerate(rows, start=1):
+        try:
+            valid_rows.append((row_number, normalize_bulk_row(row)))
+        except ValueError as e:
+            results.append({'row': row_number, 'status': 'error', 'error': str(e)})
+    
+    # Uma consulta para as categorias e outra para os produtos referenciados
+    category_ids = {values['category_id'] for _, values in valid_rows if 'category_id' in values}
+    product_ids = {values['id'] for _, values in valid_rows if 'id' in values}
+    
+    categories = {
+        category_id for (category_id,) in db.session.query(Category.id)
+        .filter(Category.id.in_(category_ids), Category.deleted_at.is_(None))
+    } if category_ids else set()
+    stocks = dict(
+        db.session.query(Product.id, Product.stock)
+        .filter(Product.id.in_(product_ids), Product.deleted_at.is_(None))
+    ) if product_ids else {}
+    
+    new_products = []
+    updates = {}
+    stock_deltas = []
+    seen = set()
+    
+    for row_number, values in valid_rows:
+        product_id = values.get('id')
+        error = None
+        
+        if 'category_id' in values and values['category_id'] not in categories:
+            error = f'Categoria {values["category_id"]} não encontrada'
+        elif product_id is not None and product_id not in stocks:
+            error = f'Produto {product_id} não encontrado'
+        elif product_id is not None and product_id in seen:
+            error = f'Produto {product_id} repetido no lote'
+        elif stocks.get(product_id, 0) + values.get('stock_delta', 0) < 0:
+            error = 'O estoque ficaria negativo'
+        
+        if error:
+            results.append({'row': row_number, 'status': 'error', 'error': error})
+            continue
+        
+        if product_id is None:
+            new_products.append((row_number, Product(**values)))
+            continue
+        
+        seen.add(product_id)
+        
+        # Produtos que alteram os mesmos campos são atualizados em um único executemany
+        fields = tuple(sorted(field for field in values if field not in ('id', 'stock_delta')))
+        
+        if fields:
+            updates.setdefault(fields, []).append(
+                dict({'product_id': product_id}, **{f'new_{field}': values[field] for field in fields})
+            )
+        
+        if 'stock_delta' in values:
+            stock_deltas.append({'product_id': product_id, 'delta': values['stock_delta']})
+        
+        results.append({'row': row_number, 'status': 'updated', 'id': product_id})
+    
+    products = Product.__table__
+    
+    for fields, params in updates.items():
+        db.session.execute(
+            products.update()
+            .where(products.c.id == bindparam('product_id'))
+            .values({field: bindparam(f'new_{field}') for field in fields}),
+            params
+        )
+    
+    if stock_deltas:
+        # Ajuste relativo e condicional, como na reserva de estoque dos pedidos
+        result = db.session.execute(
+            products.update()
+            .where(products.c.id == bindparam('product_id'))
+            .where(products.c.stock + bindparam('delta') >= 0)
+            .values(stock=products.c.stock + bindparam('delta')),
+            stock_deltas
+        )
+        
+        if result.rowcount != len(stock_deltas):
+            # Um pedido mudou o estoque depois da validação
+            db.session.rollback()
+            return jsonify({'error': 'O estoque mudou durante a atualização, envie o lote novamente'}), 409
+    
+    if new_products:
+        db.session.add_all([product for _, product in new_products])
+        db.session.flush()
+        
+        for row_number, product in new_products:
+            results.append({'row': row_number, 'status': 'created', 'id': product.id})
+    
+    db.session.commit()
+    
+    if updates or stock_deltas or new_products:
+        bump_catalog_version()
+    
+    results.sort(key=lambda result: result['row'])
+    
+    return jsonify({
+        'created': len(new_products),
+        'updated': sum(1 for result in results if result['status'] == 'updated'),
+        'errors': sum(1 for result in results if result['status'] == 'error'),
+        'results': results
+    }), 200
+
 @product_bp.route('/api/products/<int:product_id>', methods=['PUT'])
+@admin_required
 def update_product(product_id):
-    # Aqui deveria ter autenticação JWT para admin
-    product = Product.query.get(product_id)
+    product = Product.query.filter_by(id=product_id, deleted_at=None).first()
     
     if not product:
         return jsonify({'error': 'Produto não encontrado'}), 404
@@ -90,7 +369,7 @@ def update_product(product_id):
     
     if data.get('category_id') is not None:
         # Verificar se a categoria existe
-        category = Category.query.get(data['category_id'])
+        category = Category.query.filter_by(id=data['category_id'], deleted_at=None).first()
         if not category:
             return jsonify({'error': 'Categoria não encontrada'}), 404
         product.category_id = data['category_id']
@@ -105,18 +384,22 @@ def update_product(product_id):
         product.featured = data['featured']
     
     db.session.commit()
+    bump_catalog_version()
     
     return jsonify({'message': 'Produto atualizado com sucesso', 'product': product.to_dict()}), 200
 
 @product_bp.route('/api/products/<int:product_id>', methods=['DELETE'])
+@admin_required
 def delete_product(product_id):
-    # Aqui deveria ter autenticação JWT para admin
-    product = Product.query.get(product_id)
+    product = Product.query.filter_by(id=product_id, deleted_at=None).first()
     
     if not product:
         return jsonify({'error': 'Produto não encontrado'}), 404
     
-    db.session.delete(product)
+    # Exclusão lógica: os pedidos continuam apontando para o produto e os
+    # clientes recebem a remoção na sincronização do catálogo
+    product.deleted_at = datetime.datetime.now()
     db.session.commit()
+    bump_catalog_version()
     
     return jsonify({'message': 'Produto excluído com sucesso'}), 200
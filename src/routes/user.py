@@ -1,12 +1,19 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 from src.models.user import User
 from src.models.db import db
+from src.utils.auth import token_required
+from src.utils.passwords import PasswordHashingBusy, hash_password, verify_password
 import datetime
 import jwt
-import os
 
 user_bp = Blueprint('user_bp', __name__)
 
+@user_bp.errorhandler(PasswordHashingBusy)
+def password_hashing_busy(error):
+    response = jsonify({'error': 'Servidor ocupado, tente novamente em instantes'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 @user_bp.route('/api/users/register', methods=['POST'])
 def register():
     data = request.get_json()
@@ -20,7 +27,7 @@ def register():
     user = User(
         name=data['name'],
         email=data['email'],
-        password=data['password'],  # Em produção, deve-se usar hash
+        password=hash_password(data['password']),
         is_admin=False,
         created_at=datetime.datetime.now()
     )
@@ -39,9 +46,19 @@ def login():
     
     user = User.query.filter_by(email=data['email']).first()
     
-    if not user or user.password != data['password']:  # Em produção, deve-se verificar o hash
+    if not user:
+        return jsonify({'error': 'Credenciais inválidas'}), 401
+    
+    valid, needs_rehash = verify_password(user.password, data['password'])
+    
+    if not valid:
         return jsonify({'error': 'Credenciais inválidas'}), 401
     
+    # Senha em texto puro ou com custo antigo: gravar com o método atual
+    if needs_rehash:
+        user.password = hash_password(data['password'])
+        db.session.commit()
+    
     # Gerar token JWT
     token = jwt.encode(
         {
@@ -49,7 +66,7 @@ def login():
             'is_admin': user.is_admin,
             'exp': datetime.datetime.now() + datetime.timedelta(days=1)
         },
-        os.environ.get('SECRET_KEY', 'hortifruti-delivery-secret-key'),
+        current_app.config['SECRET_KEY'],
         algorithm='HS256'
     )
     
@@ -60,25 +77,9 @@ def login():
     }), 200
 
 @user_bp.route('/api/users/profile', methods=['GET'])
+@token_required
 def profile():
-    # Aqui deveria ter autenticação JWT
-    auth_header = request.headers.get('Authorization')
-    if not auth_header or not auth_header.startswith('Bearer '):
-        return jsonify({'error': 'Token não fornecido'}), 401
-    
-    token = auth_header.split(' ')[1]
-    
-    try:
-        payload = jwt.decode(
-            token,
-            os.environ.get('SECRET_KEY', 'hortifruti-delivery-secret-key'),
-            algorithms=['HS256']
-        )
-        user_id = payload['user_id']
-    except jwt.ExpiredSignatureError:
-        return jsonify({'error': 'Token expirado'}), 401
-    except jwt.InvalidTokenError:
-        return jsonify({'error': 'Token inválido'}), 401
+    user_id = request.user['user_id']
     
     user = User.query.get(user_id)
     if not user:
@@ -87,25 +88,9 @@ def profile():
     return jsonify({'user': user.to_dict()}), 200
 
 @user_bp.route('/api/users/update', methods=['PUT'])
+@token_required
 def update():
-    # Aqui deveria ter autenticação JWT
-    auth_header = request.headers.get('Authorization')
-    if not auth_header or not auth_header.startswith('Bearer '):
-        return jsonify({'error': 'Token não fornecido'}), 401
-    
-    token = auth_header.split(' ')[1]
-    
-    try:
-        payload = jwt.decode(
-            token,
-            os.environ.get('SECRET_KEY', 'hortifruti-delivery-secret-key'),
-            algorithms=['HS256']
-        )
-        user_id = payload['user_id']
-    except jwt.ExpiredSignatureError:
-        return jsonify({'error': 'Token expirado'}), 401
-    except jwt.InvalidTokenError:
-        return jsonify({'error': 'Token inválido'}), 401
+    user_id = request.user['user_id']
     
     user = User.query.get(user_id)
     if not user:
@@ -122,7 +107,7 @@ def update():
         user.email = data['email']
     
     if data.get('password'):
-        user.password = data['password']  # Em produção, deve-se usar hash
+        user.password = hash_password(data['password'])
     
     db.session.commit()
     
@@ -22,6 +22,35 @@ function initAdminPanel() {
     
     // Carregar dados iniciais do dashboard
     loadDashboardData();
+    
+    // Receber novos pedidos e mudanças de status em tempo real
+    subscribeOrderEvents();
+}
+
+function subscribeOrderEvents() {
+    if (!window.EventSource) {
+        return;
+    }
+    
+    // O EventSource não envia cabeçalhos, então o token vai na URL; ao
+    // reconectar, o navegador envia o último id recebido (Last-Event-ID)
+    const token = localStorage.getItem('token');
+    const source = new EventSource(`/api/orders/events?token=${encodeURIComponent(token)}`);
+    
+    const refresh = () => {
+        if (document.getElementById('dashboard-content').classList.contains('active')) {
+            loadDashboardData();
+        }
+        
+        if (document.getElementById('orders-content').classList.contains('active')) {
+            loadOrdersData();
+        }
+    };
+    
+    source.addEventListener('order-created', refresh);
+    source.addEventListener('status-changed', refresh);
+    // Eventos perdidos durante a desconexão: recarregar tudo
+    source.addEventListener('reset', refresh);
 }
 
 function checkAdminAuth() {
@@ -5,6 +5,9 @@ const API_URL = window.location.hostname === 'localhost' || window.location.host
     ? 'http://localhost:5000/api' 
     : '/api';
 
+// Produtos por página ao carregar mais (a primeira página vem do /api/bootstrap)
+const PRODUCT_PAGE_SIZE = 20;
+
 // Estado global da aplicação
 const state = {
     currentSection: 'home',
@@ -13,6 +16,9 @@ const state = {
     cart: [],
     products: [],
     categories: [],
+    catalog: null,
+    // Primeira página do /api/bootstrap, usada até o catálogo ser sincronizado
+    productPage: null,
     orders: [],
     currentProduct: null,
     isAdmin: false
@@ -165,8 +171,83 @@ function navigateTo(section) {
 
 // Carregar dados iniciais
 function loadInitialData() {
-    loadFeaturedProducts();
-    loadCategories();
+    let rendered = false;
+    
+    // Com a cópia local do catálogo (IndexedDB) a tela é montada sem rede; na
+    // primeira visita, com uma única requisição a /api/bootstrap. Depois disso
+    // só as mudanças desde a última sincronização são baixadas
+    readCatalog()
+        .catch(() => ({ version: 0 }))
+        .then(catalog => {
+            if (catalog.version) {
+                renderCatalog(catalog);
+                rendered = true;
+                return;
+            }
+            
+            return loadBootstrap().then(() => {
+                rendered = true;
+                
+                // A cópia completa do catálogo só é baixada depois da primeira tela
+                return whenIdle();
+            });
+        })
+        .then(() => syncCatalog(API_URL))
+        .then(changes => {
+            if (catalogChanged(changes)) {
+                return readCatalog().then(renderCatalog);
+            }
+        })
+        .catch(error => {
+            console.error('Erro ao carregar o catálogo:', error);
+            
+            if (!rendered) {
+                loadFeaturedProducts();
+                loadCategories();
+            }
+        });
+}
+
+// Destaques, categorias e a primeira página de produtos em uma resposta
+function loadBootstrap() {
+    return fetch(`${API_URL}/bootstrap`)
+        .then(response => {
+            if (!response.ok) {
+                throw new Error(`Falha ao carregar a loja (${response.status})`);
+            }
+            
+            return response.json();
+        })
+        .then(data => {
+            state.productPage = data.products;
+            renderFeaturedProducts(data.featured);
+            renderCategories(data.categories);
+        });
+}
+
+// Resolve quando o navegador estiver ocioso (ou após alguns segundos)
+function whenIdle() {
+    return new Promise(resolve => {
+        if ('requestIdleCallback' in window) {
+            requestIdleCallback(() => resolve(), { timeout: 5000 });
+        } else {
+            setTimeout(resolve, 2000);
+        }
+    });
+}
+
+// Exibir destaques e categorias a partir do catálogo sincronizado
+function renderCatalog(catalog) {
+    const byId = (a, b) => a.id - b.id;
+    
+    state.catalog = {
+        products: catalog.products.sort(byId),
+        categories: catalog.categories.sort(byId)
+    };
+    state.productPage = null;
+    
+    renderFeaturedProducts(state.catalog.products.filter(product => product.featured));
+    renderCategories(state.catalog.categories);
 }
 
 // Carregar produtos em destaque
@@ -176,27 +257,30 @@ function loadFeaturedProducts() {
     
     fetch(`${API_URL}/products?featured=1`)
         .then(response => response.json())
-        .then(data => {
-            state.products = data.products;
-            
-            if (data.products.length === 0) {
-                featuredProductsContainer.innerHTML = '<div class="col-12 text-center"><p>Nenhum produto em destaque disponível.</p></div>';
-                return;
-            }
-            
-            featuredProductsContainer.innerHTML = '';
-            
-            data.products.forEach(product => {
-                const productCard = createProductCard(product);
-                featuredProductsContainer.appendChild(productCard);
-            });
-        })
+        .then(data => renderFeaturedProducts(data.products))
         .catch(error => {
             console.error('Erro ao carregar produtos em destaque:', error);
             featuredProductsContainer.innerHTML = '<div class="col-12 text-center"><p>Erro ao carregar produtos. Tente novamente mais tarde.</p></div>';
         });
 }
 
+function renderFeaturedProducts(products) {
+    const featuredProductsContainer = document.getElementById('featured-products');
+    state.products = products;
+    
+    if (products.length === 0) {
+        featuredProductsContainer.innerHTML = '<div class="col-12 text-center"><p>Nenhum produto em destaque disponível.</p></div>';
+        return;
+    }
+    
+    featuredProductsContainer.innerHTML = '';
+    
+    products.forEach(product => {
+        const productCard = createProductCard(product);
+        featuredProductsContainer.appendChild(productCard);
+    });
+}
+
 // Carregar todos os produtos
 function loadAllProducts() {
     const productsContainer = document.getElementById('products-container');
@@ -208,6 +292,20 @@ function loadAllProducts() {
     const categoryFilter = document.getElementById('category-filter').value;
     const searchQuery = document.getElementById('search-product').value;
     
+    // Sem busca, a lista sai do catálogo sincronizado; a busca usa o índice do servidor
+    if (state.catalog && !searchQuery) {
+        renderProductList(state.catalog.products.filter(
+            product => !categoryFilter || product.category_id === Number(categoryFilter)
+        ));
+        return;
+    }
+    
+    // Antes da sincronização, a lista sem filtros começa pela página do bootstrap
+    if (state.productPage && !searchQuery && !categoryFilter) {
+        renderProductPage();
+        return;
+    }
+    
     // Construir URL com filtros
     let url = `${API_URL}/products`;
     const params = [];
@@ -225,34 +323,73 @@ function loadAllProducts() {
     }
     
     fetch(url)
+        .then(response => response.json())
+        .then(data => renderProductList(data.products))
+        .catch(error => {
+            console.error('Erro ao carregar produtos:', error);
+            productsContainer.innerHTML = '<div class="col-12 text-center"><p>Erro ao carregar produtos. Tente novamente mais tarde.</p></div>';
+        });
+}
+
+function renderProductList(products) {
+    const productsContainer = document.getElementById('products-container');
+    const noProducts = document.getElementById('no-products');
+    state.products = products;
+    
+    if (products.length === 0) {
+        productsContainer.innerHTML = '';
+        noProducts.style.display = 'block';
+        return;
+    }
+    
+    noProducts.style.display = 'none';
+    productsContainer.innerHTML = '';
+    
+    products.forEach(product => {
+        const productCard = createProductCard(product);
+        productsContainer.appendChild(productCard);
+    });
+}
+
+// Páginas já carregadas da lista sem filtros, com o botão para a próxima
+function renderProductPage() {
+    const productsContainer = document.getElementById('products-container');
+    const page = state.productPage;
+    
+    renderProductList(page.products);
+    
+    if (page.next_cursor) {
+        const more = document.createElement('div');
+        more.className = 'col-12 text-center mb-4';
+        more.innerHTML = '<button class="btn btn-outline-secondary">Carregar mais produtos</button>';
+        more.querySelector('button').addEventListener('click', loadMoreProducts);
+        productsContainer.appendChild(more);
+    }
+}
+
+// Carregar a próxima página da lista a partir do cursor
+function loadMoreProducts() {
+    const page = state.productPage;
+    
+    fetch(`${API_URL}/products?limit=${PRODUCT_PAGE_SIZE}&after=${encodeURIComponent(page.next_cursor)}`)
         .then(response => response.json())
         .then(data => {
-            state.products = data.products;
-            
-            if (data.products.length === 0) {
-                productsContainer.innerHTML = '';
-                noProducts.style.display = 'block';
-                return;
-            }
-            
-            noProducts.style.display = 'none';
-            productsContainer.innerHTML = '';
+            // O catálogo pode ter sido sincronizado enquanto a página carregava
+            if (state.productPage !== page) return;
             
-            data.products.forEach(product => {
-                const productCard = createProductCard(product);
-                productsContainer.appendChild(productCard);
-            });
+            page.products = page.products.concat(data.products);
+            page.next_cursor = data.next_cursor;
+            renderProductPage();
         })
         .catch(error => {
             console.error('Erro ao carregar produtos:', error);
-            productsContainer.innerHTML = '<div class="col-12 text-center"><p>Erro ao carregar produtos. Tente novamente mais tarde.</p></div>';
+            showToast('Erro ao carregar mais produtos. Tente novamente.', 'error');
         });
 }
 
 // Carregar categorias
 function loadCategories() {
     const categoriesContainer = document.getElementById('categories-container');
-    const categoryFilter = document.getElementById('category-filter');
     
     if (categoriesContainer) {
         categoriesContainer.innerHTML = '<div class="col-12 text-center"><div class="spinner-border text-success" role="status"><span class="visually-hidden">Carregando...</span></div></div>';
@@ -260,39 +397,7 @@ function loadCategories() {
     
     fetch(`${API_URL}/categories`)
         .then(response => response.json())
-        .then(data => {
-            state.categories = data.categories;
-            
-            // Atualizar filtro de categorias
-            if (categoryFilter) {
-                const currentValue = categoryFilter.value;
-                categoryFilter.innerHTML = '<option value="">Todas as Categorias</option>';
-                
-                data.categories.forEach(category => {
-                    const option = document.createElement('option');
-                    option.value = category.id;
-                    option.textContent = category.name;
-                    categoryFilter.appendChild(option);
-                });
-                
-                categoryFilter.value = currentValue;
-            }
-            
-            // Atualizar lista de categorias
-            if (categoriesContainer) {
-                if (data.categories.length === 0) {
-                    categoriesContainer.innerHTML = '<div class="col-12 text-center"><p>Nenhuma categoria disponível.</p></div>';
-                    return;
-                }
-                
-                categoriesContainer.innerHTML = '';
-                
-                data.categories.forEach(category => {
-                    const categoryCard = createCategoryCard(category);
-                    categoriesContainer.appendChild(categoryCard);
-                });
-            }
-        })
+        .then(data => renderCategories(data.categories))
         .catch(error => {
             console.error('Erro ao carregar categorias:', error);
             if (categoriesContainer) {
@@ -301,6 +406,42 @@ function loadCategories() {
         });
 }
 
+function renderCategories(categories) {
+    const categoriesContainer = document.getElementById('categories-container');
+    const categoryFilter = document.getElementById('category-filter');
+    state.categories = categories;
+    
+    // Atualizar filtro de categorias
+    if (categoryFilter) {
+        const currentValue = categoryFilter.value;
+        categoryFilter.innerHTML = '<option value="">Todas as Categorias</option>';
+        
+        categories.forEach(category => {
+            const option = document.createElement('option');
+            option.value = category.id;
+            option.textContent = category.name;
+            categoryFilter.appendChild(option);
+        });
+        
+        categoryFilter.value = currentValue;
+    }
+    
+    // Atualizar lista de categorias
+    if (categoriesContainer) {
+        if (categories.length === 0) {
+            categoriesContainer.innerHTML = '<div class="col-12 text-center"><p>Nenhuma categoria disponível.</p></div>';
+            return;
+        }
+        
+        categoriesContainer.innerHTML = '';
+        
+        categories.forEach(category => {
+            const categoryCard = createCategoryCard(category);
+            categoriesContainer.appendChild(categoryCard);
+        });
+    }
+}
+
 // Criar card de produto
 function createProductCard(product) {
     const col = document.createElement('div');
@@ -989,17 +1130,21 @@ function placeOrder() {
     });
 }
 
-// Carregar pedidos do usuário
-function loadUserOrders() {
+// Carregar pedidos do usuário (histórico resumido; com cursor, a próxima página)
+function loadUserOrders(cursor) {
     if (!state.token) return;
     
     const ordersContent = document.getElementById('orders-content');
     const ordersEmpty = document.getElementById('orders-empty');
     const ordersList = document.getElementById('orders-list');
     
-    ordersList.innerHTML = '<div class="col-12 text-center"><div class="spinner-border text-success" role="status"><span class="visually-hidden">Carregando...</span></div></div>';
+    if (!cursor) {
+        ordersList.innerHTML = '<div class="col-12 text-center"><div class="spinner-border text-success" role="status"><span class="visually-hidden">Carregando...</span></div></div>';
+    }
     
-    fetch(`${API_URL}/orders`, {
+    const url = cursor ? `${API_URL}/orders/history?after=${encodeURIComponent(cursor)}` : `${API_URL}/orders/history`;
+    
+    fetch(url, {
         headers: {
             'Authorization': `Bearer ${state.token}`
         }
@@ -1011,9 +1156,9 @@ function loadUserOrders() {
         return response.json();
     })
     .then(data => {
-        state.orders = data.orders;
+        state.orders = cursor ? state.orders.concat(data.orders) : data.orders;
         
-        if (data.orders.length === 0) {
+        if (state.orders.length === 0) {
             ordersContent.style.display = 'none';
             ordersEmpty.style.display = 'block';
             return;
@@ -1022,7 +1167,12 @@ function loadUserOrders() {
         ordersContent.style.display = 'block';
         ordersEmpty.style.display = 'none';
         
-        ordersList.innerHTML = '';
+        if (cursor) {
+            const loadMore = document.getElementById('orders-load-more');
+            if (loadMore) loadMore.remove();
+        } else {
+            ordersList.innerHTML = '';
+        }
         
         data.orders.forEach(order => {
             const col = document.createElement('div');
@@ -1085,22 +1235,30 @@ function loadUserOrders() {
                         </div>
                         <p class="card-text text-muted mb-2">Data: ${formattedDate}</p>
                         <p class="card-text mb-3">Total: R$ ${order.total.toFixed(2)}</p>
-                        <p class="card-text mb-3">Itens: ${order.items.length}</p>
+                        <p class="card-text mb-1">Itens: ${order.item_count}</p>
+                        <p class="card-text text-muted small mb-3">${order.items_preview}</p>
                         <button class="btn btn-outline-success w-100 view-order" data-id="${order.id}">Ver Detalhes</button>
                     </div>
                 </div>
             `;
             
+            // Adicionar evento para visualizar pedido
+            col.querySelector('.view-order').addEventListener('click', () => {
+                viewOrder(order.id);
+            });
+            
             ordersList.appendChild(col);
         });
         
-        // Adicionar eventos para visualizar pedido
-        document.querySelectorAll('.view-order').forEach(button => {
-            button.addEventListener('click', () => {
-                const orderId = parseInt(button.getAttribute('data-id'));
-                viewOrder(orderId);
-            });
-        });
+        // Botão para a próxima página do histórico
+        if (data.next_cursor) {
+            const more = document.createElement('div');
+            more.id = 'orders-load-more';
+            more.className = 'col-12 text-center mb-4';
+            more.innerHTML = '<button class="btn btn-outline-secondary">Carregar mais pedidos</button>';
+            more.querySelector('button').addEventListener('click', () => loadUserOrders(data.next_cursor));
+            ordersList.appendChild(more);
+        }
     })
     .catch(error => {
         console.error('Erro ao carregar pedidos:', error);
@@ -1108,13 +1266,30 @@ function loadUserOrders() {
     });
 }
 
-// Visualizar pedido
+// Visualizar pedido (os itens são carregados só ao abrir o pedido)
 function viewOrder(orderId) {
     if (!state.token) return;
     
-    const order = state.orders.find(o => o.id === orderId);
-    if (!order) return;
-    
+    fetch(`${API_URL}/orders/${orderId}`, {
+        headers: {
+            'Authorization': `Bearer ${state.token}`
+        }
+    })
+    .then(response => {
+        if (!response.ok) {
+            throw new Error('Erro ao carregar pedido');
+        }
+        return response.json();
+    })
+    .then(data => showOrderDetail(data.order))
+    .catch(error => {
+        console.error('Erro ao carregar pedido:', error);
+        showToast('Erro ao carregar pedido. Tente novamente mais tarde.', 'error');
+    });
+}
+
+// Preencher a seção de detalhes do pedido
+function showOrderDetail(order) {
     // Preencher detalhes do pedido
     document.getElementById('order-detail-id').textContent = order.id;
     
@@ -1227,6 +1402,12 @@ function setupPWA() {
             navigator.serviceWorker.register('/static/js/service-worker.js')
                 .then(registration => {
                     console.log('Service Worker registrado com sucesso:', registration);
+                    
+                    // Manter o catálogo local atualizado mesmo com o app fechado
+                    if ('periodicSync' in registration) {
+                        registration.periodicSync.register('catalog-sync', { minInterval: 12 * 60 * 60 * 1000 })
+                            .catch(error => console.log('Sincronização periódica indisponível:', error));
+                    }
                 })
                 .catch(error => {
                     console.log('Falha ao registrar Service Worker:', error);
@@ -0,0 +1,93 @@
+// Espelho do catálogo (produtos e categorias) no IndexedDB.
+//
+// A primeira sincronização baixa o catálogo inteiro; as seguintes pedem a
+// /api/catalog/changes apenas o que mudou desde a última versão guardada
+// (linhas alteradas e ids removidos). Usado pela página (app.js) e pelo
+// service worker (importScripts).
+
+const CATALOG_DB_NAME = 'hortifruti-catalog';
+const CATALOG_DB_VERSION = 1;
+const CATALOG_STORES = ['products', 'categories'];
+
+function openCatalogDB() {
+    return new Promise((resolve, reject) => {
+        const request = indexedDB.open(CATALOG_DB_NAME, CATALOG_DB_VERSION);
+
+        request.onupgradeneeded = () => {
+            const db = request.result;
+            CATALOG_STORES.forEach(name => db.createObjectStore(name, { keyPath: 'id' }));
+            db.createObjectStore('meta');
+        };
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+function requestResult(request) {
+    return new Promise((resolve, reject) => {
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+function transactionDone(transaction) {
+    return new Promise((resolve, reject) => {
+        transaction.oncomplete = () => resolve();
+        transaction.onerror = transaction.onabort = () => reject(transaction.error);
+    });
+}
+
+// Catálogo guardado localmente: { version, products, categories }
+function readCatalog() {
+    return openCatalogDB().then(db => {
+        const transaction = db.transaction([...CATALOG_STORES, 'meta'], 'readonly');
+
+        return Promise.all([
+            requestResult(transaction.objectStore('meta').get('version')),
+            requestResult(transaction.objectStore('products').getAll()),
+            requestResult(transaction.objectStore('categories').getAll())
+        ]).then(([version, products, categories]) => {
+            db.close();
+            return { version: version || 0, products, categories };
+        });
+    });
+}
+
+// Aplica as mudanças desde a versão guardada; retorna a resposta do servidor
+function syncCatalog(apiUrl = '/api') {
+    return openCatalogDB().then(db => {
+        return requestResult(db.transaction('meta').objectStore('meta').get('version'))
+            .then(version => fetch(`${apiUrl}/catalog/changes?since=${version || 0}`))
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error(`Sincronização do catálogo falhou (${response.status})`);
+                }
+
+                return response.json();
+            })
+            .then(changes => {
+                const transaction = db.transaction([...CATALOG_STORES, 'meta'], 'readwrite');
+
+                CATALOG_STORES.forEach(name => {
+                    const store = transaction.objectStore(name);
+
+                    // Banco do servidor recriado: a cópia local é descartada
+                    if (changes.reset) {
+                        store.clear();
+                    }
+
+                    changes[name].forEach(row => store.put(row));
+                    changes.deleted[name].forEach(id => store.delete(id));
+                });
+
+                transaction.objectStore('meta').put(changes.version, 'version');
+
+                return transactionDone(transaction).then(() => changes);
+            })
+            .finally(() => db.close());
+    });
+}
+
+function catalogChanged(changes) {
+    return changes.reset || CATALOG_STORES.some(name => changes[name].length > 0 || changes.deleted[name].length > 0);
+}
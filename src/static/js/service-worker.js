@@ -1,11 +1,14 @@
 // Service Worker para PWA Hortifruti Delivery
-const CACHE_NAME = 'hortifruti-delivery-v2';
+importScripts('/static/js/catalog-sync.js');
+
+const CACHE_NAME = 'hortifruti-delivery-v4';
 const urlsToCache = [
   '/',
   '/index.html',
   '/static/css/styles.css',
   '/static/js/app.js',
   '/static/js/cart.js',
+  '/static/js/catalog-sync.js',
   '/static/manifest.json',
   '/static/images/icons/icon-72x72.png',
   '/static/images/icons/icon-96x96.png',
@@ -30,6 +33,12 @@ self.addEventListener('install', event => {
 
 // Interceptação de requisições para servir do cache quando offline
 self.addEventListener('fetch', event => {
+  // A API vai sempre para a rede: o catálogo offline fica no IndexedDB
+  // (catalog-sync.js), e uma resposta em cache nunca seria atualizada
+  if (new URL(event.request.url).pathname.startsWith('/api/')) {
+    return;
+  }
+
   event.respondWith(
     caches.match(event.request)
       .then(response => {
@@ -86,6 +95,13 @@ self.addEventListener('activate', event => {
   );
 });
 
+// Sincronização periódica do catálogo em segundo plano (onde houver suporte)
+self.addEventListener('periodicsync', event => {
+  if (event.tag === 'catalog-sync') {
+    event.waitUntil(syncCatalog());
+  }
+});
+
 // Evento para mostrar notificação de instalação
 self.addEventListener('beforeinstallprompt', (e) => {
   // Previne o comportamento padrão do navegador
@@ -0,0 +1,214 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+from flask import current_app, request, send_from_directory
+from src.utils.static_index import ENCODINGS, PAGE_CACHE, MemoryPage, default_pages
+
+try:
+    import brotli
+except ImportError:  # sem o pacote Brotli só são geradas as versões .gz
+    brotli = None
+
+# Arquivos estáticos com hash no nome, cache longo e versões pré-comprimidas.
+#
+# `flask build-assets` copia src/static para ASSETS_BUILD_DIR:
+#
+#   assets/  cada arquivo com o hash do conteúdo no nome (js/app.3f9a1c2b7d.js),
+#            servido em /assets/... com Cache-Control immutable
+#   pages/   as páginas com URL fixa (index.html, admin/index.html e o service
+#            worker), com as referências /static/... trocadas pelos nomes com
+#            hash e servidas com no-cache
+#
+# Arquivos de texto ganham irmãos .br e .gz, escolhidos pelo Accept-Encoding.
+# Sem o build (em desenvolvimento) tudo continua sendo servido de src/static.
+
+ASSETS_URL_PATH = '/assets'
+ASSETS_MANIFEST = 'assets-manifest.json'
+
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+
+# Páginas referenciadas por URL fixa: reescritas, mas sem hash no nome
+PAGES = ('index.html', 'admin/index.html', 'js/service-worker.js')
+SKIP_DIRS = ('test',)
+
+TEXT_EXTENSIONS = ('.html', '.css', '.js', '.json', '.svg', '.txt')
+
+STATIC_REFERENCE_RE = re.compile(r'/static/([A-Za-z0-9_./-]+)')
+
+def assets_build_dir(app):
+    return app.config.get('ASSETS_BUILD_DIR', os.environ.get(
+        'ASSETS_BUILD_DIR', os.path.join(app.root_path, 'static_dist')
+    ))
+
+def hashed_name(path, content):
+    name, extension = os.path.splitext(path)
+    return f'{name}.{hashlib.sha256(content).hexdigest()[:10]}{extension}'
+
+def rewrite_references(text, assets):
+    """Troca /static/<arquivo> pela URL com hash, quando o arquivo foi gerado"""
+    def replace(match):
+        path = match.group(1)
+        return f'{ASSETS_URL_PATH}/{assets[path]}' if path in assets else match.group(0)
+
+    return STATIC_REFERENCE_RE.sub(replace, text)
+
+def write_file(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with open(path, 'wb') as f:
+        f.write(content)
+
+def write_compressed(path, content):
+    """Grava as versões .br e .gz que ficarem menores; retorna as codificações geradas"""
+    variants = {'gzip': gzip.compress(content, compresslevel=9, mtime=0)}
+
+    if brotli is not None:
+        variants['br'] = brotli.compress(content, quality=11)
+
+    written = []
+
+    for encoding, suffix in ENCODINGS:
+        compressed = variants.get(encoding)
+
+        # Arquivos pequenos quase não diminuem e não valem a negociação
+        if compressed is not None and len(compressed) < len(content) * 0.9:
+            write_file(path + suffix, compressed)
+            written.append(encoding)
+
+    return written
+
+def static_files(static_folder):
+    """Caminhos relativos (com /) dos arquivos a processar"""
+    for root, dirs, files in os.walk(static_folder):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.') and
+                         os.path.relpath(os.path.join(root, d), static_folder) not in SKIP_DIRS)
+
+        for name in sorted(files):
+            if not name.startswith('.'):
+                yield os.path.relpath(os.path.join(root, name), static_folder).replace(os.sep, '/')
+
+def build_assets(static_folder, build_dir):
+    """Gera o build em build_dir (apagando o anterior) e retorna o manifesto"""
+    if os.path.isdir(build_dir):
+        shutil.rmtree(build_dir)
+
+    paths = list(static_files(static_folder))
+    is_text = lambda path: path.endswith(TEXT_EXTENSIONS)
+
+    # Ordem: binários, depois textos (que referenciam binários), o manifest.json
+    # do PWA (que referencia os ícones) e por fim as páginas, que referenciam tudo
+    ordered = (
+        [path for path in paths if not is_text(path)] +
+        [path for path in paths if is_text(path) and path not in PAGES and path != 'manifest.json'] +
+        [path for path in paths if path == 'manifest.json']
+    )
+
+    assets = {}
+    encodings = {}
+
+    for path in ordered:
+        with open(os.path.join(static_folder, path), 'rb') as f:
+            content = f.read()
+
+        if is_text(path):
+            content = rewrite_references(content.decode('utf-8'), assets).encode('utf-8')
+
+        target = hashed_name(path, content)
+        write_file(os.path.join(build_dir, 'assets', target), content)
+        assets[path] = target
+
+        if is_text(path):
+            encodings[target] = write_compressed(os.path.join(build_dir, 'assets', target), content)
+
+    pages = {}
+
+    for path in PAGES:
+        if path not in paths:
+            continue
+
+        with open(os.path.join(static_folder, path), 'rb') as f:
+            content = rewrite_references(f.read().decode('utf-8'), assets).encode('utf-8')
+
+        write_file(os.path.join(build_dir, 'pages', path), content)
+        pages[path] = write_compressed(os.path.join(build_dir, 'pages', path), content)
+
+    manifest = {'assets': assets, 'encodings': encodings, 'pages': pages}
+    write_file(os.path.join(build_dir, ASSETS_MANIFEST), json.dumps(manifest, indent=2).encode('utf-8'))
+
+    return manifest
+
+def load_manifest(build_dir):
+    try:
+        with open(os.path.join(build_dir, ASSETS_MANIFEST), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def send_precompressed(directory, path, available, cache_control):
+    """Envia a melhor versão aceita pelo cliente (br, gzip ou a original)"""
+    options = {
+        'mimetype': mimetypes.guess_type(path)[0] or 'application/octet-stream',
+        'download_name': os.path.basename(path)
+    }
+
+    for encoding, suffix in ENCODINGS:
+        if encoding in available and request.accept_encodings.quality(encoding) > 0:
+            response = send_from_directory(directory, path + suffix, **options)
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_from_directory(directory, path, **options)
+
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+def load_pages(app):
+    """Páginas mantidas em memória: as do build, ou o index.html de src/static"""
+    manifest = app.extensions.get('assets')
+
+    if manifest is None:
+        return default_pages(app)
+
+    directory = os.path.join(assets_build_dir(app), 'pages')
+    return {path: MemoryPage(os.path.join(directory, path)) for path in manifest['pages']}
+
+def send_page(path):
+    """Envia uma página de URL fixa (index.html etc.) a partir da memória"""
+    page = current_app.extensions['pages'].get(path)
+
+    if page is not None:
+        return page.response()
+
+    response = send_from_directory(current_app.static_folder, path)
+    response.headers['Cache-Control'] = PAGE_CACHE
+    return response
+
+def init_assets(app):
+    # O manifesto é lido uma vez por processo; depois de um novo build os
+    # workers precisam ser reiniciados
+    manifest = load_manifest(assets_build_dir(app))
+    app.extensions['assets'] = manifest
+
+    if manifest is None:
+        return
+
+    assets_dir = os.path.join(assets_build_dir(app), 'assets')
+    static_view = app.view_functions['static']
+
+    @app.route(f'{ASSETS_URL_PATH}/<path:filename>')
+    def hashed_asset(filename):
+        return send_precompressed(assets_dir, filename, manifest['encodings'].get(filename, ()), IMMUTABLE_CACHE)
+
+    # /static/... continua servindo os originais, exceto as páginas reescritas
+    def static_with_pages(filename):
+        if filename in manifest['pages']:
+            return send_page(filename)
+
+        return static_view(filename=filename)
+
+    app.view_functions['static'] = static_with_pages
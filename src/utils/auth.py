@@ -0,0 +1,119 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+import jwt
+from flask import current_app, jsonify, request
+
+# Autenticação JWT compartilhada por todos os blueprints.
+#
+# Os tokens já verificados ficam em um cache LRU (token -> payload), de modo
+# que requisições seguintes com o mesmo token não recalculam o HMAC. Cada
+# entrada expira no `exp` do próprio token; tokens sem `exp` não são guardados.
+
+class TokenCache:
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        with self._lock:
+            entry = self._entries.get(token)
+
+            if entry is None:
+                return None
+
+            payload, expires_at = entry
+
+            if time.time() >= expires_at:
+                del self._entries[token]
+                return None
+
+            self._entries.move_to_end(token)
+            return payload
+
+    def set(self, token, payload):
+        expires_at = payload.get('exp')
+
+        if not isinstance(expires_at, (int, float)):
+            return
+
+        with self._lock:
+            self._entries[token] = (payload, expires_at)
+            self._entries.move_to_end(token)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+token_cache = TokenCache(max_entries=int(os.environ.get('TOKEN_CACHE_SIZE', 1024)))
+
+def decode_token(token):
+    """Retorna o payload do token, verificando a assinatura só na primeira vez.
+
+    Lança jwt.ExpiredSignatureError ou jwt.InvalidTokenError como jwt.decode.
+    """
+    payload = token_cache.get(token)
+
+    if payload is None:
+        payload = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
+        token_cache.set(token, payload)
+
+    return payload
+
+def get_request_token(allow_query=False):
+    auth_header = request.headers.get('Authorization')
+
+    if auth_header and auth_header.startswith('Bearer '):
+        return auth_header.split(' ')[1]
+
+    # O EventSource do navegador não envia cabeçalhos; rotas de streaming
+    # aceitam o token em ?token=
+    if allow_query:
+        return request.args.get('token')
+
+    return None
+
+def authenticate(f, allow_query=False):
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        token = get_request_token(allow_query)
+        if not token:
+            return jsonify({'error': 'Token não fornecido'}), 401
+
+        try:
+            # Adicionar payload ao request para uso nas rotas
+            request.user = decode_token(token)
+        except jwt.ExpiredSignatureError:
+            return jsonify({'error': 'Token expirado'}), 401
+        except jwt.InvalidTokenError:
+            return jsonify({'error': 'Token inválido'}), 401
+
+        return f(*args, **kwargs)
+
+    return decorated
+
+# Middleware para verificar token JWT
+def token_required(f):
+    return authenticate(f)
+
+# Como token_required, aceitando também ?token= (para EventSource)
+def stream_token_required(f):
+    return authenticate(f, allow_query=True)
+
+# Middleware para verificar se o usuário é admin
+def admin_required(f):
+    @wraps(f)
+    @token_required
+    def decorated(*args, **kwargs):
+        if not request.user.get('is_admin', False):
+            return jsonify({'error': 'Acesso negado'}), 403
+
+        return f(*args, **kwargs)
+
+    return decorated
@@ -0,0 +1,109 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, json, request
+
+# Cache em memória das respostas do catálogo (produtos e categorias).
+# Cada entrada guarda o corpo JSON já serializado e o ETag calculado a partir
+# dele, de modo que uma requisição com If-None-Match válido é respondida com
+# 304 sem consultar o SQLite.
+#
+# A versão do catálogo é incrementada a cada escrita nos blueprints de
+# produtos e categorias; qualquer incremento descarta todas as entradas.
+# Como cada worker do gunicorn tem sua própria cópia do cache, as entradas
+# também expiram após CATALOG_CACHE_TTL segundos, limitando o tempo em que
+# um worker pode servir dados que foram alterados em outro processo.
+
+class CatalogCache:
+    def __init__(self, max_entries=256, ttl=30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def bump(self):
+        """Incrementa a versão do catálogo e descarta as respostas em cache"""
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+            return self.version
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                return None
+
+            if entry['version'] != self.version or time.monotonic() >= entry['expires_at']:
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, version, body):
+        entry = {
+            'version': version,
+            'body': body,
+            'etag': hashlib.sha256(body).hexdigest(),
+            'expires_at': time.monotonic() + self.ttl
+        }
+
+        with self._lock:
+            # Não guardar uma resposta montada antes de uma escrita concorrente
+            if version == self.version:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        return entry
+
+catalog_cache = CatalogCache(
+    max_entries=int(os.environ.get('CATALOG_CACHE_MAX_ENTRIES', 256)),
+    ttl=float(os.environ.get('CATALOG_CACHE_TTL', 30))
+)
+
+def bump_catalog_version():
+    """Deve ser chamada após cada commit que altera produtos ou categorias"""
+    return catalog_cache.bump()
+
+def cached_catalog_entry(key, build):
+    """Entrada do cache para `key`, montando o corpo com `build` quando não há"""
+    entry = catalog_cache.get(key)
+
+    if entry is None:
+        version = catalog_cache.version
+        body = json.dumps(build()).encode('utf-8')
+        entry = catalog_cache.set(key, version, body)
+
+    return entry
+
+def catalog_response(body, etag):
+    """Resposta JSON com ETag, ou 304 quando o If-None-Match ainda vale"""
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(body, status=200, mimetype='application/json')
+
+    response.set_etag(etag)
+    # O cliente pode guardar a resposta, mas deve revalidar a cada uso
+    response.headers['Cache-Control'] = 'no-cache'
+
+    return response
+
+def cached_catalog_response(name, build):
+    """Retorna a resposta JSON do catálogo usando o cache e ETag/If-None-Match.
+
+    `build` só é chamada quando não há entrada válida em cache e deve
+    retornar o dicionário a ser serializado.
+    """
+    key = (name, tuple(sorted(request.args.items(multi=True))))
+    entry = cached_catalog_entry(key, build)
+
+    return catalog_response(entry['body'], entry['etag'])
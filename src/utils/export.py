@@ -0,0 +1,86 @@
+import csv
+import datetime
+import io
+import json
+import os
+from flask import Response, request, stream_with_context
+from src.models.db import db
+
+# Exportação em streaming (NDJSON ou CSV).
+#
+# A consulta é lida em lotes de EXPORT_BATCH_SIZE linhas e cada lote é
+# serializado e enviado antes de ler o próximo, de modo que a memória do
+# worker não cresce com o número de linhas e o primeiro byte sai logo.
+
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 500))
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+class ExportError(ValueError):
+    pass
+
+def parse_export_format():
+    export_format = request.args.get('format', 'ndjson')
+
+    if export_format not in EXPORT_FORMATS:
+        raise ExportError(f'Formato inválido, use {", ".join(EXPORT_FORMATS)}')
+
+    return export_format
+
+def parse_date_range():
+    """Lê start e end (AAAA-MM-DD, inclusivos) como limites [início, fim) de datetime"""
+    bounds = []
+
+    for name, offset in (('start', 0), ('end', 1)):
+        value = request.args.get(name)
+
+        if not value:
+            bounds.append(None)
+            continue
+
+        try:
+            day = datetime.date.fromisoformat(value)
+        except ValueError:
+            raise ExportError(f'Data inválida em {name}, use AAAA-MM-DD')
+
+        bounds.append(datetime.datetime.combine(day + datetime.timedelta(days=offset), datetime.time.min))
+
+    return tuple(bounds)
+
+def stream_batches(statement):
+    """Executa a consulta e devolve as linhas em lotes, sem carregar o resultado inteiro"""
+    result = db.session.execute(statement, execution_options={'stream_results': True})
+
+    try:
+        for rows in result.partitions(EXPORT_BATCH_SIZE):
+            yield rows
+    finally:
+        result.close()
+
+def json_default(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+
+    raise TypeError(f'{type(value).__name__} não é serializável')
+
+def to_ndjson(records):
+    return ''.join(json.dumps(record, ensure_ascii=False, default=json_default) + '\n' for record in records)
+
+def to_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    for row in rows:
+        writer.writerow(value.isoformat() if isinstance(value, datetime.datetime) else value for value in row)
+
+    return buffer.getvalue()
+
+def export_response(chunks, export_format, filename):
+    response = Response(stream_with_context(chunks), mimetype=EXPORT_FORMATS[export_format])
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}.{export_format}'
+    # Proxies como o nginx não devem acumular a resposta antes de repassá-la
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
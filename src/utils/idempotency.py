@@ -0,0 +1,137 @@
+import datetime
+import hashlib
+import json
+import os
+import time
+from functools import wraps
+from flask import g, jsonify, request
+from sqlalchemy import and_, or_, select
+from src.models.db import db
+from src.models.idempotency import IdempotencyKey
+
+# Suporte ao cabeçalho Idempotency-Key.
+#
+# A primeira requisição com uma chave reserva a chave (INSERT em uma transação
+# curta) e a rota grava a resposta na mesma transação do seu próprio commit,
+# com store_idempotent_response. Repetições com a mesma chave recebem a
+# resposta gravada sem executar a rota de novo; repetições simultâneas esperam
+# pela primeira, consultando apenas a linha da sua chave.
+
+# Por quanto tempo uma resposta gravada é reaproveitada
+IDEMPOTENCY_TTL = int(os.environ.get('IDEMPOTENCY_TTL', 24 * 60 * 60))
+# Quanto tempo uma repetição espera a requisição original terminar
+IDEMPOTENCY_WAIT = float(os.environ.get('IDEMPOTENCY_WAIT', 10))
+# Uma reserva sem resposta há mais tempo que isso é de uma requisição que
+# falhou sem gravar nada (a resposta é gravada junto com o commit da rota)
+IDEMPOTENCY_LOCK_TIMEOUT = float(os.environ.get('IDEMPOTENCY_LOCK_TIMEOUT', 30))
+IDEMPOTENCY_POLL_INTERVAL = 0.05
+
+def claim_key(user_id, key, request_hash):
+    """Tenta reservar a chave; retorna None se conseguiu ou a linha já existente"""
+    keys = IdempotencyKey.__table__
+    now = datetime.datetime.now()
+    abandoned = now - datetime.timedelta(seconds=IDEMPOTENCY_LOCK_TIMEOUT)
+
+    with db.engine.begin() as connection:
+        # Limpeza das chaves vencidas e das reservas abandonadas (usa o índice de expires_at)
+        connection.execute(keys.delete().where(or_(
+            keys.c.expires_at < now,
+            and_(keys.c.user_id == user_id, keys.c.key == key,
+                 keys.c.response_status.is_(None), keys.c.created_at < abandoned)
+        )))
+
+        claimed = connection.execute(keys.insert().prefix_with('OR IGNORE').values(
+            user_id=user_id,
+            key=key,
+            request_hash=request_hash,
+            created_at=now,
+            expires_at=now + datetime.timedelta(seconds=IDEMPOTENCY_TTL)
+        )).rowcount
+
+        if claimed:
+            return None
+
+        return connection.execute(select(keys).where(keys.c.user_id == user_id, keys.c.key == key)).first()
+
+def find_key(user_id, key):
+    keys = IdempotencyKey.__table__
+
+    with db.engine.connect() as connection:
+        return connection.execute(select(keys).where(keys.c.user_id == user_id, keys.c.key == key)).first()
+
+def release_key(user_id, key):
+    keys = IdempotencyKey.__table__
+
+    with db.engine.begin() as connection:
+        connection.execute(keys.delete().where(
+            keys.c.user_id == user_id, keys.c.key == key, keys.c.response_status.is_(None)
+        ))
+
+def store_idempotent_response(body, status):
+    """Grava a resposta da chave atual na transação da sessão (sem efeito sem a chave)"""
+    claim = g.get('idempotency_claim')
+
+    if claim is None:
+        return
+
+    keys = IdempotencyKey.__table__
+    db.session.execute(
+        keys.update()
+        .where(keys.c.user_id == claim[0], keys.c.key == claim[1])
+        .values(response_status=status, response_body=json.dumps(body, ensure_ascii=False))
+    )
+    g.idempotency_stored = True
+
+def replay(row):
+    response = jsonify(json.loads(row.response_body))
+    response.status_code = row.response_status
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+# Deve ser aplicado depois de token_required: as chaves são por usuário
+def idempotent(f):
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+
+        if not key:
+            return f(*args, **kwargs)
+
+        if len(key) > 255:
+            return jsonify({'error': 'Idempotency-Key muito longa'}), 400
+
+        user_id = request.user['user_id']
+        request_hash = hashlib.sha256(request.get_data()).hexdigest()
+        deadline = time.monotonic() + IDEMPOTENCY_WAIT
+        existing = claim_key(user_id, key, request_hash)
+
+        while existing is not None:
+            if existing.request_hash != request_hash:
+                return jsonify({'error': 'Idempotency-Key já usada com outro conteúdo'}), 422
+
+            if existing.response_status is not None:
+                return replay(existing)
+
+            # A requisição original ainda está em andamento
+            if time.monotonic() >= deadline:
+                return jsonify({'error': 'Requisição com esta Idempotency-Key em andamento'}), 409
+
+            time.sleep(IDEMPOTENCY_POLL_INTERVAL)
+            existing = find_key(user_id, key)
+
+            if existing is None:
+                # A original falhou e liberou a chave: tentar de novo
+                existing = claim_key(user_id, key, request_hash)
+
+        g.idempotency_claim = (user_id, key)
+
+        try:
+            return f(*args, **kwargs)
+        finally:
+            # Sem resposta gravada (erro de validação, exceção), a chave é
+            # liberada para que uma nova tentativa execute a rota
+            if not g.get('idempotency_stored'):
+                db.session.rollback()
+                release_key(user_id, key)
+
+    return decorated
@@ -0,0 +1,113 @@
+import base64
+import datetime
+import json
+from flask import request
+from sqlalchemy import and_, or_
+
+# Paginação por cursor (keyset) e seleção de campos para as listagens.
+#
+# O cursor é opaco para o cliente: contém os valores da chave de ordenação
+# da última linha retornada, e a próxima página é obtida com um WHERE sobre
+# essa chave em vez de OFFSET, de modo que o custo não cresce com a página.
+
+DEFAULT_MAX_LIMIT = 100
+
+class PaginationError(ValueError):
+    pass
+
+def parse_limit(max_limit=DEFAULT_MAX_LIMIT):
+    """Lê o parâmetro `limit`; retorna None quando a paginação não foi pedida"""
+    value = request.args.get('limit')
+
+    if value is None or value == '':
+        return None
+
+    try:
+        limit = int(value)
+    except ValueError:
+        raise PaginationError('Parâmetro limit inválido')
+
+    if limit < 1:
+        raise PaginationError('Parâmetro limit inválido')
+
+    return min(limit, max_limit)
+
+def parse_fields(allowed):
+    """Lê o parâmetro `fields` (lista separada por vírgulas) e valida os nomes"""
+    value = request.args.get('fields')
+
+    if not value:
+        return None
+
+    fields = []
+    for name in value.split(','):
+        name = name.strip()
+        if name and name not in fields:
+            fields.append(name)
+
+    invalid = [name for name in fields if name not in allowed]
+    if invalid:
+        raise PaginationError(f'Campos inválidos: {", ".join(invalid)}')
+
+    return fields or None
+
+def encode_cursor(values):
+    data = [value.isoformat() if isinstance(value, datetime.datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(data).encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, types):
+    """Decodifica o parâmetro `after` de acordo com os tipos da chave de ordenação"""
+    if not cursor:
+        return None
+
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(cursor + padding))
+
+        if not isinstance(data, list) or len(data) != len(types):
+            raise ValueError
+
+        values = []
+        for value, value_type in zip(data, types):
+            if value_type is datetime.datetime:
+                values.append(datetime.datetime.fromisoformat(value))
+            else:
+                values.append(value_type(value))
+
+        return values
+    except (ValueError, TypeError):
+        raise PaginationError('Cursor inválido')
+
+def keyset_filter(columns, values, descending=False):
+    """Condição "depois do cursor" para uma ordenação por (col1, col2, ...)"""
+    column, value = columns[0], values[0]
+    after = column < value if descending else column > value
+
+    if len(columns) == 1:
+        return after
+
+    return or_(after, and_(column == value, keyset_filter(columns[1:], values[1:], descending)))
+
+def select_columns(model, fields, key_fields):
+    """Colunas do SELECT para os campos pedidos, incluindo a chave do cursor"""
+    names = list(fields) + [name for name in key_fields if name not in fields]
+    return names, [getattr(model, name) for name in names]
+
+def fetch_page(query, limit):
+    """Executa a consulta buscando uma linha a mais para saber se há próxima página"""
+    if limit is None:
+        return query.all(), False
+
+    rows = query.limit(limit + 1).all()
+    return rows[:limit], len(rows) > limit
+
+def row_to_dict(row, fields):
+    result = {}
+
+    for name in fields:
+        value = getattr(row, name)
+        if isinstance(value, datetime.datetime):
+            value = value.isoformat()
+        result[name] = value
+
+    return result
@@ -0,0 +1,114 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+from flask import Response, request, send_from_directory
+
+# Índice em memória da pasta estática, montado na inicialização.
+#
+# A rota que serve o PWA consulta o índice (um dicionário) em vez de chamar
+# os.path.exists a cada requisição, e o ETag de cada arquivo já vem
+# calculado. As páginas (index.html, que também é a resposta de qualquer
+# rota do app no cliente) ficam em memória já comprimidas, de modo que uma
+# URL desconhecida é respondida sem acessar o disco.
+#
+# Com STATIC_INDEX_RELOAD=1 (padrão quando o app roda em debug) o índice e as
+# páginas são recarregados a cada requisição, para refletir edições em src/static.
+
+# Codificações na ordem de preferência e a extensão do arquivo de cada uma
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+PAGE_CACHE = 'no-cache'
+
+class StaticIndex:
+    """Arquivos da pasta estática (caminho relativo -> ETag)"""
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.files = {}
+
+        for root, dirs, files in os.walk(folder):
+            for name in files:
+                stat = os.stat(os.path.join(root, name))
+                path = os.path.relpath(os.path.join(root, name), folder).replace(os.sep, '/')
+                self.files[path] = f'{int(stat.st_mtime):x}-{stat.st_size:x}'
+
+    def __contains__(self, path):
+        return path in self.files
+
+    def send(self, path):
+        return send_from_directory(self.folder, path, etag=self.files[path])
+
+class MemoryPage:
+    """Página mantida em memória com as versões comprimidas já prontas.
+
+    Usa os arquivos .br/.gz ao lado da página quando existem (gerados pelo
+    build) e, se não houver .gz, comprime uma vez ao carregar.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            content = f.read()
+
+        self.mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.etag = hashlib.sha256(content).hexdigest()[:32]
+        self.variants = {}
+
+        for encoding, suffix in ENCODINGS:
+            if os.path.isfile(path + suffix):
+                with open(path + suffix, 'rb') as f:
+                    self.variants[encoding] = f.read()
+
+        if 'gzip' not in self.variants:
+            self.variants['gzip'] = gzip.compress(content, compresslevel=9, mtime=0)
+
+        self.variants[None] = content
+
+    def response(self, cache_control=PAGE_CACHE):
+        # ETag fraco: o mesmo para todas as codificações da página
+        if request.if_none_match.contains_weak(self.etag):
+            response = Response(status=304)
+        else:
+            encoding = next((
+                encoding for encoding, _ in ENCODINGS
+                if encoding in self.variants and request.accept_encodings.quality(encoding) > 0
+            ), None)
+
+            response = Response(self.variants[encoding], mimetype=self.mimetype)
+
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+
+        response.set_etag(self.etag, weak=True)
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = cache_control
+        return response
+
+def default_pages(app):
+    return {'index.html': MemoryPage(os.path.join(app.static_folder, 'index.html'))}
+
+def static_reload_enabled(app):
+    value = app.config.get('STATIC_INDEX_RELOAD', os.environ.get('STATIC_INDEX_RELOAD'))
+
+    if value is None:
+        return app.debug
+
+    return str(value).lower() in ('1', 'true', 'yes')
+
+def init_static_index(app, load_pages=default_pages):
+    """Monta o índice e carrega as páginas em app.extensions
+
+    `load_pages(app)` retorna o dicionário caminho -> MemoryPage.
+    """
+    def load():
+        app.extensions['static_index'] = StaticIndex(app.static_folder)
+        app.extensions['pages'] = load_pages(app)
+
+    load()
+
+    # Conferido a cada requisição, pois o modo debug costuma ser ligado depois
+    # de create_app(), por app.run(debug=True)
+    @app.before_request
+    def reload_static_index():
+        if static_reload_enabled(app):
+            load()
@@ -0,0 +1,61 @@
+import importlib
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEPLOY_ROOT = os.path.join(ROOT, 'deploy_package')
+TREES = (ROOT, DEPLOY_ROOT)
+
+def load_main(tree):
+    """Importa o src.main da árvore informada (a raiz ou deploy_package).
+
+    As duas árvores usam o mesmo pacote `src`, então os módulos já importados
+    da outra são descartados. Os testes de cada árvore ficam em arquivos
+    separados, para que as importações feitas dentro das rotas resolvam
+    sempre para a árvore em uso.
+    """
+    for name in list(sys.modules):
+        if name == 'src' or name.startswith('src.'):
+            del sys.modules[name]
+
+    for path in TREES:
+        while path in sys.path:
+            sys.path.remove(path)
+
+    sys.path.insert(0, tree)
+    return importlib.import_module('src.main')
+
+def create_test_app(tree, directory):
+    """App da árvore informada com um banco SQLite novo em `directory`"""
+    main = load_main(tree)
+
+    app = main.create_app()
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{os.path.join(directory, "hortifruti.db")}'
+    app.config['TESTING'] = True
+
+    with app.app_context():
+        from src.migrate import upgrade
+
+        upgrade()
+        main.seed_initial_data()
+
+    return app, main.db
+
+def app_with_database(tree, directory):
+    app, db = create_test_app(tree, directory)
+    yield app, db
+
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+@pytest.fixture(scope='module')
+def src_app(tmp_path_factory):
+    """(app, db) de src/ com banco temporário e os dados de seed_initial_data"""
+    yield from app_with_database(ROOT, str(tmp_path_factory.mktemp('src')))
+
+@pytest.fixture(scope='module')
+def deploy_app(tmp_path_factory):
+    """(app, db) de deploy_package/src com banco temporário e os dados iniciais"""
+    yield from app_with_database(DEPLOY_ROOT, str(tmp_path_factory.mktemp('deploy')))
@@ -0,0 +1,44 @@
+import contextlib
+from sqlalchemy import event
+
+# Contagem das consultas SQL executadas, para verificar que uma rota faz um
+# número constante de consultas (sem N+1) independentemente do volume de
+# pedidos e itens. Exemplo de uso em um teste:
+#
+#     with app.app_context(), assert_max_queries(3, db.engine):
+#         response = client.get('/api/orders', headers=headers)
+
+class QueryCounter:
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+@contextlib.contextmanager
+def count_queries(engine):
+    """Registra todas as consultas executadas no engine dentro do bloco"""
+    counter = QueryCounter()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter.statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+@contextlib.contextmanager
+def assert_max_queries(expected, engine):
+    """Falha se o bloco executar mais de `expected` consultas"""
+    with count_queries(engine) as counter:
+        yield counter
+
+    if counter.count > expected:
+        statements = '\n\n'.join(counter.statements)
+        raise AssertionError(
+            f'Esperadas no máximo {expected} consultas, foram executadas {counter.count}:\n\n{statements}'
+        )
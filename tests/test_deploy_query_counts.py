@@ -0,0 +1,78 @@
+import pytest
+from query_counter import assert_max_queries
+
+# Número de consultas por rota de pedidos em deploy_package/src. Os máximos
+# não dependem da quantidade de pedidos e itens: um N+1 de volta faz estes
+# testes falharem.
+
+ORDER_COUNT = 6
+ITEMS_PER_ORDER = 3
+
+def login(client, url, email, password):
+    response = client.post(url, json={'email': email, 'password': password})
+    assert response.status_code == 200, response.get_json()
+    return {'Authorization': f'Bearer {response.get_json()["token"]}'}
+
+@pytest.fixture(scope='module')
+def orders(deploy_app):
+    """Pedidos do cliente de teste (além dos criados pelo seed), com vários itens"""
+    app, db = deploy_app
+    client = app.test_client()
+
+    admin = login(client, '/api/users/admin/login', 'admin@hortifrutidelivery.com.br', 'admin123')
+    customer = login(client, '/api/users/login', 'cliente@teste.com', 'cliente123')
+    products = client.get('/api/products/').get_json()[:ITEMS_PER_ORDER]
+    subtotal = sum(product['price'] for product in products)
+    order_ids = []
+
+    for _ in range(ORDER_COUNT):
+        response = client.post('/api/orders/', headers=customer, json={
+            'customer_name': 'Cliente Teste',
+            'customer_email': 'cliente@teste.com',
+            'delivery_address': 'Rua Teste, 123',
+            'payment': 'pix',
+            'subtotal': subtotal,
+            'delivery_fee': 5.0,
+            'total': subtotal + 5.0,
+            'items': [
+                {'product_id': product['id'], 'product_name': product['name'], 'price': product['price'], 'quantity': 1}
+                for product in products
+            ]
+        })
+        assert response.status_code == 201, response.get_json()
+        order_ids.append(response.get_json()['id'])
+
+    return {'admin': admin, 'customer': customer, 'order_ids': order_ids}
+
+def get(deploy_app, url, headers, max_queries):
+    app, db = deploy_app
+    client = app.test_client()
+
+    # A primeira requisição aquece os caches (claims do token etc.)
+    client.get(url, headers=headers)
+
+    with app.app_context(), assert_max_queries(max_queries, db.engine):
+        response = client.get(url, headers=headers)
+
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+def created(data, order_ids):
+    return [order for order in data if order['id'] in order_ids]
+
+def test_list_orders(deploy_app, orders):
+    data = created(get(deploy_app, '/api/orders/', orders['admin'], 2), orders['order_ids'])
+
+    assert len(data) == ORDER_COUNT
+    assert all(len(order['items']) == ITEMS_PER_ORDER for order in data)
+
+def test_customer_orders(deploy_app, orders):
+    data = created(get(deploy_app, '/api/orders/customer', orders['customer'], 2), orders['order_ids'])
+
+    assert len(data) == ORDER_COUNT
+    assert all(len(order['items']) == ITEMS_PER_ORDER for order in data)
+
+def test_order_detail(deploy_app, orders):
+    data = get(deploy_app, f'/api/orders/{orders["order_ids"][0]}', orders['customer'], 1)
+
+    assert len(data['items']) == ITEMS_PER_ORDER
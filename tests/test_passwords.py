@@ -0,0 +1,63 @@
+import threading
+import time
+import pytest
+
+def login(client, email, password):
+    return client.post('/api/users/login', json={'email': email, 'password': password})
+
+@pytest.fixture
+def passwords(src_app):
+    from src.utils import passwords
+
+    yield passwords
+
+    # O semáforo é criado de novo com a configuração do próximo teste
+    passwords._slots = None
+
+def test_legacy_plaintext_password_with_dollar_signs(src_app, passwords):
+    app, db = src_app
+    from src.models.user import User
+
+    with app.app_context():
+        user = User.query.filter_by(email='cliente@teste.com').first()
+        user.password = 'senha$antiga$123'
+        db.session.commit()
+
+    assert not passwords.is_password_hash('senha$antiga$123')
+
+    response = login(app.test_client(), 'cliente@teste.com', 'senha$antiga$123')
+    assert response.status_code == 200, response.get_json()
+
+    # A senha em texto puro é regravada com hash no login
+    with app.app_context():
+        stored = User.query.filter_by(email='cliente@teste.com').first().password
+        assert passwords.is_password_hash(stored)
+
+        user = User.query.filter_by(email='cliente@teste.com').first()
+        user.password = passwords.hash_password('cliente123')
+        db.session.commit()
+
+def test_busy_hashing_is_rejected_without_waiting(src_app, passwords):
+    app, db = src_app
+    app.config['PASSWORD_HASH_CONCURRENCY'] = 1
+
+    try:
+        with app.app_context():
+            slots = passwords.get_slots()
+
+        # Outra requisição ocupando a única vaga de hash do processo
+        holder = threading.Thread(target=slots.acquire)
+        holder.start()
+        holder.join()
+
+        started = time.perf_counter()
+        response = login(app.test_client(), 'cliente@teste.com', 'cliente123')
+
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '1'
+        assert time.perf_counter() - started < 0.5
+
+        slots.release()
+        assert login(app.test_client(), 'cliente@teste.com', 'cliente123').status_code == 200
+    finally:
+        app.config.pop('PASSWORD_HASH_CONCURRENCY')
@@ -0,0 +1,77 @@
+import pytest
+from query_counter import assert_max_queries
+
+# Número de consultas por rota de pedidos em src/. Os máximos não dependem da
+# quantidade de pedidos e itens: um N+1 de volta faz estes testes falharem.
+
+ORDER_COUNT = 6
+ITEMS_PER_ORDER = 3
+
+def login(client, email, password):
+    response = client.post('/api/users/login', json={'email': email, 'password': password})
+    assert response.status_code == 200, response.get_json()
+    return {'Authorization': f'Bearer {response.get_json()["token"]}'}
+
+@pytest.fixture(scope='module')
+def orders(src_app):
+    """Pedidos do cliente de teste, cada um com vários itens"""
+    app, db = src_app
+    client = app.test_client()
+
+    admin = login(client, 'admin@hortifrutidelivery.com.br', 'admin123')
+    customer = login(client, 'cliente@teste.com', 'cliente123')
+    products = client.get('/api/products').get_json()['products']
+    order_ids = []
+
+    for _ in range(ORDER_COUNT):
+        response = client.post('/api/orders', headers=customer, json={
+            'items': [{'product_id': product['id'], 'quantity': 1} for product in products[:ITEMS_PER_ORDER]],
+            'address': 'Rua Teste, 123',
+            'payment_method': 'pix'
+        })
+        assert response.status_code == 201, response.get_json()
+        order_ids.append(response.get_json()['order']['id'])
+
+    return {'admin': admin, 'customer': customer, 'order_ids': order_ids}
+
+def get(src_app, url, headers, max_queries):
+    app, db = src_app
+    client = app.test_client()
+
+    # A primeira requisição aquece os caches (claims do token etc.)
+    client.get(url, headers=headers)
+
+    with app.app_context(), assert_max_queries(max_queries, db.engine):
+        response = client.get(url, headers=headers)
+
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+def test_list_orders_as_admin(src_app, orders):
+    data = get(src_app, '/api/orders', orders['admin'], 2)
+
+    assert len(data['orders']) == ORDER_COUNT
+    assert all(len(order['items']) == ITEMS_PER_ORDER for order in data['orders'])
+
+def test_list_orders_as_customer(src_app, orders):
+    data = get(src_app, '/api/orders', orders['customer'], 2)
+
+    assert len(data['orders']) == ORDER_COUNT
+    assert all(order['items'][0]['product'] for order in data['orders'])
+
+def test_order_detail(src_app, orders):
+    data = get(src_app, f'/api/orders/{orders["order_ids"][0]}', orders['customer'], 1)
+
+    assert len(data['order']['items']) == ITEMS_PER_ORDER
+
+def test_order_items(src_app, orders):
+    data = get(src_app, f'/api/order-items/{orders["order_ids"][0]}', orders['customer'], 2)
+
+    assert len(data['order_items']) == ITEMS_PER_ORDER
+    assert all(item['product'] for item in data['order_items'])
+
+def test_order_history(src_app, orders):
+    data = get(src_app, '/api/orders/history', orders['customer'], 1)
+
+    assert len(data['orders']) == ORDER_COUNT
+    assert all(order['item_count'] == ITEMS_PER_ORDER for order in data['orders'])